@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Verbatim copy of the eval() based processors items.py used before fifa_market_analysis.processors. They are kept
+# only as the baseline for processors_benchmark.py and must never be wired into an Item again.
+
+import re
+from datetime import datetime
+from urllib.parse import urljoin
+
+def convert_currency_format(value):
+
+    """
+    Strips away currency symbol and applies multiplier based on abbreviation (K to 1,000, M to 1,000,000).
+
+    >>> convert_currency_format('€110.5M')
+    >>> 110500000.0
+
+    >>> convert_currency_format('€110K')
+    >>> 110000.0
+
+    >>> convert_currency_format('99.5M')
+    >>> 99500000.0
+
+    >>> convert_currency_format('21')
+    >>> 21.0
+
+    >>> convert_currency_format('€190')
+    >>> 190.0
+
+    >>> convert_currency_format(0)
+    >>> 0.0
+    """
+
+    pattern = r'\W|[0-9.]+|[a-zA-Z]'
+
+    if type(value) is str:
+        if re.findall(pattern, value)[0] == u"\u20ac" and re.findall(pattern, value)[-1] == 'K':
+            new_value = float(re.findall(pattern, value)[1]) * 1000
+            return new_value
+        elif re.findall(pattern, value)[0] == u"\u20ac" and re.findall(pattern, value)[-1] == 'M':
+            new_value = float(re.findall(pattern, value)[1]) * 1000000
+            return new_value
+        elif re.findall(pattern, value)[0] == u"\u20ac" and re.findall(pattern, value)[-1] != ('M' or 'K'):
+            new_value = float(re.findall(pattern, value)[1])
+            return new_value
+        elif re.findall(pattern, value)[0] != u"\u20ac" and re.findall(pattern, value)[-1] != ('M' or 'K'):
+            new_value = float(re.findall(pattern, value)[0])
+            return new_value
+    else:
+        return float(value)
+
+
+def get_id(value):
+
+    pattern = r'ID:\ |[0-9]+'
+    match = re.findall(pattern, value)[-1]
+    return match
+
+
+def get_name(value):
+
+    pattern = r'^[^\(]+'
+    match = re.findall(pattern, value)[0]
+    return match
+
+
+def get_age(value):
+
+    pattern_1 = r'Age\ [0-9]+'
+    match = re.findall(pattern_1, value)[0]
+    pattern_2 = r'[0-9]+'
+    age_in_years = re.findall(pattern_2, match)
+    return age_in_years
+
+
+def get_dob(value):
+
+    pattern = r'[a-zA-Z]+\ [0-9]+,\ [0-9]+'
+    match = re.findall(pattern, value)[0]
+    datetime_dob = datetime.strptime(match, '%b %d, %Y')
+    return datetime_dob
+
+
+def get_height(value):
+
+    pattern_1 = r'[0-9]+\W[0-9]+\W'
+    match = re.findall(pattern_1, value)[0]
+    pattern_2 = r'([0-9]+)'
+    feet = eval(re.findall(pattern_2, match)[0]) * 12
+    inches = eval(re.findall(pattern_2, match)[1])
+    height_in_inches = feet + inches
+    return height_in_inches
+
+
+def get_weight(value):
+
+    pattern_1 = r'[0-9]+lbs'
+    match = re.findall(pattern_1, value)[0]
+    pattern_2 = r'[0-9]+'
+    weight_in_lbs = re.findall(pattern_2, match)
+    return weight_in_lbs
+
+
+def get_date(value):
+
+    try:
+        date = datetime.strptime(value, '%b %d, %Y')
+        return date
+
+    except ValueError:
+        date = datetime.strptime(value, '%Y')
+        return date
+
+
+def player_id_list(value):
+
+    player_list = list()
+    eval_list = list()
+    pattern = r'[0-9]+'
+
+    for player in value:
+        player_list.append(re.findall(pattern, player))
+
+    for i in range(len(player_list)):
+        eval_list.append(eval(player_list[i][0]))
+
+    return eval_list
+
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+# Microbenchmark for the item value processors.
+#
+# Loads the raw values of a saved player page into SofifaItem once with the current processors and once with the
+# legacy eval() based processors, and reports the per-item cost of each.
+#
+# Usage (from fifa_workspace/fifa_market_analysis):
+#
+#     python -m benchmarks.processors_benchmark [--items 2000] [--fixture player_158023.html]
+
+import argparse
+import os
+import re
+import timeit
+from datetime import datetime
+from urllib.parse import urljoin
+
+import scrapy
+from scrapy.http import HtmlResponse, Request
+from scrapy.loader import ItemLoader
+from scrapy.loader.processors import MapCompose, Compose
+
+from fifa_market_analysis import processors
+from fifa_market_analysis.extractors import extract_player
+from fifa_market_analysis.items import SofifaItem
+from benchmarks import legacy_processors as legacy
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Current processor -> the legacy chain it replaced in items.py.
+LEGACY_CHAINS = {
+    processors.to_int: (eval,),
+    processors.to_number: (eval,),
+    processors.get_id: (legacy.get_id, eval),
+    processors.get_name: (legacy.get_name,),
+    processors.get_age: (legacy.get_age, eval),
+    processors.get_dob: (legacy.get_dob,),
+    processors.get_height: (legacy.get_height,),
+    processors.get_weight: (legacy.get_weight, eval),
+    processors.get_date: (legacy.get_date,),
+    processors.parse_date: (lambda x: datetime.strptime(x, '%b %d, %Y'),),
+    processors.convert_currency_format: (legacy.convert_currency_format,),
+    processors.player_id_list: (legacy.player_id_list,),
+    processors.get_ints: (lambda x: re.findall(r'[0-9]+', x), eval),
+    processors.get_first_int: (lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+    processors.get_path_id: (lambda x: re.findall(r'/([0-9]+)/', x), eval),
+    processors.get_club_name: (lambda x: re.findall(r'^[^\(]+', x), str.strip),
+    processors.get_category: (lambda x: re.findall(r'org/([a-zA-Z]+)', x)[0],),
+    processors.absolute_url: (lambda x: f'{urljoin("https://sofifa.com", x)}',),
+    processors.count_token(0): (lambda x: re.findall(r'<?[0-9.K]+', x)[0],),
+    processors.count_token(1): (lambda x: re.findall(r'<?[0-9.K]+', x)[1],),
+}
+
+for _point in ('PAC', 'SHO', 'PAS', 'DRI', 'DEF', 'PHY'):
+    LEGACY_CHAINS[processors.script_point(_point)] = (
+        lambda x, point=_point: re.findall(r'point' + point + r' = ([0-9]+)', x)[0], eval)
+
+
+def legacy_processor(processor):
+
+    """
+    Rebuilds a MapCompose/Compose processor with the legacy functions swapped back in.
+    """
+
+    if isinstance(processor, (MapCompose, Compose)):
+        functions = list()
+        for function in processor.functions:
+            functions.extend(LEGACY_CHAINS.get(function, (function,)))
+        return type(processor)(*functions)
+    return processor
+
+
+def legacy_item_class(item_class):
+
+    fields = dict()
+    for name, field in item_class.fields.items():
+        field = dict(field)
+        if 'input_processor' in field:
+            field['input_processor'] = legacy_processor(field['input_processor'])
+        fields[name] = scrapy.Field(**field)
+
+    return type(f'Legacy{item_class.__name__}', (scrapy.Item,), fields)
+
+
+def fixture_response(name, url='https://sofifa.com/'):
+
+    """
+    Builds the response a spider callback would receive for a saved page. The User-Agent header is normally set by
+    the downloader middleware and is printed by some callbacks.
+    """
+
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        body = f.read()
+
+    return HtmlResponse(url=url, body=body, encoding='utf-8', request=Request(url, headers={'User-Agent': 'benchmarks'}))
+
+
+def load(item_class, raw):
+
+    loader = ItemLoader(item=item_class())
+    for field, values in raw.items():
+        loader.add_value(field, values)
+    return loader.load_item()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Compare legacy and current item processors.')
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--fixture', default='player_158023.html')
+    args = parser.parse_args()
+
+    raw = extract_player(fixture_response(args.fixture))
+    legacy_class = legacy_item_class(SofifaItem)
+
+    current_item = dict(load(SofifaItem, raw))
+    legacy_item = dict(load(legacy_class, raw))
+    differences = sorted(field for field in set(current_item) | set(legacy_item)
+                         if current_item.get(field) != legacy_item.get(field))
+
+    results = dict()
+    for label, item_class in (('legacy', legacy_class), ('current', SofifaItem)):
+        seconds = min(timeit.repeat(lambda: load(item_class, raw), number=args.items, repeat=3))
+        results[label] = seconds / args.items * 1e6
+
+    print(f'fixture: {args.fixture} ({len(raw)} fields)')
+    for label, microseconds in results.items():
+        print(f'{label:>8}: {microseconds:8.1f} us/item')
+    print(f' speedup: {results["legacy"] / results["current"]:8.2f}x')
+    print(f' differing fields: {differences or "none"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+# Pop order check for sqlite_queue.SQLitePriorityQueue.
+#
+# Pushes and pops the same random requests, in the same interleaved order, through SQLitePriorityQueue and Scrapy's
+# ScrapyPriorityQueue, once with PickleLifoDiskQueue and once with PickleFifoDiskQueue as SCHEDULER_DISK_QUEUE, and
+# counts the pops that return a different request. Any mismatch fails the run with exit code 1.
+#
+# Usage (from fifa_workspace/fifa_market_analysis):
+#
+#     python -m benchmarks.queue_order [--requests 2000] [--batch-size 100] [--seed 0]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import scrapy
+from scrapy import squeues
+from scrapy.pqueues import ScrapyPriorityQueue
+from scrapy.utils.test import get_crawler
+
+from fifa_market_analysis.sqlite_queue import SQLitePriorityQueue
+
+
+DISK_QUEUES = (('lifo', squeues.PickleLifoDiskQueue), ('fifo', squeues.PickleFifoDiskQueue))
+
+
+def operations(count, seed):
+
+    """
+    :return: list of the requests to push, None standing for a pop, with about one pop per two pushes until all
+             requests are pushed and then pops until the queue is empty
+    """
+
+    rng = random.Random(seed)
+    steps = list()
+    for index in range(count):
+        steps.append(scrapy.Request(f'https://sofifa.com/player/{index}/', priority=rng.choice((-1, 0, 0, 1, 2))))
+        if rng.random() < 0.5:
+            steps.append(None)
+    return steps + [None] * count
+
+
+def pop_order(queue, steps):
+
+    popped = list()
+    for step in steps:
+        if step is None:
+            request = queue.pop()
+            if request is not None:
+                popped.append(request.url)
+        else:
+            queue.push(step)
+    return popped
+
+
+def compare(downstream_queue_cls, steps, batch_size):
+
+    """
+    :return: (requests popped, pops returning a different request than ScrapyPriorityQueue)
+    """
+
+    crawler = get_crawler(scrapy.Spider, {'SQLITE_QUEUE_BATCH_SIZE': batch_size})
+    crawler.spider = scrapy.Spider('queue_order')
+
+    with tempfile.TemporaryDirectory() as directory:
+        expected_queue = ScrapyPriorityQueue.from_crawler(crawler, downstream_queue_cls,
+                                                          os.path.join(directory, 'stock'))
+        queue = SQLitePriorityQueue.from_crawler(crawler, downstream_queue_cls, os.path.join(directory, 'sqlite'))
+        try:
+            expected = pop_order(expected_queue, steps)
+            actual = pop_order(queue, steps)
+        finally:
+            expected_queue.close()
+            queue.close()
+
+    mismatches = sum(1 for left, right in zip(expected, actual) if left != right)
+    return len(expected), mismatches + abs(len(expected) - len(actual))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Compare the pop order of SQLitePriorityQueue and Scrapy.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100, help='SQLITE_QUEUE_BATCH_SIZE')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    steps = operations(args.requests, args.seed)
+    failed = False
+    for label, downstream_queue_cls in DISK_QUEUES:
+        popped, mismatches = compare(downstream_queue_cls, steps, args.batch_size)
+        print(f'{label}: {popped} pops, {mismatches} mismatches')
+        failed = failed or bool(mismatches)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
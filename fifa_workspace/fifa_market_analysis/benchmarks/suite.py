@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+# Offline benchmark suite for the spider callbacks.
+#
+# Every case runs one spider callback against a saved page from benchmarks/fixtures, without touching the network,
+# and reports ms/page and items/sec. With --fields it also reports the cost of every loaded field and with
+# --processors the cost of every item processor on the values the fixtures produced.
+#
+# Throughput is compared against a baseline file of items/sec per case. A case that drops more than --threshold
+# below its baseline fails the run with exit code 1. Baselines are machine specific, so record one on the machine
+# that runs the comparison:
+#
+#     python -m benchmarks.suite --save-baseline          (on the reference commit)
+#     python -m benchmarks.suite --threshold 0.15         (on the change)
+#
+# Usage (from fifa_workspace/fifa_market_analysis):
+#
+#     python -m benchmarks.suite [--number 20] [--case player_details.parse] [--fields 10] [--processors]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from importlib import import_module
+
+import scrapy
+from scrapy.loader import ItemLoader
+from scrapy.utils.misc import arg_to_iter
+from scrapy.utils.test import get_crawler
+
+from fifa_market_analysis.field_specs import FieldSpec
+from benchmarks.processors_benchmark import fixture_response
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# (spider class, callback, fixture, url the page was saved from)
+CASES = (
+    ('fifa_market_analysis.spiders.sofifa_player_pages.SofifaPlayerPagesSpider', 'parse',
+     'player_158023.html', 'https://sofifa.com/player/158023/lionel-messi/'),
+    ('fifa_market_analysis.spiders.sofifa_club_pages.SofifaClubPagesSpider', 'parse',
+     'club_241.html', 'https://sofifa.com/team/241/fc-barcelona/'),
+    ('fifa_market_analysis.spiders.sofifa_team_pages.SofifaTeamPagesSpider', 'parse',
+     'team_1369.html', 'https://sofifa.com/team/1369/argentina/'),
+    ('fifa_market_analysis.spiders.sofifa_teams.SofifaClubsSpider', 'parse_item',
+     'club_241.html', 'https://sofifa.com/team/241/fc-barcelona/'),
+    ('fifa_market_analysis.spiders.sofifa_teams.SofifaTeamsSpider', 'parse_item',
+     'team_1369.html', 'https://sofifa.com/team/1369/argentina/'),
+    ('fifa_market_analysis.spiders.sofifa_player_urls.SofifaPlayerURLsSpider', 'parse_item',
+     'players_listing.html', 'https://sofifa.com/players?offset=0'),
+    ('fifa_market_analysis.spiders.sofifa_club_urls.SofifaClubUrlsSpider', 'parse_start_url',
+     'clubs_listing.html', 'https://sofifa.com/teams/club/'),
+    ('fifa_market_analysis.spiders.sofifa_team_urls.SofifaTeamUrlsSpider', 'parse_start_url',
+     'national_teams_listing.html', 'https://sofifa.com/teams/national/'),
+    ('fifa_market_analysis.spiders.sofifa_teams.SofifaClubsSpider', 'parse_start_url',
+     'clubs_listing.html', 'https://sofifa.com/teams/club'),
+    ('fifa_market_analysis.spiders.sofifa_teams.SofifaTeamsSpider', 'parse_start_url',
+     'national_teams_listing.html', 'https://sofifa.com/teams/national'),
+)
+
+
+def load_class(path):
+
+    module, name = path.rsplit('.', 1)
+    return getattr(import_module(module), name)
+
+
+def build_spider(spider_class):
+
+    """
+    Attaches the spider to a bare crawler so callbacks can use self.crawler.stats and self.settings, without the
+    spider's custom_settings (pipelines, proxies, monitors) being applied.
+    """
+
+    crawler = get_crawler(scrapy.Spider)
+    return spider_class.from_crawler(crawler)
+
+
+def case_name(case):
+
+    spider_class = load_class(case[0])
+    return f'{spider_class.name}.{case[1]}'
+
+
+def run_callback(callback, response):
+
+    # The callbacks print progress lines; keep them out of the report but inside the measurement.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [output for output in callback(response) if isinstance(output, (scrapy.Item, dict))]
+
+
+def time_case(case, number, repeat=3):
+
+    """
+    :return: (items per call, best seconds per call)
+    """
+
+    spider = build_spider(load_class(case[0]))
+    callback = getattr(spider, case[1])
+    response = fixture_response(case[2], url=case[3])
+
+    items = len(run_callback(callback, response))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run_callback(callback, response)
+        seconds = (time.perf_counter() - start) / number
+        best = seconds if best is None else min(best, seconds)
+
+    return items, best
+
+
+@contextlib.contextmanager
+def recording_fields(costs, samples):
+
+    """
+    Times ItemLoader.add_xpath/add_value and FieldSpec.extract/process per field while active, and keeps the raw
+    values handed to each Item field so the processors can be timed on them afterwards.
+    """
+
+    depth = [0]
+
+    def timed(function, key_of):
+        # add_xpath() calls add_value(); only the outermost call is charged to the field.
+        def wrapper(*args, **kwargs):
+            depth[0] += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+                if not depth[0]:
+                    costs[key_of(*args)] += time.perf_counter() - start
+        return wrapper
+
+    def loader_key(loader, field_name, *args):
+        return field_name
+
+    def spec_key(spec, *args):
+        return spec.name
+
+    def add_value(loader, field_name, value, *processors, **kw):
+        samples[(type(loader.item), field_name)].append(value)
+        return original_add_value(loader, field_name, value, *processors, **kw)
+
+    def process(spec, values):
+        samples[(spec.name, spec.input_processor, spec.output_processor)].append(values)
+        return original_process(spec, values)
+
+    original_add_value = ItemLoader.add_value
+    original_add_xpath = ItemLoader.add_xpath
+    original_extract = FieldSpec.extract
+    original_process = FieldSpec.process
+
+    ItemLoader.add_value = timed(add_value, loader_key)
+    ItemLoader.add_xpath = timed(original_add_xpath, loader_key)
+    FieldSpec.extract = timed(original_extract, spec_key)
+    FieldSpec.process = timed(process, spec_key)
+
+    try:
+        yield
+    finally:
+        ItemLoader.add_value = original_add_value
+        ItemLoader.add_xpath = original_add_xpath
+        FieldSpec.extract = original_extract
+        FieldSpec.process = original_process
+
+
+def field_costs(case, number, samples):
+
+    """
+    :return: list of (field, seconds per call) for one case, most expensive first, plus the unattributed remainder
+             (page walks, row selection, logging) under '(other)'
+    """
+
+    spider = build_spider(load_class(case[0]))
+    callback = getattr(spider, case[1])
+    response = fixture_response(case[2], url=case[3])
+
+    costs = defaultdict(float)
+    start = time.perf_counter()
+    with recording_fields(costs, samples):
+        for _ in range(number):
+            run_callback(callback, response)
+    total = (time.perf_counter() - start) / number
+
+    fields = sorted(((field, seconds / number) for field, seconds in costs.items()), key=lambda f: f[1], reverse=True)
+    fields.append(('(other)', max(total - sum(seconds for _, seconds in fields), 0.0)))
+
+    return fields
+
+
+def processor_name(processor):
+
+    functions = getattr(processor, 'functions', None)
+    if functions is None:
+        return type(processor).__name__
+    names = ', '.join(getattr(function, '__name__', type(function).__name__) for function in functions)
+    return f'{type(processor).__name__}({names})'
+
+
+def processor_costs(samples, number):
+
+    """
+    Times the input and output processor of every sampled field on the values the fixtures produced.
+
+    :return: list of (field, input processor, output processor, seconds per value)
+    """
+
+    results = list()
+
+    for key, values_list in samples.items():
+        if isinstance(key[0], type):
+            item_class, field_name = key
+            field = item_class.fields.get(field_name, {})
+            input_processor, output_processor = field.get('input_processor'), field.get('output_processor')
+            label = f'{item_class.__name__}.{field_name}'
+        else:
+            field_name, input_processor, output_processor = key
+            label = field_name
+        if input_processor is None or output_processor is None:
+            continue
+
+        processed = [arg_to_iter(input_processor(values)) for values in values_list]
+        start = time.perf_counter()
+        for _ in range(number):
+            for values, output in zip(values_list, processed):
+                input_processor(values)
+                if output:
+                    output_processor(output)
+        seconds = (time.perf_counter() - start) / (number * len(values_list))
+
+        results.append((label, processor_name(input_processor), processor_name(output_processor), seconds))
+
+    return sorted(results, key=lambda result: result[3], reverse=True)
+
+
+def read_baseline(path):
+
+    if not os.path.exists(path):
+        return dict()
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark the spider callbacks on saved sofifa pages.')
+    parser.add_argument('--number', type=int, default=20, help='callback calls per timing run')
+    parser.add_argument('--case', action='append', help='only run these cases (e.g. player_details.parse)')
+    parser.add_argument('--fields', type=int, default=0, help='show the N most expensive fields per case')
+    parser.add_argument('--processors', action='store_true', help='time every item processor')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed items/sec drop, 0.2 = 20%%')
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if not args.case or case_name(case) in args.case]
+    baseline = read_baseline(args.baseline)
+    results = dict()
+    regressions = list()
+    errors = list()
+    samples = defaultdict(list)
+
+    print(f'{"case":<34} {"fixture":<28} {"items":>5} {"ms/page":>9} {"items/s":>9} {"baseline":>9} {"change":>8}')
+
+    for case in cases:
+        name = f'{case_name(case)}:{case[2]}'
+        try:
+            items, seconds = time_case(case, args.number)
+        except Exception as exception:
+            errors.append((name, exception))
+            print(f'{case_name(case):<34} {case[2]:<28} error: {exception!r}')
+            continue
+        throughput = items / seconds if seconds else 0.0
+        results[name] = throughput
+
+        reference = baseline.get(name)
+        change = ''
+        if reference:
+            ratio = throughput / reference - 1
+            change = f'{ratio:+.1%}'
+            if ratio < -args.threshold:
+                regressions.append((name, reference, throughput))
+        print(f'{case_name(case):<34} {case[2]:<28} {items:>5} {seconds * 1000:>9.2f} {throughput:>9.1f} '
+              f'{reference or 0:>9.1f} {change:>8}')
+
+        if args.fields or args.processors:
+            fields = field_costs(case, max(args.number // 4, 1), samples)
+            for field, field_seconds in fields[:-1][:args.fields] + fields[-1:]:
+                print(f'    {field:<40} {field_seconds * 1e6:>10.1f} us')
+
+    if args.processors:
+        print(f'\n{"field":<48} {"input processor":<44} {"output":<12} {"us/value":>9}')
+        for label, input_name, output_name, seconds in processor_costs(samples, args.number):
+            print(f'{label:<48} {input_name:<44.44} {output_name:<12.12} {seconds * 1e6:>9.2f}')
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f'\nbaseline written to {args.baseline}')
+
+    if regressions:
+        print(f'\nthroughput regressions beyond {args.threshold:.0%}:')
+        for name, reference, throughput in regressions:
+            print(f'    {name}: {reference:.1f} -> {throughput:.1f} items/s')
+
+    if errors:
+        print('\nfailed cases:')
+        for name, exception in errors:
+            print(f'    {name}: {exception!r}')
+
+    if regressions or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
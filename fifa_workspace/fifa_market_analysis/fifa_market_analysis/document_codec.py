@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# Compact encoding of the player documents the Mongo pipelines store.
+#
+# A player document carries over 40 small rating fields, each stored under its own name: the 34 attributes including
+# the 5 goalkeeping ones and the 12 card points, besides the array of 26 position ratings. encode_document() packs
+# each of these fixed blocks into one binary field of one byte per value, in a fixed field order, and marks the
+# document with its encoding version:
+#
+#     _attributes         ATTRIBUTE_FIELDS, one byte each
+#     _goalkeeping        GOALKEEPING_FIELDS
+#     _points             POINT_FIELDS, the outfield and goalkeeper card points
+#     _position_ratings   position_ratings, in extractors.POSITIONS order
+#     _packed             CODEC_VERSION
+#
+# 255 stands for a missing value. A block is only packed when every value in it fits, so decode_document() always
+# returns the original fields; documents without any of them, like the URL and club documents, are left unchanged.
+# Readers of a packed collection pass what they read through decode_document(), which also accepts unpacked documents.
+#
+#     MONGO_PACK_DOCUMENTS      False, see pipelines.MongoPipeline
+#     MONGO_PACK_SAMPLE_EVERY   measure the packed size of one in this many documents, 100
+
+from fifa_market_analysis.extractors import (ATTRIBUTE_LABELS, INLINE_ATTRIBUTE_LABELS, OUTFIELD_POINTS,
+                                             GOALKEEPER_POINTS, POSITIONS)
+
+CODEC_KEY = '_packed'
+CODEC_VERSION = 1
+
+MISSING = 255
+
+GOALKEEPING_FIELDS = tuple(field for field in INLINE_ATTRIBUTE_LABELS.values() if field.startswith('gk_'))
+ATTRIBUTE_FIELDS = tuple(ATTRIBUTE_LABELS.values()) + tuple(
+    field for field in INLINE_ATTRIBUTE_LABELS.values() if field not in GOALKEEPING_FIELDS)
+POINT_FIELDS = OUTFIELD_POINTS + GOALKEEPER_POINTS
+
+SCALAR_BLOCKS = (
+    ('_attributes', ATTRIBUTE_FIELDS),
+    ('_goalkeeping', GOALKEEPING_FIELDS),
+    ('_points', POINT_FIELDS),
+)
+RATINGS_BLOCK = '_position_ratings'
+
+BLOCK_KEYS = {key for key, _ in SCALAR_BLOCKS} | {RATINGS_BLOCK, CODEC_KEY}
+
+
+def fits(value):
+    return type(value) is int and 0 <= value < MISSING
+
+
+def pack_scalars(document, fields):
+
+    """
+    :return: one byte per field, or None if a value is not a small non negative int
+    """
+
+    values = bytearray()
+    for field in fields:
+        value = document.get(field)
+        if value is None:
+            values.append(MISSING)
+        elif fits(value):
+            values.append(value)
+        else:
+            return None
+    return bytes(values)
+
+
+def encode_document(document):
+
+    """
+    :param document: a dict about to be stored
+    :return: a new dict with the rating blocks packed, or document itself when it has nothing to pack
+    """
+
+    packed = dict()
+    replaced = set()
+
+    for key, fields in SCALAR_BLOCKS:
+        if any(document.get(field) is not None for field in fields):
+            block = pack_scalars(document, fields)
+            if block is not None:
+                packed[key] = block
+                replaced.update(fields)
+
+    ratings = document.get('position_ratings')
+    if isinstance(ratings, list) and len(ratings) == len(POSITIONS) and all(fits(rating) for rating in ratings):
+        packed[RATINGS_BLOCK] = bytes(ratings)
+        replaced.add('position_ratings')
+
+    if not packed:
+        return document
+
+    encoded = {field: value for field, value in document.items() if field not in replaced}
+    encoded.update(packed)
+    encoded[CODEC_KEY] = CODEC_VERSION
+    return encoded
+
+
+def decode_document(document):
+
+    """
+    :param document: a document read from a collection the pipelines stored, packed or not
+    :return: the document with the packed blocks expanded back into their fields
+    """
+
+    version = document.get(CODEC_KEY)
+    if version is None:
+        return document
+    if version != CODEC_VERSION:
+        raise ValueError(f'Unknown document encoding {version!r}, expected {CODEC_VERSION}')
+
+    decoded = {field: value for field, value in document.items() if field not in BLOCK_KEYS}
+
+    for key, fields in SCALAR_BLOCKS:
+        block = document.get(key)
+        if block is not None:
+            decoded.update((field, value) for field, value in zip(fields, block) if value != MISSING)
+
+    ratings = document.get(RATINGS_BLOCK)
+    if ratings is not None:
+        decoded['position_ratings'] = list(ratings)
+
+    return decoded
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+# Request dupefilter with a compact on-disk format for JOBDIR crawls.
+#
+# RFPDupeFilter keeps <JOBDIR>/requests.seen as one hex fingerprint per line and reads all of it back into a set of
+# strings on every resume, about 100 bytes of memory per request seen. CompactDupeFilter keeps the first 64 bits of
+# every fingerprint instead:
+#
+#     requests.seen.u64   b'RFP8', uint32 version, uint64 count, then the fingerprints as a sorted uint64 array
+#     requests.seen.new   the fingerprints seen since the array was last written, appended as uint64s
+#
+# All little endian. On resume the array is mapped, not read, and looked up by bisection, so opening costs the same
+# whatever its size; only the few fingerprints in requests.seen.new are loaded into a set. close() merges them into a
+# new array. Two different requests share 64 bits of fingerprint with a probability of about n^2 / 2^65, one in 10^8
+# for half a million requests.
+#
+# An existing requests.seen from RFPDupeFilter is converted the first time the filter opens a JOBDIR.
+#
+#     DUPEFILTER_CLASS = 'fifa_market_analysis.dupefilter.CompactDupeFilter'
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from heapq import merge
+
+from scrapy.dupefilters import RFPDupeFilter
+
+MAGIC = b'RFP8'
+VERSION = 1
+HEADER = struct.Struct('<4sIQ')
+KEY = struct.Struct('<Q')
+
+ARRAY_FILE = 'requests.seen.u64'
+JOURNAL_FILE = 'requests.seen.new'
+LEGACY_FILE = 'requests.seen'
+
+
+def fingerprint_key(fingerprint):
+
+    """
+    :param fingerprint: hex request fingerprint
+    :return: its first 64 bits as an int
+    """
+
+    return int(fingerprint[:16], 16)
+
+
+class FingerprintSet(object):
+
+    """
+    The sorted, mapped fingerprints of earlier runs plus a set of the ones added since.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.saved = ()
+        self.mapped = None
+        self.added = set()
+        self.journal = None
+
+    def __contains__(self, key):
+        return key in self.added or self.saved_contains(key)
+
+    def saved_contains(self, key):
+        index = bisect_left(self.saved, key)
+        return index < len(self.saved) and self.saved[index] == key
+
+    def __len__(self):
+        return len(self.saved) + len(self.added)
+
+    def add(self, key):
+        self.added.add(key)
+        if self.journal is not None:
+            self.journal.write(KEY.pack(key))
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def open(self):
+
+        """
+        Maps the saved array, loads the journal and converts a legacy requests.seen if there is nothing else.
+
+        :return: number of fingerprints converted from requests.seen
+        """
+
+        converted = 0
+        if not os.path.exists(self.path(ARRAY_FILE)) and not os.path.exists(self.path(JOURNAL_FILE)):
+            converted = self.convert_legacy()
+
+        if os.path.exists(self.path(ARRAY_FILE)):
+            self.map_array()
+
+        if os.path.exists(self.path(JOURNAL_FILE)):
+            with open(self.path(JOURNAL_FILE), 'rb') as f:
+                data = f.read()
+            # A crash can leave a partly written last fingerprint.
+            data = data[:len(data) - len(data) % KEY.size]
+            self.added.update(key for key, in KEY.iter_unpack(data))
+
+        self.journal = open(self.path(JOURNAL_FILE), 'ab')
+        return converted
+
+    def map_array(self):
+
+        with open(self.path(ARRAY_FILE), 'rb') as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self.mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{self.path(ARRAY_FILE)} is not a fingerprint array')
+        if len(self.mapped) != HEADER.size + count * KEY.size:
+            raise ValueError(f'{self.path(ARRAY_FILE)} is truncated')
+
+        if sys.byteorder == 'little':
+            self.saved = memoryview(self.mapped)[HEADER.size:].cast('Q')
+        else:
+            self.saved = array('Q', self.mapped[HEADER.size:])
+            self.saved.byteswap()
+
+    def convert_legacy(self):
+
+        if not os.path.exists(self.path(LEGACY_FILE)):
+            return 0
+
+        with open(self.path(LEGACY_FILE), encoding='utf-8') as f:
+            keys = sorted({fingerprint_key(line.strip()) for line in f if line.strip()})
+        self.write_array(keys)
+        return len(keys)
+
+    def write_array(self, keys):
+
+        """
+        :param keys: iterable of sorted, distinct fingerprints
+        """
+
+        values = array('Q', keys)
+        if sys.byteorder != 'little':
+            values.byteswap()
+
+        temporary = self.path(f'{ARRAY_FILE}.tmp')
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(values)))
+            f.write(values.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path(ARRAY_FILE))
+
+    def close(self):
+
+        """
+        Merges the fingerprints added since the array was written into a new array, and empties the journal.
+        """
+
+        self.journal.close()
+        if self.added:
+            new = sorted(key for key in self.added if not self.saved_contains(key))
+            self.write_array(merge(self.saved, new))
+        os.remove(self.path(JOURNAL_FILE))
+
+        if isinstance(self.saved, memoryview):
+            self.saved.release()
+        if self.mapped is not None:
+            self.mapped.close()
+
+
+class CompactDupeFilter(RFPDupeFilter):
+
+    def __init__(self, path=None, debug=False, **kwargs):
+        # No path: the parent must not open requests.seen.
+        super().__init__(None, debug, **kwargs)
+        self.seen = FingerprintSet(path)
+        if path:
+            converted = self.seen.open()
+            if converted:
+                self.logger.info(f'Converted {converted} fingerprints from {os.path.join(path, LEGACY_FILE)}')
+
+    def request_seen(self, request):
+
+        key = fingerprint_key(self.request_fingerprint(request))
+        if key in self.seen:
+            return True
+        self.seen.add(key)
+        return False
+
+    def close(self, reason):
+        if self.seen.directory:
+            self.seen.close()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+# Scrapy extensions.
+#
+# StatsSnapshots writes the whole crawler stats dict to Mongo on a timer and when the spider closes, one document per
+# snapshot, so a crawl's progress can be followed and compared over time at a fixed cost per interval. Stats keys
+# contain dots (downloader/exception_type_count/twisted.internet.error.TimeoutError), which Mongo does not take in
+# field names, so a snapshot stores them as a sorted list of [key, value] pairs; dict(snapshot['stats']) reads them.
+#
+#     EXTENSIONS = {'fifa_market_analysis.extensions.StatsSnapshots': 500}
+#
+#     STATS_SNAPSHOT_ENABLED     False
+#     STATS_SNAPSHOT_INTERVAL    seconds between snapshots, 60
+#     STATS_SNAPSHOT_URI         defaults to MONGO_URI
+#     STATS_SNAPSHOT_DB          'stats'
+#     STATS_SNAPSHOT_COLLECTION  'spider_stats_snapshots'
+#
+# STORAGE_BACKEND (see storage.py) applies here too.
+
+import datetime
+
+from bson.errors import InvalidDocument
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from fifa_market_analysis.storage import open_client, storage_options
+
+
+class StatsSnapshots(object):
+
+    def __init__(self, stats, interval, mongo_uri, mongo_db, mongo_collection, storage=None):
+        self.stats = stats
+        self.storage = storage or dict()
+        self.interval = interval
+        self.mongo_uri = mongo_uri
+        self.mongo_db = mongo_db
+        self.mongo_collection = mongo_collection
+        self.loop = None
+        self.last_stats = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+
+        settings = crawler.settings
+        if not settings.getbool('STATS_SNAPSHOT_ENABLED', False):
+            raise NotConfigured
+
+        extension = cls(
+            stats=crawler.stats,
+            interval=settings.getfloat('STATS_SNAPSHOT_INTERVAL', 60.0),
+            mongo_uri=settings.get('STATS_SNAPSHOT_URI') or settings.get('MONGO_URI'),
+            mongo_db=settings.get('STATS_SNAPSHOT_DB', 'stats'),
+            mongo_collection=settings.get('STATS_SNAPSHOT_COLLECTION', 'spider_stats_snapshots'),
+            storage=storage_options(settings)
+        )
+
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+
+        return extension
+
+    def spider_opened(self, spider):
+
+        self.spider = spider
+        self.client = open_client(self.mongo_uri, **self.storage)
+        self.collection = self.client[self.mongo_db][self.mongo_collection]
+        self.collection.create_index([('spider_name', ASCENDING), ('timestamp', ASCENDING)])
+
+        self.loop = task.LoopingCall(self.snapshot)
+        self.loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+
+        if self.loop is not None and self.loop.running:
+            self.loop.stop()
+        self.snapshot(reason=reason)
+        self.client.close()
+
+    def snapshot(self, reason=None):
+
+        """
+        Inserts the current stats unless nothing changed since the last snapshot. The closing snapshot is always
+        written and carries the finish reason.
+        """
+
+        stats = self.stats.get_stats()
+        if reason is None and stats == self.last_stats:
+            return
+        self.last_stats = dict(stats)
+
+        start_time = stats.get('start_time')
+        if start_time is not None and start_time.tzinfo is not None:
+            now = datetime.datetime.now(start_time.tzinfo)
+        else:
+            now = datetime.datetime.utcnow()
+        document = {
+            'spider_name': self.spider.name,
+            'start_time': start_time,
+            'timestamp': now,
+            'elapsed_seconds': (now - start_time).total_seconds() if start_time else None,
+            'finish_reason': reason,
+            'stats': [[key, value] for key, value in sorted(self.last_stats.items())],
+        }
+
+        try:
+            self.collection.insert_one(document)
+        except (PyMongoError, InvalidDocument) as exception:
+            # Losing one snapshot is fine; the loop must keep running.
+            self.spider.logger.warning(f'Could not write a stats snapshot: {exception!r}')
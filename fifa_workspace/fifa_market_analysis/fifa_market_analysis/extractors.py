@@ -0,0 +1,624 @@
+# -*- coding: utf-8 -*-
+
+# Single-pass extraction engine for sofifa pages.
+#
+# The spiders historically issued one XPath query per item field. Many of those queries use the following:: and
+# preceding:: axes and therefore rescan the whole document. The engine below walks the lxml tree exactly once,
+# records the handful of anchors the fields depend on, and then resolves every field with bisects over the flat
+# arrays it built. The raw strings it returns are the same strings the XPath queries would have returned, so the
+# existing item processors are applied unchanged via ItemLoader.add_value().
+
+from bisect import bisect_right
+from lxml import etree
+
+
+PROFILE_LABELS = {
+    'Preferred Foot': 'preferred_foot',
+    'International Reputation': 'international_reputation',
+    'Weak Foot': 'weak_foot',
+    'Skill Moves': 'skill_moves',
+    'Position': ('club_position', 'team_position'),
+    'Jersey Number': ('club_jersey_number', 'team_jersey_number'),
+    'Joined': 'club_join_date',
+    'Contract Valid Until': 'club_contract_end_date',
+}
+
+PROFILE_SPAN_LABELS = {
+    'Work Rate': 'work_rate',
+    'Body Type': 'body_type',
+    'Real Face': 'real_face',
+    'Release Clause': 'release_clause',
+}
+
+ATTRIBUTE_LABELS = {
+    'Crossing': 'crossing',
+    'Finishing': 'finishing',
+    'Heading Accuracy': 'heading_accuracy',
+    'Short Passing': 'short_passing',
+    'Volleys': 'volleys',
+    'Aggression': 'aggression',
+    'Interceptions': 'interceptions',
+    'Positioning': 'positioning',
+    'Vision': 'vision',
+    'Penalties': 'penalties',
+    'Dribbling': 'dribbling',
+    'Curve': 'curve',
+    'FK Accuracy': 'fk_accuracy',
+    'Long Passing': 'long_passing',
+    'Ball Control': 'ball_control',
+    'Marking': 'marking',
+    'Standing Tackle': 'standing_tackle',
+    'Sliding Tackle': 'sliding_tackle',
+    'Acceleration': 'acceleration',
+    'Sprint Speed': 'sprint_speed',
+    'Agility': 'agility',
+    'Reactions': 'reactions',
+    'Balance': 'balance',
+    'Shot Power': 'shot_power',
+    'Jumping': 'jumping',
+    'Stamina': 'stamina',
+    'Strength': 'strength',
+    'Long Shots': 'long_shots',
+}
+
+INLINE_ATTRIBUTE_LABELS = {
+    'Composure': 'composure',
+    'GK Diving': 'gk_diving',
+    'GK Handling': 'gk_handling',
+    'GK Kicking': 'gk_kicking',
+    'GK Positioning': 'gk_positioning',
+    'GK Reflexes': 'gk_reflexes',
+}
+
+POSITIONS = (
+    'LS', 'ST', 'RS', 'LW', 'LF', 'CF', 'RF', 'RW', 'LAM', 'CAM', 'RAM', 'LM', 'LCM',
+    'CM', 'RCM', 'RM', 'LWB', 'LDM', 'CDM', 'RDM', 'RWB', 'LB', 'LCB', 'CB', 'RCB', 'RB',
+)
+
+POSITION_INDEX = {position: index for index, position in enumerate(POSITIONS)}
+
+OUTFIELD_POINTS = ('PAC', 'SHO', 'PAS', 'DRI', 'DEF', 'PHY')
+GOALKEEPER_POINTS = ('DIV', 'HAN', 'KIC', 'REF', 'SPD', 'POS')
+
+COMMUNITY_NEEDLES = (('Follow', 'followers'), ('Like', 'likes'), ('Dislike', 'dislikes'))
+
+# Longest string value that needs to be compared exactly (span labels and position codes). Longer values are only
+# tracked as "too long", which keeps the string-value bookkeeping O(1) per node.
+_STRING_VALUE_CAP = max(len(label) for label in list(ATTRIBUTE_LABELS) + list(POSITIONS))
+
+
+def child_texts(element):
+
+    """
+    Returns the text() children of an element in document order.
+    """
+
+    texts = [element.text] if element.text is not None else []
+    texts.extend(child.tail for child in element if child.tail is not None)
+    return texts
+
+
+def first_child_text(element):
+
+    """
+    Returns the first text() child of an element, which is what XPath 1.0 uses for contains(text(), ...).
+    """
+
+    if element.text is not None:
+        return element.text
+    for child in element:
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+def text_after(element):
+
+    """
+    Returns the first text node after the end of an element, i.e. (element/following::text())[1].
+    """
+
+    while element is not None:
+        if element.tail is not None:
+            return element.tail
+        for sibling in element.itersiblings():
+            if isinstance(sibling.tag, str):
+                for text in sibling.itertext(tag=etree.Element):
+                    return text
+            if sibling.tail is not None:
+                return sibling.tail
+        element = element.getparent()
+    return None
+
+
+def position_grid(root):
+
+    """
+    Reads the positional rating grid in one pass over the page's div elements.
+
+    :param root: lxml root of a player page
+    :return: the 26 raw rating cells in POSITIONS order ('' where a position is missing), or None if the page has
+             no grid (goalkeepers)
+    """
+
+    cells = dict()
+
+    for div in root.iter('div'):
+        code = div.text
+        if code in POSITION_INDEX and code not in cells and len(div) == 0:
+            parent = div.getparent()
+            if parent is not None:
+                cells[code] = text_after(next(parent.iterchildren('div')))
+
+    if not cells:
+        return None
+    return [cells.get(position) or '' for position in POSITIONS]
+
+
+def position_grid_xpath(selector):
+
+    """
+    The original per position queries position_grid() replaces, one XPath per position, for the legacy extraction
+    path and the equivalence check.
+
+    :param selector: a player page response or its selector
+    :return: the same as position_grid()
+    """
+
+    cells = [selector.xpath(f"(.//div[../div='{position}']/following::text())[1]").get() for position in POSITIONS]
+    if not any(cell is not None for cell in cells):
+        return None
+    return [cell or '' for cell in cells]
+
+
+class _Frame(object):
+
+    __slots__ = ('element', 'tag', 'start', 'last', 'string_value', 'col_4_count', 'first_div_last',
+                 'is_operation_link')
+
+    def __init__(self, element, tag, start):
+        self.element = element
+        self.tag = tag
+        self.start = start
+        self.last = start
+        self.string_value = ''
+        self.col_4_count = 0
+        self.first_div_last = None
+        self.is_operation_link = False
+
+
+class PlayerPageExtractor(object):
+
+    """
+    Extracts every SofifaItem field of a player page in one walk of the lxml tree.
+
+    The returned dict maps field names to the list of raw strings the legacy add_xpath() call for that field would
+    have produced. Feed it to an ItemLoader with add_value() so the item processors stay the single source of truth.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+        # Flat, document ordered arrays of every text node.
+        self.text_pos = list()
+        self.text_value = list()
+        self.text_parent_tag = list()
+        self.text_parent_start = list()
+
+        # Element starts that fields look up with following::tag[1].
+        self.span_pos = list()
+        self.span_element = list()
+        self.link_pos = list()
+        self.link_element = list()
+
+        self.labels = dict()
+        self.span_label_anchors = dict()
+        self.attribute_parents = dict()
+        self.inline_labels = dict()
+        self.position_anchors = dict()
+        self.community_anchors = dict()
+        self.needles = {'Value': list(), 'Wage': list(), 'Potential': list(), 'Overall Rating': list()}
+        self.stats_columns = list()
+
+        self.info_h1 = list()
+        self.meta = list()
+        self.specialities = list()
+        self.club_columns = list()
+        self.club_name_texts = list()
+        self.rating_scripts = list()
+        self.traits_headers = list()
+        self.face_images = list()
+        self.club_logo_images = list()
+
+    @classmethod
+    def from_response(cls, response):
+        extractor = cls(response.selector.root)
+        extractor.walk()
+        return extractor
+
+    def walk(self):
+
+        stack = list()
+        pos = 0
+        pl_depth = 0
+        wrapper_depth = 0
+
+        for event, element in etree.iterwalk(self.root, events=('start', 'end')):
+
+            tag = element.tag
+
+            if event == 'start':
+
+                pos += 1
+
+                if not isinstance(tag, str):
+                    # Comments and processing instructions: only their tail is a text node.
+                    stack.append(_Frame(element, None, pos))
+                    continue
+
+                frame = _Frame(element, tag, pos)
+                parent = stack[-1] if stack else None
+                css_class = element.get('class')
+
+                if tag == 'span':
+                    self.span_pos.append(pos)
+                    self.span_element.append(element)
+
+                elif tag == 'a':
+                    self.link_pos.append(pos)
+                    self.link_element.append(element)
+                    if parent is not None and parent.tag == 'div' and parent.element.get('class') == 'operation mt-2':
+                        frame.is_operation_link = True
+
+                elif tag == 'div':
+                    if css_class == 'column col-4 text-center':
+                        self.stats_columns.append(frame)
+                    elif css_class == 'column col-4' and parent is not None:
+                        parent.col_4_count += 1
+                        if parent.col_4_count in (3, 4):
+                            self.club_columns.append((parent.col_4_count, element))
+                    elif css_class == 'meta':
+                        self.meta.append(element)
+                    elif css_class == 'mt-2':
+                        self.specialities.append(element)
+                    elif css_class == 'wrapper':
+                        wrapper_depth += 1
+
+                elif tag == 'h1':
+                    if parent is not None and parent.tag == 'div' and parent.element.get('class') == 'info':
+                        self.info_h1.append(element)
+
+                elif tag == 'ul':
+                    if css_class == 'pl':
+                        pl_depth += 1
+
+                elif tag == 'li':
+                    text = first_child_text(element)
+                    if text is not None:
+                        for label, field in INLINE_ATTRIBUTE_LABELS.items():
+                            if label in text:
+                                self.inline_labels.setdefault(field, list()).append(element)
+
+                elif tag == 'script':
+                    if wrapper_depth:
+                        text = first_child_text(element)
+                        if text is not None and 'var overallRating' in text:
+                            self.rating_scripts.append(element)
+
+                elif tag == 'h5':
+                    if 'Traits' in child_texts(element):
+                        self.traits_headers.append(element)
+
+                elif tag == 'img':
+                    self._check_image(element, stack)
+
+                stack.append(frame)
+
+                if element.text is not None:
+                    pos += 1
+                    self._add_text(pos, element.text, frame, pl_depth)
+
+            else:
+
+                frame = stack.pop()
+                frame.last = last = pos
+                parent = stack[-1] if stack else None
+                tag = frame.tag
+
+                if tag is not None:
+
+                    if tag == 'label':
+                        for text in child_texts(frame.element):
+                            if text in PROFILE_LABELS:
+                                self.labels.setdefault(text, list()).append(last)
+                            elif text in PROFILE_SPAN_LABELS:
+                                self.span_label_anchors.setdefault(text, list()).append(last)
+                            elif text == 'Loaned From':
+                                self.labels.setdefault(text, list()).append(last)
+
+                    elif tag == 'span':
+                        label = frame.string_value
+                        if label in ATTRIBUTE_LABELS and parent is not None:
+                            self.attribute_parents.setdefault(label, list()).append(parent.element)
+
+                    elif tag == 'div':
+                        if parent is not None and parent.first_div_last is None:
+                            parent.first_div_last = last
+                        if frame.string_value in POSITIONS and parent is not None:
+                            self.position_anchors.setdefault(frame.string_value, parent.first_div_last)
+                        if frame.element.get('class') == 'wrapper':
+                            wrapper_depth -= 1
+
+                    elif tag == 'ul':
+                        if frame.element.get('class') == 'pl':
+                            pl_depth -= 1
+
+                    if parent is not None and parent.string_value is not None:
+                        if frame.string_value is None:
+                            parent.string_value = None
+                        else:
+                            parent.string_value = self._cap(parent.string_value + frame.string_value)
+
+                tail = frame.element.tail
+                if tail is not None and parent is not None:
+                    pos += 1
+                    self._add_text(pos, tail, parent, pl_depth)
+
+        return self
+
+    @staticmethod
+    def _cap(value):
+        return value if len(value) <= _STRING_VALUE_CAP else None
+
+    def _add_text(self, pos, text, parent, pl_depth):
+
+        self.text_pos.append(pos)
+        self.text_value.append(text)
+        self.text_parent_tag.append(parent.tag)
+        self.text_parent_start.append(parent.start)
+
+        if parent.string_value is not None:
+            parent.string_value = self._cap(parent.string_value + text)
+
+        for needle, positions in self.needles.items():
+            if needle in text:
+                positions.append(pos)
+
+        if parent.is_operation_link:
+            for needle, field in COMMUNITY_NEEDLES:
+                if needle in text:
+                    self.community_anchors.setdefault(field, pos)
+
+        if pl_depth and parent.tag == 'a':
+            self.club_name_texts.append(text)
+
+    def _check_image(self, element, stack):
+
+        data_src = element.get('data-src')
+        if data_src is None or len(stack) < 4:
+            return
+
+        tags = (stack[-1].tag, stack[-2].tag, stack[-3].tag, stack[-4].tag)
+        if tags == ('div', 'article', 'div', 'div'):
+            self.face_images.append(data_src)
+        elif tags == ('figure', 'li', 'ul', 'div'):
+            self.club_logo_images.append(data_src)
+
+    # RESOLUTION HELPERS
+
+    def first_text_after(self, pos):
+        index = bisect_right(self.text_pos, pos)
+        if index < len(self.text_pos):
+            return self.text_value[index]
+        return None
+
+    def first_span_text_after(self, pos):
+        for index in range(bisect_right(self.text_pos, pos), len(self.text_pos)):
+            if self.text_parent_tag[index] == 'span' and self.text_parent_start[index] > pos:
+                return self.text_value[index]
+        return None
+
+    def first_span_after(self, pos):
+        index = bisect_right(self.span_pos, pos)
+        if index < len(self.span_pos):
+            return index
+        return None
+
+    def first_link_after(self, pos):
+        index = bisect_right(self.link_pos, pos)
+        if index < len(self.link_pos):
+            return self.link_element[index]
+        return None
+
+    # FIELDS
+
+    def extract(self):
+
+        fields = dict()
+
+        def put(field, values):
+            values = [value for value in values if value is not None]
+            if values:
+                fields[field] = values
+
+        # GENERAL PLAYER INFORMATION
+
+        info = [text for h1 in self.info_h1 for text in child_texts(h1)]
+        put('id', info)
+        put('name', info)
+
+        meta_texts = list()
+        meta_last_texts = list()
+        positions = list()
+        for meta in self.meta:
+            texts = child_texts(meta)
+            meta_texts.extend(texts)
+            if len(texts) > 1:
+                meta_last_texts.append(texts[-1])
+            for child in meta:
+                if child.tag == 'a':
+                    title = child.get('title')
+                    if title is not None:
+                        fields.setdefault('nationality', list()).append(title)
+                    for img in child:
+                        if img.tag == 'img' and img.get('data-src') is not None:
+                            fields.setdefault('flag_img', list()).append(img.get('data-src'))
+                elif child.tag == 'span':
+                    positions.extend(child_texts(child))
+
+        put('full_name', meta_texts)
+        for field in ('age', 'dob', 'height', 'weight'):
+            put(field, meta_last_texts)
+        put('positions', positions)
+
+        # GENERAL PLAYER STATS AND CLUB/TEAM INFORMATION
+
+        for label, field in PROFILE_LABELS.items():
+            anchors = self.labels.get(label, [])
+            if isinstance(field, tuple):
+                for name, anchor in zip(field, anchors):
+                    put(name, [self.first_text_after(anchor)])
+            elif anchors:
+                if field in ('club_join_date', 'club_contract_end_date'):
+                    put(field, [self.first_text_after(anchor) for anchor in anchors])
+                else:
+                    put(field, [self.first_text_after(anchors[0])])
+
+        for label, field in PROFILE_SPAN_LABELS.items():
+            anchors = self.span_label_anchors.get(label)
+            if anchors:
+                put(field, [self.first_span_text_after(anchors[0])])
+
+        loaned_from = list()
+        for anchor in self.labels.get('Loaned From', []):
+            link = self.first_link_after(anchor)
+            if link is not None:
+                loaned_from.extend(child_texts(link))
+        put('loaned_from', loaned_from)
+
+        if self.stats_columns:
+            first_column_last = self.stats_columns[0].last
+            for needle, field in (('Value', 'value'), ('Wage', 'wage'), ('Potential', 'potential_rating')):
+                put(field, self._span_texts_following(
+                    [pos for pos in self.needles[needle] if pos > first_column_last]))
+
+            last_column_start = self.stats_columns[-1].start
+            overall = [pos for pos in self.needles['Overall Rating'] if pos < last_column_start]
+            if len(overall) > 1:
+                put('overall_rating', self._span_texts_following(overall[1:2]))
+
+        put('club_name', self.club_name_texts[:1])
+        put('team_name', self.club_name_texts[1:2])
+
+        for number, column in self.club_columns:
+            field = 'club_rating' if number == 3 else 'team_rating'
+            ratings = list()
+            for ul in column:
+                if ul.tag != 'ul':
+                    continue
+                items = [li for li in ul if li.tag == 'li']
+                if len(items) > 1:
+                    for span in items[1]:
+                        if span.tag == 'span':
+                            ratings.extend(child_texts(span))
+            if ratings:
+                fields.setdefault(field, list()).extend(ratings)
+
+        # PLAYER GAME STATS
+
+        put('unique_attributes', [text for div in self.specialities for a in div if a.tag == 'a'
+                                  for text in child_texts(a)])
+
+        points = GOALKEEPER_POINTS if 'GK' in positions else OUTFIELD_POINTS
+        scripts = [text for script in self.rating_scripts for text in child_texts(script)]
+        for point in points:
+            put(point, scripts)
+
+        # PLAYER DETAILED STATS
+
+        for label, field in ATTRIBUTE_LABELS.items():
+            parents = self.attribute_parents.get(label)
+            if parents:
+                put(field, [self._first_span_child_text(parents[0])])
+
+        for field, items in self.inline_labels.items():
+            put(field, [text for li in items for span in li if span.tag == 'span' for text in child_texts(span)])
+
+        traits = list()
+        for header in self.traits_headers:
+            for ul in header.itersiblings():
+                if ul.tag != 'ul':
+                    continue
+                for li in ul:
+                    if li.tag != 'li':
+                        continue
+                    for span in li:
+                        if span.tag == 'span':
+                            traits.extend(child_texts(span))
+        put('traits', traits)
+
+        # PLAYER REAL OVERALL RATING (POSITIONAL STATS)
+
+        if self.position_anchors:
+            grid = list()
+            for position in POSITIONS:
+                anchor = self.position_anchors.get(position)
+                grid.append((self.first_text_after(anchor) or '') if anchor is not None else '')
+            put('position_ratings', grid)
+            put('position_boost', grid)
+
+        # COMMUNITY INFORMATION
+
+        for field, anchor in self.community_anchors.items():
+            put(field, self._span_texts_following([anchor]))
+
+        # MEDIA
+
+        put('face_img', self.face_images)
+        put('club_logo_img', self.club_logo_images[:1])
+        put('team_logo_img', self.club_logo_images[1:2])
+
+        return fields
+
+    def _span_texts_following(self, anchors):
+
+        """
+        Resolves `text()[...]/following::span[1]/text()` for a set of anchor text nodes.
+        """
+
+        spans = sorted({self.first_span_after(anchor) for anchor in anchors} - {None})
+        return [text for index in spans for text in child_texts(self.span_element[index])]
+
+    @staticmethod
+    def _first_span_child_text(parent):
+        for span in parent:
+            if span.tag == 'span':
+                text = first_child_text(span)
+                if text is not None:
+                    return text
+        return None
+
+
+def extract_player(response):
+
+    """
+    :param response: player page response
+    :return: dict of field name to raw extracted strings, ready for ItemLoader.add_value()
+    """
+
+    return PlayerPageExtractor.from_response(response).extract()
+
+
+def compare_items(expected, actual):
+
+    """
+    :param expected: item produced by the legacy XPath path
+    :param actual: item produced by the single-pass engine
+    :return: sorted list of (field, expected value, actual value) for every field that differs
+    """
+
+    differences = list()
+    for field in set(expected.keys()) | set(actual.keys()):
+        if expected.get(field) != actual.get(field):
+            differences.append((field, expected.get(field), actual.get(field)))
+    return sorted(differences, key=lambda difference: difference[0])
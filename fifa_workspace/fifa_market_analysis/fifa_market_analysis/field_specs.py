@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+
+# Declarative field specs for the club and national team detail pages and the listing tables.
+#
+# Every XPath below is compiled exactly once per process into an lxml.etree.XPath object. The spiders load their
+# items from a FieldSpecTable instead of rebuilding ~50 add_xpath() strings per response, and FieldSpecTable.profile()
+# gives a single place to measure and tune the slow expressions.
+#
+# The listing pages (60 rows of players or teams) are loaded by a ListingTable, which evaluates one XPath per column
+# over the whole table and zips the columns back into one item per row.
+
+import time
+from lxml import etree
+from scrapy.loader import ItemLoader
+from scrapy.loader.processors import Identity
+from scrapy.utils.misc import arg_to_iter
+from fifa_market_analysis.extractors import compare_items
+from fifa_market_analysis.items import (DetailedTeamStatItem, NationalTeamDetailedStats, MainPageItem, TeamStatItem,
+                                        NationalTeamStats)
+
+
+def compile_xpath(expression):
+    return etree.XPath(expression, smart_strings=False)
+
+
+TEAM_XPATHS = {
+
+    # GENERAL CLUB INFORMATION
+
+    'id': ".//div[@class='info']/h1/text()",
+    'club_name': ".//div[@class='info']/h1/text()",
+    'team_name': ".//div[@class='info']/h1/text()",
+    'division': ".//div[@class='meta']//a[last()]/text()",
+    'club_logo': ".//div[@class='card card-border player fixed-width']/img/@data-src",
+    'team_logo': ".//div[@class='card card-border player fixed-width']/img/@data-src",
+    'flag': ".//div[@class='meta']//a[last()-1]//img/@data-src",
+
+    # GENERAL TEAM STATS
+
+    'overall': "(.//div[@class='column col-4 text-center']"
+               "/preceding::text()[contains(.,'Overall')])[2]/following::span[1]/text()",
+    'attack': "(.//div[@class='column col-4 text-center']"
+              "/preceding::text()[contains(.,'Attack')])[2]/following::span[1]/text()",
+    'midfield': "(.//div[@class='column col-4 text-center']"
+                "/preceding::text()[contains(.,'Midfield')])[2]/following::span[1]/text()",
+    'defence': "(.//div[@class='column col-4 text-center']"
+               "/following::text()[contains(.,'Defence')])[1]/following::span[1]/text()",
+
+    # DETAILED TEAM STATS
+
+    'home_stadium': ".//div[@class='column col-6']//following::label[contains(., 'Home Stadium')]"
+                    "/following::text()[1]",
+    'rival_team': ".//div[@class='column col-6']//following::label[contains(., 'Rival Team')]/following::a[1]/text()",
+    'international_prestige': ".//div[@class='column col-6']//following::label[contains(., 'International Prestige')]"
+                              "/following::span[1]/text()",
+    'domestic_prestige': ".//div[@class='column col-6']//following::label[contains(., 'Domestic Prestige')]"
+                         "/following::span[1]/text()",
+    'transfer_budget': ".//div[@class='column col-6']//following::label[contains(., 'Transfer Budget')]"
+                       "/following::text()[1]",
+    'starting_xi_average_age': ".//div[@class='column col-6']"
+                               "//following::label[contains(., 'Starting XI Average Age')]/following::text()[1]",
+    'whole_team_average_age': ".//div[@class='column col-6']"
+                              "//following::label[contains(., 'Whole Team Average Age')]/following::text()[1]",
+    'captain': ".//div[@class='column col-6']//following::label[contains(., 'Captain')]/following::a[1]/@href",
+    'short_free_kick': ".//div[@class='column col-6']//following::label[text()='Short Free Kick']"
+                       "/following::a[1]/@href",
+    'long_free_kick': ".//div[@class='column col-6']//following::label[text()='Long Free Kick']/following::a[1]/@href",
+    'left_short_free_kick': ".//div[@class='column col-6']//following::label[text()='Left Short Free Kick']"
+                            "/following::a[1]/@href",
+    'right_short_free_kick': ".//div[@class='column col-6']//following::label[text()='Right Short Free Kick']"
+                             "/following::a[1]/@href",
+    'penalties': ".//div[@class='column col-6']//following::label[text()='Penalties']/following::a[1]/@href",
+    'left_corner': ".//div[@class='column col-6']//following::label[text()='Left Corner']/following::a[1]/@href",
+    'right_corner': ".//div[@class='column col-6']//following::label[text()='Right Corner']/following::a[1]/@href",
+    'starting_xi': ".//div[@class='field-player']/a/@href",
+
+    # TACTICS
+
+    'defence_defensive_style': ".//dl//span/preceding::dd[text()='Defensive Style']/span/span/text()",
+    'defence_team_width': "(.//dl//span/preceding::span[text()='Team Width']/following::div/meter)[1]/@value",
+    'defence_depth': "(.//dl//span/preceding::span[text()='Depth']/following::div/meter)[1]/@value",
+    'offense_offensive_style': ".//dl//span/preceding::dd[text()='Offensive Style']/span/span/text()",
+    'offense_width': "(.//dl//span/preceding::span[text()='Width']/following::div/meter)[1]/@value",
+    'offense_players_in_box': "(.//dl//span/preceding::span[text()='Players in box']/following::div/meter)[1]"
+                              "/@value",
+    'offense_corners': "(.//dl//span/preceding::span[text()='Corners']/following::div/meter)[1]/@value",
+    'offense_free_kicks': "(.//dl//span/preceding::span[text()='Free Kicks']/following::div/meter)[1]/@value",
+    # Only the first following span text is ever kept (Identity/TakeFirst), so stop at it instead of collecting the
+    # text of every span after the label.
+    'build_up_play_speed': "(.//dl//span/preceding::span[text()='Speed']/following::span/text())[1]",
+    'build_up_play_dribbling': "(.//dl//span/preceding::dd[text()='Dribbling']//span)[1]/span/text()",
+    'build_up_play_passing': "(.//dl//span/preceding::span[text()='Passing']/following::span)[1]/span/text()",
+    'build_up_play_positioning': "(.//dl//span/preceding::span[text()='Positioning'])[1]/following::span[1]/text()",
+    'chance_creation_passing': "(.//dl//span/preceding::span[text()='Shooting']/following::span)[1]/span/text()",
+    'chance_creation_crossing': "(.//dl//span/preceding::span[text()='Crossing']/following::span)[1]/span/text()",
+    'chance_creation_shooting': "(.//dl//span/preceding::span[text()='Shooting']/following::span)[1]/span/text()",
+    'chance_creation_positioning': "(.//dl//span/preceding::span[text()='Positioning'])[2]"
+                                   "/following::span[1]/text()",
+    'defence_extra_pressure': "(.//dl//span/preceding::span[text()='Pressure']/following::span)[1]/span/text()",
+    'defence_extra_aggression': "(.//dl//span/preceding::span[text()='Aggression']/following::span)[1]/span/text()",
+    'defence_extra_team_width': "(.//span[text()='Team Width'])[2]/following::span[1]/span/text()",
+    'defence_extra_defender_line': "(.//span[text()='Defender Line']/following::span/text())[1]",
+
+    # PLAYERS
+
+    'squad': "(.//table)[1]/tbody/tr//a[contains(@href, '/player/')]/@href",
+    'on_loan': "(.//table)[2]/tbody/tr//a[contains(@href, '/player/')]/@href",
+
+    # MEDIA
+
+    'kits': ".//div[@class='column col-sm-5 text-center']//img/@src",
+
+    # COMMUNITY
+
+    'likes': ".//div[@class='operation mt-2']/a/text()[contains(.,'Like')]/following::span[1]/text()",
+    'dislikes': ".//div[@class='operation mt-2']/a/text()[contains(.,'Dislike')]/following::span[1]/text()",
+}
+
+COMPILED_TEAM_XPATHS = {field: compile_xpath(expression) for field, expression in TEAM_XPATHS.items()}
+
+
+class FieldSpec(object):
+
+    """
+    A field name, its compiled XPath and the loader processors declared for it on the Item class.
+    """
+
+    __slots__ = ('name', 'xpath', 'input_processor', 'output_processor')
+
+    def __init__(self, name, xpath, input_processor, output_processor):
+        self.name = name
+        self.xpath = xpath
+        self.input_processor = input_processor
+        self.output_processor = output_processor
+
+    def extract(self, root):
+        return self.xpath(root)
+
+    def process(self, values):
+
+        """
+        Mirrors ItemLoader.add_value() followed by load_item() for a single field.
+        """
+
+        values = arg_to_iter(self.input_processor(values))
+        if not values:
+            return None
+        return self.output_processor(values)
+
+
+class FieldSpecTable(object):
+
+    """
+    The field specs one Item class is loaded from. Processors come from the Item fields so items.py stays the single
+    definition of how raw text becomes a value.
+    """
+
+    def __init__(self, item_class, fields, xpaths=COMPILED_TEAM_XPATHS):
+        self.item_class = item_class
+        self.specs = list()
+
+        for name in fields:
+            field = item_class.fields[name]
+            self.specs.append(FieldSpec(name, xpaths[name], field.get('input_processor', Identity()),
+                                        field.get('output_processor', Identity())))
+
+    def load_item(self, response):
+
+        item = self.item_class()
+        root = response.selector.root
+
+        for spec in self.specs:
+            values = spec.extract(root)
+            if not values:
+                continue
+            value = spec.process(values)
+            if value is not None:
+                item[spec.name] = value
+
+        return item
+
+    def profile(self, response, repeat=100):
+
+        """
+        :param response: a saved detail page response
+        :param repeat: number of evaluations per field
+        :return: list of (field, xpath seconds, processor seconds) per evaluation, slowest XPath first
+        """
+
+        root = response.selector.root
+        timings = list()
+
+        for spec in self.specs:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                values = spec.extract(root)
+            extracted = time.perf_counter()
+            if values:
+                for _ in range(repeat):
+                    spec.process(values)
+            processed = time.perf_counter()
+            timings.append((spec.name, (extracted - start) / repeat, (processed - extracted) / repeat))
+
+        return sorted(timings, key=lambda timing: timing[1], reverse=True)
+
+
+SHARED_DETAIL_FIELDS = (
+    'flag', 'overall', 'attack', 'midfield', 'defence', 'home_stadium', 'rival_team', 'international_prestige',
+    'starting_xi_average_age', 'whole_team_average_age', 'captain', 'short_free_kick', 'long_free_kick',
+    'left_short_free_kick', 'right_short_free_kick', 'penalties', 'left_corner', 'right_corner', 'starting_xi',
+    'defence_defensive_style', 'defence_team_width', 'defence_depth', 'offense_offensive_style', 'offense_width',
+    'offense_players_in_box', 'offense_corners', 'offense_free_kicks', 'build_up_play_speed',
+    'build_up_play_dribbling', 'build_up_play_passing', 'build_up_play_positioning', 'chance_creation_passing',
+    'chance_creation_crossing', 'chance_creation_shooting', 'chance_creation_positioning', 'defence_extra_pressure',
+    'defence_extra_aggression', 'defence_extra_team_width', 'defence_extra_defender_line', 'squad', 'on_loan', 'kits',
+    'likes', 'dislikes',
+)
+
+CLUB_DETAIL_SPECS = FieldSpecTable(
+    DetailedTeamStatItem,
+    ('id', 'club_name', 'division', 'club_logo', 'domestic_prestige', 'transfer_budget') + SHARED_DETAIL_FIELDS
+)
+
+TEAM_DETAIL_SPECS = FieldSpecTable(
+    NationalTeamDetailedStats,
+    ('id', 'team_name', 'team_logo') + SHARED_DETAIL_FIELDS
+)
+
+
+LISTING_ROWS = "//table[@class='table table-hover persist-area']/tbody/tr"
+
+# Column XPaths relative to a listing row.
+PLAYER_LISTING_XPATHS = {
+    'id': ".//a[contains(@href, 'player/')]/@href",
+    'total_stats': ".//div[@class='col-digit col-tt']/text()",
+    'hits': ".//div[@class='col-comments text-right text-ellipsis rtl']/text()",
+    'comments': ".//div[@class='col-comments text-right text-ellipsis rtl']/text()",
+    'player_page': ".//a[contains(@href, 'player/')]/@href",
+}
+
+TEAM_LISTING_XPATHS = {
+    'id': ".//a[contains(@href, 'team/')]/@href",
+    'nationality': ".//a[contains(@href, 'teams?na')]/text()",
+    'region': ".//a[contains(@href, 'teams?ct')]/text()",
+    'num_players': ".//td[@class='col text-center'][last()]/div/text()",
+    'hits': ".//div[@class='col-comments text-right text-ellipsis rtl']/text()",
+    'comments': ".//div[@class='col-comments text-right text-ellipsis rtl']/text()",
+    'club_page': ".//a[contains(@href, 'team/')]/@href",
+}
+
+
+def column_xpath(expression):
+
+    """
+    :param expression: XPath relative to a row, starting with .//
+    :return: the same column for every row of a tbody
+
+    libxml2 is very slow at `tr//x` over a whole table (it dedups the descendant-or-self step per row), so the leading
+    .// becomes the descendant axis. A positional predicate then counts within the row rather than per parent, which
+    is the same thing for the td cells of a listing row. Evaluated with smart strings, which map every value back to
+    its row.
+    """
+
+    if not expression.startswith('.//'):
+        raise ValueError(f'Listing column XPaths must start with .//, got {expression!r}')
+    return 'tr/descendant::' + expression[3:]
+
+
+def row_of(value, rows):
+
+    """
+    :param value: an element or a smart string returned by a column XPath
+    :param rows: dict of row element to row index
+    :return: index of the listing row the value was found in, None if it is outside the table
+    """
+
+    element = value.getparent() if isinstance(value, etree._ElementUnicodeResult) else value
+    while element is not None:
+        index = rows.get(element)
+        if index is not None:
+            return index
+        element = element.getparent()
+    return None
+
+
+class ListingTable(object):
+
+    """
+    The columns one Item class is loaded from on a listing page.
+
+    A column XPath is the relative expression the row loaders used, evaluated once from the table body over all rows,
+    so `.//td[...][last()]` keeps selecting per row. Its results are smart strings, which know the element they came from, and are grouped
+    back into rows before the field processors run, so a row without a value for a column stays aligned.
+    """
+
+    def __init__(self, item_class, fields, xpaths, rows=LISTING_ROWS):
+        self.item_class = item_class
+        self.row_xpath = rows
+        self.rows = compile_xpath(rows)
+        self.xpaths = {name: xpaths[name] for name in fields}
+        self.specs = list()
+
+        for name in fields:
+            field = item_class.fields[name]
+            column = etree.XPath(column_xpath(xpaths[name]))
+            self.specs.append(FieldSpec(name, column, field.get('input_processor', Identity()),
+                                        field.get('output_processor', Identity())))
+
+    def load_items(self, response):
+
+        rows = {row: index for index, row in enumerate(self.rows(response.selector.root))}
+        # Usually the one tbody of the listing table.
+        bodies = list(dict.fromkeys(row.getparent() for row in rows))
+        items = [self.item_class() for _ in rows]
+
+        for spec in self.specs:
+            columns = [list() for _ in rows]
+            for body in bodies:
+                for value in spec.extract(body):
+                    index = row_of(value, rows)
+                    if index is not None:
+                        columns[index].append(str(value))
+            for item, values in zip(items, columns):
+                if not values:
+                    continue
+                value = spec.process(values)
+                if value is not None:
+                    item[spec.name] = value
+
+        return items
+
+    def load_rows(self, response):
+
+        """
+        Row by row ItemLoader path the listing spiders used before, kept to validate load_items().
+        """
+
+        items = list()
+        for row in response.xpath(self.row_xpath):
+            loader = ItemLoader(item=self.item_class(), selector=row, response=response)
+            for name, expression in self.xpaths.items():
+                loader.add_xpath(name, expression)
+            items.append(loader.load_item())
+        return items
+
+
+PLAYER_LISTING = ListingTable(MainPageItem, ('id', 'total_stats', 'hits', 'comments', 'player_page'),
+                              PLAYER_LISTING_XPATHS)
+
+TEAM_LISTING_FIELDS = ('id', 'nationality', 'region', 'num_players', 'hits', 'comments')
+
+CLUB_LISTING = ListingTable(TeamStatItem, TEAM_LISTING_FIELDS + ('club_page',), TEAM_LISTING_XPATHS)
+
+CLUB_STATS_LISTING = ListingTable(TeamStatItem, TEAM_LISTING_FIELDS, TEAM_LISTING_XPATHS)
+
+TEAM_STATS_LISTING = ListingTable(NationalTeamStats, TEAM_LISTING_FIELDS, TEAM_LISTING_XPATHS)
+
+
+def check_listing(spider, table, response, items):
+
+    """
+    Loads the page again with the row loaders and reports every field that differs from the column extraction,
+    under the same extraction/* stats as the player detail check.
+    """
+
+    expected = table.load_rows(response)
+    differences = list()
+
+    if len(expected) != len(items):
+        differences.append(('(rows)', len(expected), len(items)))
+    for expected_item, item in zip(expected, items):
+        differences.extend(compare_items(expected_item, item))
+
+    for field, row_value, column_value in differences:
+        spider.logger.warning(f'Extraction mismatch on {response.url} for {field}: '
+                              f'rows={row_value!r} columns={column_value!r}')
+        spider.crawler.stats.inc_value(key=f'extraction/mismatch/{field}', count=1, start=0)
+
+    spider.crawler.stats.inc_value(key='extraction/checked', count=1, start=0)
+    if differences:
+        spider.crawler.stats.inc_value(key='extraction/mismatched_pages', count=1, start=0)
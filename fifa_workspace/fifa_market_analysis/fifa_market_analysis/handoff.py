@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+# Pipelined URL and detail crawls in one process.
+#
+# Normally a URL spider (player_pages, club_pages, team_pages) stores its URLs and the detail spider (player_details,
+# club_details, team_details) only starts afterwards, reading them back from Mongo. crawl_pipelined() runs both in one
+# CrawlerProcess instead and hands every URL over through a Frontier as soon as its item has passed the URL spider's
+# pipelines, so the detail crawl starts on the first listing page and the two stages overlap:
+#
+#     python -m fifa_market_analysis.handoff players clubs teams
+#
+# The URL spider still stores its items as usual. With URL_HANDOFF set, url_source.start_requests_from() does not read
+# the URL collection; the detail spider stays open while its URL spider runs and closes once it is done and its own
+# requests are finished. Duplicate URLs are dropped by the detail spider's dupefilter. Each crawler keeps its own
+# download slots, so delays and concurrency limits apply per stage.
+#
+#     handoff/sent        URLs a URL spider handed over
+#     handoff/received    URLs a detail spider scheduled, also added to pages_to_visit
+
+import argparse
+import inspect
+from collections import deque
+
+import scrapy
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.project import get_project_settings
+
+STAGES = {
+    'players': ('player_pages', 'player_details', 'player_page'),
+    'clubs': ('club_pages', 'club_details', 'club_page'),
+    'teams': ('team_pages', 'team_details', 'team_page'),
+}
+
+
+def schedule_request(crawler, request, spider):
+
+    """
+    Hands a request to the engine of a running crawl, which schedules it and wakes up to download it.
+    """
+
+    engine = crawler.engine
+    # spider is optional, and deprecated, from Scrapy 2.6; only older versions require it.
+    parameter = inspect.signature(engine.crawl).parameters.get('spider')
+    if parameter is not None and parameter.default is inspect.Parameter.empty:
+        engine.crawl(request, spider)
+    else:
+        engine.crawl(request)
+
+
+class Frontier(object):
+
+    """
+    URLs on their way from a URL spider to a detail spider, kept until the detail spider has opened.
+    """
+
+    def __init__(self):
+        self.pending = deque()
+        self.consumer = None
+        self.finished = False
+
+    def put(self, url):
+        if self.consumer is None:
+            self.pending.append(url)
+        else:
+            self.consumer(url)
+
+    def subscribe(self, consumer):
+        self.consumer = consumer
+        while self.pending:
+            consumer(self.pending.popleft())
+
+    def finish(self, result=None):
+
+        """
+        Marks the URL spider as done, whether it finished or failed; passes result through as a Deferred callback.
+        """
+
+        self.finished = True
+        return result
+
+
+class Producer(object):
+
+    def __init__(self, crawler, frontier, field):
+        self.crawler = crawler
+        self.frontier = frontier
+        self.field = field
+        # Only the signal holds on to it.
+        crawler.signals.connect(self.item_scraped, signal=signals.item_scraped, weak=False)
+
+    def item_scraped(self, item, response, spider):
+        url = item.get(self.field)
+        if url:
+            self.frontier.put(url)
+            self.crawler.stats.inc_value(key='handoff/sent', count=1, start=0)
+
+
+class Consumer(object):
+
+    def __init__(self, crawler, frontier):
+        self.crawler = crawler
+        self.frontier = frontier
+        self.spider = None
+        # Only the signals hold on to it.
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened, weak=False)
+        crawler.signals.connect(self.spider_idle, signal=signals.spider_idle, weak=False)
+
+    def spider_opened(self, spider):
+        self.spider = spider
+        self.frontier.subscribe(self.schedule)
+
+    def spider_idle(self, spider):
+        if not self.frontier.finished:
+            raise DontCloseSpider
+
+    def schedule(self, url):
+
+        schedule_request(self.crawler, scrapy.Request(url=url, callback=self.spider.parse), self.spider)
+        self.crawler.stats.inc_value(key='handoff/received', count=1, start=0)
+        self.crawler.stats.inc_value(key='pages_to_visit', count=1, start=0)
+
+
+def crawl_pipelined(process, url_spider, detail_spider, field):
+
+    """
+    Schedules a URL spider and its detail spider on process, connected by a Frontier.
+
+    :param field: the URL field of the URL spider's items, e.g. 'player_page'
+    :return: Deferred fired when both crawls are done
+    """
+
+    frontier = Frontier()
+
+    url_crawler = process.create_crawler(url_spider)
+    detail_crawler = process.create_crawler(detail_spider)
+    Producer(url_crawler, frontier, field)
+    Consumer(detail_crawler, frontier)
+
+    detail_done = process.crawl(detail_crawler)
+    process.crawl(url_crawler).addBoth(frontier.finish)
+    return detail_done
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Run URL and detail crawls pipelined in one process.')
+    parser.add_argument('stages', nargs='+', choices=sorted(STAGES))
+    arguments = parser.parse_args()
+
+    settings = get_project_settings()
+    settings.set('URL_HANDOFF', True)
+    process = CrawlerProcess(settings)
+
+    for stage in arguments.stages:
+        crawl_pipelined(process, *STAGES[stage])
+
+    process.start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+# Compressed, content addressed HTTP cache storage with a size budget.
+#
+# Scrapy's FilesystemCacheStorage keeps six uncompressed files in a directory per request and never deletes anything.
+# CompressedCacheStorage keeps, under <HTTPCACHE_DIR>/<spider name>/:
+#
+#     index.sqlite3      one row per request fingerprint: url, status, response headers, body hash, stored and last
+#                        access time; and one row per body: its compressed size and how many entries use it
+#     bodies/ab/<hash>   every distinct response body once, compressed, named by the blake2b hash of the body
+#
+# A lookup is one primary key read in the index and one file read. When the compressed bodies exceed
+# HTTPCACHE_MAX_SIZE, the least recently used entries are evicted until they are 10% under it, and a body goes with
+# its last entry.
+#
+# Response headers are kept, so with HTTPCACHE_POLICY = 'scrapy.extensions.httpcache.RFC2616Policy' stale entries are
+# revalidated with If-None-Match / If-Modified-Since from their ETag and Last-Modified, and a 304 is answered from the
+# cache instead of downloading the page again.
+#
+#     HTTPCACHE_STORAGE = 'fifa_market_analysis.httpcache.CompressedCacheStorage'
+#
+#     HTTPCACHE_MAX_SIZE             compressed bytes kept per spider, 2 GiB; 0 for no limit
+#     HTTPCACHE_COMPRESSION          'zstd' (needs the zstandard package, zlib is used without it) or 'zlib'
+#     HTTPCACHE_COMPRESSION_LEVEL    3 for zstd, 6 for zlib
+#     HTTPCACHE_EXPIRATION_SECS      as for the stock storages, entries older than this are not returned; 0 for never
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries (fingerprint TEXT PRIMARY KEY, url TEXT NOT NULL, status INTEGER NOT NULL, '
+    'headers BLOB NOT NULL, body TEXT NOT NULL, stored REAL NOT NULL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)',
+    'CREATE TABLE IF NOT EXISTS bodies (hash TEXT PRIMARY KEY, size INTEGER NOT NULL, refs INTEGER NOT NULL)',
+)
+
+# Share of HTTPCACHE_MAX_SIZE an eviction frees, so it does not run again on the next store.
+EVICTION_HEADROOM = 0.1
+
+
+class ZlibCodec(object):
+
+    extension = '.zz'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class ZstdCodec(object):
+
+    extension = '.zst'
+
+    def __init__(self, level=3):
+        import zstandard
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def decompress(self, data):
+        return self.decompressor.decompress(data)
+
+
+def make_codec(name, level=None):
+
+    if name == 'zlib':
+        return ZlibCodec(level or 6)
+    if name != 'zstd':
+        raise ValueError(f'Unknown HTTPCACHE_COMPRESSION {name!r}, expected zstd or zlib')
+
+    try:
+        return ZstdCodec(level or 3)
+    except ImportError:
+        logger.warning('HTTPCACHE_COMPRESSION is zstd but zstandard is not installed, compressing with zlib')
+        return ZlibCodec()
+
+
+class CompressedCacheStorage(object):
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.max_size = settings.getint('HTTPCACHE_MAX_SIZE', 2 * 1024 ** 3)
+        self.codec = make_codec(settings.get('HTTPCACHE_COMPRESSION', 'zstd'),
+                                settings.getint('HTTPCACHE_COMPRESSION_LEVEL', 0))
+        self.db = None
+        self.size = 0
+
+    def open_spider(self, spider):
+
+        self.directory = os.path.join(self.cachedir, spider.name)
+        os.makedirs(os.path.join(self.directory, 'bodies'), exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM bodies').fetchone()[0]
+
+        self.stats = spider.crawler.stats
+        # Scrapy < 2.7 has no request fingerprinter.
+        self.fingerprinter = getattr(spider.crawler, 'request_fingerprinter', None)
+
+        logger.debug(f'Using compressed cache storage in {self.directory}, {self.size} bytes cached',
+                     extra={'spider': spider})
+
+    def close_spider(self, spider):
+        self.db.close()
+
+    def fingerprint(self, request):
+        if self.fingerprinter is None:
+            from scrapy.utils.request import request_fingerprint
+            return request_fingerprint(request)
+        return self.fingerprinter.fingerprint(request).hex()
+
+    def body_path(self, digest):
+        return os.path.join(self.directory, 'bodies', digest[:2], digest + self.codec.extension)
+
+    def retrieve_response(self, spider, request):
+
+        """
+        :return: the cached response, or None if the request is not cached or its entry expired
+        """
+
+        fingerprint = self.fingerprint(request)
+        row = self.db.execute('SELECT url, status, headers, body, stored FROM entries WHERE fingerprint = ?',
+                              (fingerprint,)).fetchone()
+        if row is None:
+            return None
+
+        url, status, raw_headers, digest, stored = row
+        now = time.time()
+        if 0 < self.expiration_secs < now - stored:
+            return None
+
+        try:
+            with open(self.body_path(digest), 'rb') as f:
+                body = self.codec.decompress(f.read())
+        except (OSError, zlib.error) as exception:
+            # Written with another HTTPCACHE_COMPRESSION, or removed by hand: treat as a miss and store it again.
+            logger.debug(f'Cached body of {url} is unreadable: {exception!r}', extra={'spider': spider})
+            return None
+
+        self.db.execute('UPDATE entries SET accessed = ? WHERE fingerprint = ?', (now, fingerprint))
+
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        response_class = responsetypes.from_args(headers=headers, url=url, body=body)
+        return response_class(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+
+        fingerprint = self.fingerprint(request)
+        digest = hashlib.blake2b(response.body, digest_size=20).hexdigest()
+        now = time.time()
+
+        self.db.execute('BEGIN')
+        try:
+            row = self.db.execute('SELECT size FROM bodies WHERE hash = ?', (digest,)).fetchone()
+            if row is None:
+                size = self.write_body(digest, response.body)
+                self.db.execute('INSERT INTO bodies (hash, size, refs) VALUES (?, ?, 1)', (digest, size))
+                self.size += size
+            else:
+                self.db.execute('UPDATE bodies SET refs = refs + 1 WHERE hash = ?', (digest,))
+                self.stats.inc_value(key='httpcache/deduplicated', count=1, start=0)
+                if not os.path.exists(self.body_path(digest)):
+                    # Stored with another HTTPCACHE_COMPRESSION.
+                    size = self.write_body(digest, response.body)
+                    self.db.execute('UPDATE bodies SET size = ? WHERE hash = ?', (size, digest))
+                    self.size += size - row[0]
+
+            previous = self.db.execute('SELECT body FROM entries WHERE fingerprint = ?', (fingerprint,)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO entries (fingerprint, url, status, headers, body, stored, '
+                            'accessed) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (fingerprint, response.url, response.status, headers_dict_to_raw(response.headers),
+                             digest, now, now))
+            if previous is not None:
+                self.release_body(previous[0])
+
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+
+        if self.max_size and self.size > self.max_size:
+            self.evict(spider)
+
+    def write_body(self, digest, body):
+
+        """
+        :return: the compressed size
+        """
+
+        path = self.body_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        compressed = self.codec.compress(body)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(compressed)
+        os.replace(temporary, path)
+
+        return len(compressed)
+
+    def release_body(self, digest):
+
+        """
+        Drops one reference to a body, and the body itself with its last one.
+        """
+
+        self.db.execute('UPDATE bodies SET refs = refs - 1 WHERE hash = ?', (digest,))
+        row = self.db.execute('SELECT size FROM bodies WHERE hash = ? AND refs <= 0', (digest,)).fetchone()
+        if row is None:
+            return
+
+        self.db.execute('DELETE FROM bodies WHERE hash = ?', (digest,))
+        self.size -= row[0]
+        try:
+            os.remove(self.body_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, spider):
+
+        """
+        Removes the least recently used entries until the bodies take EVICTION_HEADROOM less than HTTPCACHE_MAX_SIZE.
+        """
+
+        target = self.max_size * (1 - EVICTION_HEADROOM)
+        evicted = 0
+
+        self.db.execute('BEGIN')
+        try:
+            while self.size > target:
+                rows = self.db.execute('SELECT fingerprint, body FROM entries ORDER BY accessed LIMIT 100').fetchall()
+                if not rows:
+                    break
+                for fingerprint, digest in rows:
+                    self.db.execute('DELETE FROM entries WHERE fingerprint = ?', (fingerprint,))
+                    self.release_body(digest)
+                    evicted += 1
+                    if self.size <= target:
+                        break
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+
+        self.stats.inc_value(key='httpcache/evicted', count=evicted, start=0)
+        logger.debug(f'Evicted {evicted} cached responses, {self.size} bytes cached', extra={'spider': spider})
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# Compact set of the ids the pipelines have seen.
+#
+# Player, club and team ids are dense non negative integers, so an IdBitmap stores them as bits, split roaring style
+# into containers of 65536 ids keyed by the high 16 bits. A container is 8 KiB and only exists once one of its ids has
+# been added; all sofifa player ids fit in about five of them.
+#
+# File format (little endian): b'IDBM', uint32 version, uint32 container count, the sorted uint32 container keys, then
+# the 8 KiB containers in the same order. load() maps the file copy-on-write, so startup does not read the containers
+# and adds never touch the file until save() writes a new one.
+
+import mmap
+import os
+import struct
+
+MAGIC = b'IDBM'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+KEY = struct.Struct('<I')
+
+CONTAINER_BITS = 16
+CONTAINER_MASK = (1 << CONTAINER_BITS) - 1
+CONTAINER_BYTES = (1 << CONTAINER_BITS) // 8
+
+
+def count_bits(container):
+    return bin(int.from_bytes(container, 'little')).count('1')
+
+
+class IdBitmap(object):
+
+    """
+    Set of ids supporting `in`, add() and len(). Ids that are not non negative ints (None, strings) are kept in a
+    plain set and are not saved.
+    """
+
+    def __init__(self):
+        self.containers = dict()
+        self.others = set()
+        self.count = 0
+        self.mapped = None
+
+    def __contains__(self, value):
+
+        if type(value) is int and value >= 0:
+            container = self.containers.get(value >> CONTAINER_BITS)
+            if container is None:
+                return False
+            low = value & CONTAINER_MASK
+            return bool(container[low >> 3] & (1 << (low & 7)))
+
+        return value in self.others
+
+    def add(self, value):
+
+        if type(value) is int and value >= 0:
+            key = value >> CONTAINER_BITS
+            container = self.containers.get(key)
+            if container is None:
+                container = self.containers[key] = bytearray(CONTAINER_BYTES)
+            low = value & CONTAINER_MASK
+            bit = 1 << (low & 7)
+            if not container[low >> 3] & bit:
+                container[low >> 3] |= bit
+                self.count += 1
+        else:
+            self.others.add(value)
+
+    def __len__(self):
+        return self.count + len(self.others)
+
+    def save(self, path):
+
+        """
+        Writes the int ids to path through a temporary file, so a crash while saving keeps the previous file.
+        """
+
+        keys = sorted(self.containers)
+        temporary = f'{path}.tmp'
+
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+            for key in keys:
+                f.write(KEY.pack(key))
+            for key in keys:
+                f.write(self.containers[key])
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+
+        """
+        :return: the saved id set, or an empty one when path does not exist
+        """
+
+        bitmap = cls()
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return bitmap
+
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        magic, version, size = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not an id bitmap file')
+
+        keys_start = HEADER.size
+        containers_start = keys_start + size * KEY.size
+        if len(mapped) != containers_start + size * CONTAINER_BYTES:
+            raise ValueError(f'{path} is truncated')
+
+        view = memoryview(mapped)
+        for index in range(size):
+            key, = KEY.unpack_from(mapped, keys_start + index * KEY.size)
+            start = containers_start + index * CONTAINER_BYTES
+            bitmap.containers[key] = view[start:start + CONTAINER_BYTES]
+
+        bitmap.count = sum(count_bits(container) for container in bitmap.containers.values())
+        bitmap.mapped = mapped
+
+        return bitmap
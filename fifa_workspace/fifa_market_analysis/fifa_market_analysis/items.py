@@ -7,129 +7,11 @@
 
 import scrapy
 from scrapy.loader.processors import MapCompose, TakeFirst, Identity, Compose
-import re
-from datetime import datetime
-from urllib.parse import urljoin
-
-
-def convert_currency_format(value):
-
-    """
-    Strips away currency symbol and applies multiplier based on abbreviation (K to 1,000, M to 1,000,000).
-
-    >>> convert_currency_format('€110.5M')
-    >>> 110500000.0
-
-    >>> convert_currency_format('€110K')
-    >>> 110000.0
-
-    >>> convert_currency_format('99.5M')
-    >>> 99500000.0
-
-    >>> convert_currency_format('21')
-    >>> 21.0
-
-    >>> convert_currency_format('€190')
-    >>> 190.0
-
-    >>> convert_currency_format(0)
-    >>> 0.0
-    """
-
-    pattern = r'\W|[0-9.]+|[a-zA-Z]'
-
-    if type(value) is str:
-        if re.findall(pattern, value)[0] == u"\u20ac" and re.findall(pattern, value)[-1] == 'K':
-            new_value = float(re.findall(pattern, value)[1]) * 1000
-            return new_value
-        elif re.findall(pattern, value)[0] == u"\u20ac" and re.findall(pattern, value)[-1] == 'M':
-            new_value = float(re.findall(pattern, value)[1]) * 1000000
-            return new_value
-        elif re.findall(pattern, value)[0] == u"\u20ac" and re.findall(pattern, value)[-1] != ('M' or 'K'):
-            new_value = float(re.findall(pattern, value)[1])
-            return new_value
-        elif re.findall(pattern, value)[0] != u"\u20ac" and re.findall(pattern, value)[-1] != ('M' or 'K'):
-            new_value = float(re.findall(pattern, value)[0])
-            return new_value
-    else:
-        return float(value)
-
-
-def get_id(value):
-
-    pattern = r'ID:\ |[0-9]+'
-    match = re.findall(pattern, value)[-1]
-    return match
-
-
-def get_name(value):
-
-    pattern = r'^[^\(]+'
-    match = re.findall(pattern, value)[0]
-    return match
-
-
-def get_age(value):
-
-    pattern_1 = r'Age\ [0-9]+'
-    match = re.findall(pattern_1, value)[0]
-    pattern_2 = r'[0-9]+'
-    age_in_years = re.findall(pattern_2, match)
-    return age_in_years
-
-
-def get_dob(value):
-
-    pattern = r'[a-zA-Z]+\ [0-9]+,\ [0-9]+'
-    match = re.findall(pattern, value)[0]
-    datetime_dob = datetime.strptime(match, '%b %d, %Y')
-    return datetime_dob
-
-
-def get_height(value):
-
-    pattern_1 = r'[0-9]+\W[0-9]+\W'
-    match = re.findall(pattern_1, value)[0]
-    pattern_2 = r'([0-9]+)'
-    feet = eval(re.findall(pattern_2, match)[0]) * 12
-    inches = eval(re.findall(pattern_2, match)[1])
-    height_in_inches = feet + inches
-    return height_in_inches
-
-
-def get_weight(value):
-
-    pattern_1 = r'[0-9]+lbs'
-    match = re.findall(pattern_1, value)[0]
-    pattern_2 = r'[0-9]+'
-    weight_in_lbs = re.findall(pattern_2, match)
-    return weight_in_lbs
-
-
-def get_date(value):
-
-    try:
-        date = datetime.strptime(value, '%b %d, %Y')
-        return date
-
-    except ValueError:
-        date = datetime.strptime(value, '%Y')
-        return date
-
-
-def player_id_list(value):
-
-    player_list = list()
-    eval_list = list()
-    pattern = r'[0-9]+'
-
-    for player in value:
-        player_list.append(re.findall(pattern, player))
-
-    for i in range(len(player_list)):
-        eval_list.append(eval(player_list[i][0]))
-
-    return eval_list
+from fifa_market_analysis.processors import (convert_currency_format, get_id, get_name, get_club_name, get_age,
+                                             get_dob, get_height, get_weight, get_date, parse_date,
+                                             get_first_int, get_path_id, player_id_list, absolute_url, get_category,
+                                             script_point, count_token, to_int, to_number,
+                                             get_position_ratings, get_position_boost)
 
 
 class SofifaItem(scrapy.Item):
@@ -137,7 +19,7 @@ class SofifaItem(scrapy.Item):
     # GENERAL PLAYER INFORMATION
 
     id = scrapy.Field(
-        input_processor=MapCompose(get_id, eval),
+        input_processor=MapCompose(get_id),
         output_processor=TakeFirst()
     )
 
@@ -152,7 +34,7 @@ class SofifaItem(scrapy.Item):
     )
 
     age = scrapy.Field(
-        input_processor=MapCompose(get_age, eval),
+        input_processor=MapCompose(get_age),
         output_processor=TakeFirst()
     )
 
@@ -166,7 +48,7 @@ class SofifaItem(scrapy.Item):
         output_processor=TakeFirst()
     )
     weight = scrapy.Field(
-        input_processor=MapCompose(get_weight, eval),
+        input_processor=MapCompose(get_weight),
         output_processor=TakeFirst()
     )
 
@@ -183,17 +65,17 @@ class SofifaItem(scrapy.Item):
     )
 
     international_reputation = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     weak_foot = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     skill_moves = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -235,7 +117,7 @@ class SofifaItem(scrapy.Item):
     )
 
     club_rating = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -245,12 +127,12 @@ class SofifaItem(scrapy.Item):
     )
 
     club_jersey_number = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     club_join_date = scrapy.Field(
-        input_processor=MapCompose(lambda x: datetime.strptime(x, '%b %d, %Y')),
+        input_processor=MapCompose(parse_date),
         output_processor=TakeFirst()
     )
 
@@ -270,7 +152,7 @@ class SofifaItem(scrapy.Item):
     )
 
     team_rating = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -280,19 +162,19 @@ class SofifaItem(scrapy.Item):
     )
 
     team_jersey_number = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     # PLAYER GAME STATS
 
     overall_rating = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     potential_rating = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -307,234 +189,234 @@ class SofifaItem(scrapy.Item):
     )
 
     PAC = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointPAC = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('PAC')),
         output_processor=TakeFirst()
     )
 
     SHO = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointSHO = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('SHO')),
         output_processor=TakeFirst()
     )
 
     PAS = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointPAS = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('PAS')),
         output_processor=TakeFirst()
     )
 
     DRI = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointDRI = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('DRI')),
         output_processor=TakeFirst()
     )
 
     DEF = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointDEF = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('DEF')),
         output_processor=TakeFirst()
     )
 
     PHY = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointPHY = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('PHY')),
         output_processor=TakeFirst()
     )
 
     DIV = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointPAC = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('PAC')),
         output_processor=TakeFirst()
     )
 
     HAN = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointSHO = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('SHO')),
         output_processor=TakeFirst()
     )
 
     KIC = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointPAS = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('PAS')),
         output_processor=TakeFirst()
     )
 
     REF = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointDRI = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('DRI')),
         output_processor=TakeFirst()
     )
 
     SPD = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointDEF = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('DEF')),
         output_processor=TakeFirst()
     )
 
     POS = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'pointPHY = ([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(script_point('PHY')),
         output_processor=TakeFirst()
     )
 
     # PLAYER DETAILED STATS
 
     crossing = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     finishing = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     heading_accuracy = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     short_passing = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     volleys = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     aggression = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     interceptions = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     positioning = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     vision = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     penalties = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     composure = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     dribbling = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     curve = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     fk_accuracy = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     long_passing = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     ball_control = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     marking = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     standing_tackle = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     sliding_tackle = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     acceleration = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     sprint_speed = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     agility = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     reactions = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     balance = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     gk_diving = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     gk_handling = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     gk_kicking = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     gk_positioning = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     gk_reflexes = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     shot_power = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     jumping = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     stamina = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     strength = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     long_shots = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -544,151 +426,32 @@ class SofifaItem(scrapy.Item):
     )
 
     # PLAYER REAL OVERALL RATING (POSITIONAL STATS)
+    # The 26 ratings in extractors.POSITIONS order plus the '+n' boost all positions share.
 
-    LS = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    ST = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RS = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LW = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LF = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    CF = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RF = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
+    position_ratings = scrapy.Field(
+        input_processor=Compose(get_position_ratings),
         output_processor=Identity()
     )
 
-    RW = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LAM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    CAM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RAM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LCM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    CM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RCM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LWB = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LDM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    CDM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RDM = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RWB = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LB = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    LCB = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    CB = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RCB = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
-    )
-
-    RB = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'[0-9]+', x), eval),
-        output_processor=Identity()
+    position_boost = scrapy.Field(
+        input_processor=Compose(get_position_boost),
+        output_processor=TakeFirst()
     )
 
     # COMMUNITY INFO
 
     followers = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     likes = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     dislikes = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -726,12 +489,12 @@ class ImageItem(scrapy.Item):
     image_urls = scrapy.Field()
 
     id = scrapy.Field(
-        input_processor=MapCompose(get_id, eval),
+        input_processor=MapCompose(get_id),
         output_processor=TakeFirst()
     )
 
     category = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'org/([a-zA-Z]+)', x)[0]),
+        input_processor=MapCompose(get_category),
         output_processor=TakeFirst()
     )
 
@@ -744,27 +507,27 @@ class ImageItem(scrapy.Item):
 class MainPageItem(scrapy.Item):
 
     id = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'/([0-9]+)/', x), eval),
+        input_processor=MapCompose(get_path_id),
         output_processor=TakeFirst()
     )
 
     total_stats = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     hits = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'<?[0-9.K]+', x)[0]),
+        input_processor=MapCompose(count_token(0)),
         output_processor=TakeFirst()
     )
 
     comments = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'<?[0-9.K]+', x)[1]),
+        input_processor=MapCompose(count_token(1)),
         output_processor=TakeFirst()
     )
 
     player_page = scrapy.Field(
-        input_processor=MapCompose(lambda x: f'{urljoin("https://sofifa.com", x)}'),
+        input_processor=MapCompose(absolute_url),
         output_processor=TakeFirst()
     )
 
@@ -772,7 +535,7 @@ class MainPageItem(scrapy.Item):
 class TeamStatItem(scrapy.Item):
 
     id = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'/([0-9]+)/', x), eval),
+        input_processor=MapCompose(get_path_id),
         output_processor=TakeFirst()
     )
 
@@ -787,22 +550,22 @@ class TeamStatItem(scrapy.Item):
     )
 
     num_players = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     hits = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'<?[0-9.K]+', x)[0]),
+        input_processor=MapCompose(count_token(0)),
         output_processor=TakeFirst()
     )
 
     comments = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'<?[0-9.K]+', x)[1]),
+        input_processor=MapCompose(count_token(1)),
         output_processor=TakeFirst()
     )
 
     club_page = scrapy.Field(
-        input_processor=MapCompose(lambda x: f'{urljoin("https://sofifa.com", x)}'),
+        input_processor=MapCompose(absolute_url),
         output_processor=TakeFirst()
     )
 
@@ -812,12 +575,12 @@ class DetailedTeamStatItem(scrapy.Item):
     # GENERAL CLUB INFORMATION
 
     id = scrapy.Field(
-        input_processor=MapCompose(get_id, eval),
+        input_processor=MapCompose(get_id),
         output_processor=TakeFirst()
     )
 
     club_name = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'^[^\(]+', x), str.strip),
+        input_processor=MapCompose(get_club_name),
         output_processor=TakeFirst()
     )
 
@@ -839,22 +602,22 @@ class DetailedTeamStatItem(scrapy.Item):
     # GENERAL TEAM STATS
 
     overall = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     attack = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     midfield = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     defence = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -871,12 +634,12 @@ class DetailedTeamStatItem(scrapy.Item):
     )
 
     international_prestige = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     domestic_prestige = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -886,52 +649,52 @@ class DetailedTeamStatItem(scrapy.Item):
     )
 
     starting_xi_average_age = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_number),
         output_processor=TakeFirst()
     )
 
     whole_team_average_age = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_number),
         output_processor=TakeFirst()
     )
 
     captain = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
     short_free_kick = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
     long_free_kick = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
     left_short_free_kick = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
     right_short_free_kick = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
     penalties = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
     left_corner = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
     right_corner = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'([0-9]+)', x)[0], eval),
+        input_processor=MapCompose(get_first_int),
         output_processor=TakeFirst()
     )
 
@@ -948,12 +711,12 @@ class DetailedTeamStatItem(scrapy.Item):
     )
 
     defence_team_width = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     defence_depth = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -963,22 +726,22 @@ class DetailedTeamStatItem(scrapy.Item):
     )
 
     offense_width = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     offense_players_in_box = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     offense_corners = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     offense_free_kicks = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -989,12 +752,12 @@ class DetailedTeamStatItem(scrapy.Item):
     )
 
     build_up_play_dribbling = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     build_up_play_passing = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -1004,17 +767,17 @@ class DetailedTeamStatItem(scrapy.Item):
     )
 
     chance_creation_passing = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     chance_creation_crossing = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     chance_creation_shooting = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -1024,17 +787,17 @@ class DetailedTeamStatItem(scrapy.Item):
     )
 
     defence_extra_pressure = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     defence_extra_aggression = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     defence_extra_team_width = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -1065,12 +828,12 @@ class DetailedTeamStatItem(scrapy.Item):
     # COMMUNITY
 
     likes = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
     dislikes = scrapy.Field(
-        input_processor=MapCompose(eval),
+        input_processor=MapCompose(to_int),
         output_processor=TakeFirst()
     )
 
@@ -1078,12 +841,12 @@ class DetailedTeamStatItem(scrapy.Item):
 class NationalTeamStats(TeamStatItem):
 
     id = scrapy.Field(
-        input_processor=MapCompose(lambda x: re.findall(r'/([0-9]+)/', x), eval),
+        input_processor=MapCompose(get_path_id),
         output_processor=TakeFirst()
     )
 
     team_page = scrapy.Field(
-        input_processor=MapCompose(lambda x: f'{urljoin("https://sofifa.com", x)}'),
+        input_processor=MapCompose(absolute_url),
         output_processor=TakeFirst()
     )
 
@@ -1091,7 +854,7 @@ class NationalTeamStats(TeamStatItem):
 class NationalTeamDetailedStats(DetailedTeamStatItem):
 
     id = scrapy.Field(
-        input_processor=MapCompose(get_id, eval),
+        input_processor=MapCompose(get_id),
         output_processor=TakeFirst()
     )
 
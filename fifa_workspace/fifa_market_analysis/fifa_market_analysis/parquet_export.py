@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+# Typed, partitioned Parquet export of the player, club and national team detail items.
+#
+# ParquetExportPipeline writes every SofifaItem (or PlayerRecord), DetailedTeamStatItem and NationalTeamDetailedStats
+# it sees into
+#
+#     <PARQUET_EXPORT_DIR>/<table>/crawl_date=<YYYY-MM-DD>/<spider>-<HHMMSS>.parquet
+#
+# with one schema per table, derived from the Item fields' processors: ratings and other small ints are int8, ids
+# int32, heights and weights int16, currency and averages float64, dates timestamps, positions, traits and other low cardinality
+# strings dictionary encoded. pyarrow.dataset / pandas.read_parquet read a table directory as one dataset with
+# crawl_date as a partition column. Items of other types are not exported, with a warning per type.
+#
+#     ITEM_PIPELINES = {'fifa_market_analysis.parquet_export.ParquetExportPipeline': 800}
+#
+#     PARQUET_EXPORT_DIR         the pipeline is disabled without it
+#     PARQUET_ROW_GROUP_SIZE     rows buffered per table before a row group is written, 10000
+#     PARQUET_COMPRESSION        'zstd'
+#
+# pyarrow is only needed when the pipeline is enabled.
+
+import datetime
+import importlib.util
+import os
+
+from scrapy.exceptions import NotConfigured
+
+from fifa_market_analysis.extractors import OUTFIELD_POINTS, GOALKEEPER_POINTS
+from fifa_market_analysis.items import SofifaItem, DetailedTeamStatItem, NationalTeamDetailedStats
+from fifa_market_analysis.processors import (to_int, get_id, get_age, get_height, get_weight, get_first_int,
+                                             get_path_id, script_point, convert_currency_format, to_number,
+                                             parse_date, get_dob, get_date, get_ints, get_position_ratings,
+                                             get_position_boost, player_id_list)
+
+TABLES = (
+    (SofifaItem, 'player_details'),
+    (DetailedTeamStatItem, 'club_details'),
+    (NationalTeamDetailedStats, 'team_details'),
+)
+
+SMALL_INT_PARSERS = {to_int, get_age, get_position_boost}
+SMALL_INT_PARSERS.update(script_point(point) for point in OUTFIELD_POINTS + GOALKEEPER_POINTS)
+ID_PARSERS = {get_id, get_path_id, get_first_int}
+DATE_PARSERS = {parse_date, get_dob, get_date}
+
+# to_int fields that do not fit in an int8.
+COUNT_FIELDS = {'likes', 'dislikes', 'followers'}
+
+CATEGORY_FIELDS = {
+    'nationality', 'preferred_foot', 'work_rate', 'body_type', 'real_face', 'club_name', 'club_position',
+    'loaned_from', 'team_name', 'team_position', 'division', 'defence_defensive_style', 'offense_offensive_style',
+    'build_up_play_speed', 'build_up_play_positioning', 'chance_creation_positioning', 'defence_extra_defender_line',
+}
+CATEGORY_LIST_FIELDS = {'positions', 'traits', 'unique_attributes'}
+
+
+def field_parser(field):
+
+    functions = getattr(field.get('input_processor'), 'functions', ())
+    return functions[-1] if functions else None
+
+
+def arrow_type(name, field):
+
+    """
+    :return: the pyarrow type of an Item field
+    """
+
+    import pyarrow as pa
+
+    parser = field_parser(field)
+
+    if parser in DATE_PARSERS:
+        return pa.timestamp('ms')
+    if parser in (get_ints, get_position_ratings):
+        return pa.list_(pa.int8())
+    if parser is player_id_list:
+        return pa.list_(pa.int32())
+    if parser in (get_height, get_weight):
+        return pa.int16()
+    if parser in ID_PARSERS or name in COUNT_FIELDS:
+        return pa.int32()
+    if parser in SMALL_INT_PARSERS:
+        return pa.int8()
+    if parser in (convert_currency_format, to_number):
+        return pa.float64()
+    if name in CATEGORY_LIST_FIELDS:
+        return pa.list_(pa.dictionary(pa.int16(), pa.string()))
+    if name in CATEGORY_FIELDS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if name in ('kits', 'image_urls'):
+        return pa.list_(pa.string())
+    if name == 'images':
+        # ImagesPipeline results
+        return pa.list_(pa.struct([(key, pa.string()) for key in ('url', 'path', 'checksum', 'status')]))
+    return pa.string()
+
+
+def item_schema(item_class):
+
+    import pyarrow as pa
+
+    return pa.schema([pa.field(name, arrow_type(name, field)) for name, field in sorted(item_class.fields.items())])
+
+
+class ParquetTable(object):
+
+    """
+    Buffers the items of one table and appends them to a Parquet file one row group at a time.
+    """
+
+    def __init__(self, path, schema, row_group_size, compression):
+        self.path = path
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.rows = list()
+        self.writer = None
+        self.written = 0
+
+    def add(self, item):
+        self.rows.append(dict(item))
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.rows:
+            return
+
+        columns = [pa.array([row.get(field.name) for row in self.rows], type=field.type) for field in self.schema]
+        table = pa.Table.from_arrays(columns, schema=self.schema)
+
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.writer.write_table(table)
+
+        self.written += len(self.rows)
+        self.rows = list()
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ParquetExportPipeline(object):
+
+    def __init__(self, directory, row_group_size=10000, compression='zstd', stats=None):
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.stats = stats
+        self.tables = dict()
+        self.table_names = dict()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+
+        settings = crawler.settings
+        directory = settings.get('PARQUET_EXPORT_DIR')
+        if not directory:
+            raise NotConfigured('PARQUET_EXPORT_DIR is not set')
+        if importlib.util.find_spec('pyarrow') is None:
+            raise NotConfigured('the Parquet export needs pyarrow')
+
+        return cls(
+            directory=directory,
+            row_group_size=settings.getint('PARQUET_ROW_GROUP_SIZE', 10000),
+            compression=settings.get('PARQUET_COMPRESSION', 'zstd'),
+            stats=crawler.stats
+        )
+
+    def open_spider(self, spider):
+        self.spider = spider
+        self.started = datetime.datetime.utcnow()
+
+    def close_spider(self, spider):
+        for name, table in self.tables.items():
+            table.close()
+            if table.written:
+                spider.logger.info(f'Exported {table.written} {name} rows to {table.path}')
+                self.stats.set_value(f'parquet/{name}/rows', table.written)
+
+    def table_name(self, item_type):
+
+        for item_class, name in TABLES:
+            # Exact types only: a subclass may add fields the table has no column for. Records copy the fields of
+            # their Item class.
+            if item_type is item_class or getattr(item_type, 'fields', None) == item_class.fields:
+                return name, item_class
+        return None, None
+
+    def table_for(self, item):
+
+        item_type = type(item)
+        if item_type not in self.table_names:
+            self.table_names[item_type] = self.table_name(item_type)
+            if self.table_names[item_type][0] is None:
+                self.spider.logger.warning(f'No Parquet table for {item_type.__name__} items, they are not exported')
+        name, item_class = self.table_names[item_type]
+        if name is None:
+            return None
+
+        table = self.tables.get(name)
+        if table is None:
+            path = os.path.join(self.directory, name, f'crawl_date={self.started:%Y-%m-%d}',
+                                f'{self.spider.name}-{self.started:%H%M%S}.parquet')
+            table = self.tables[name] = ParquetTable(path, item_schema(item_class), self.row_group_size,
+                                                     self.compression)
+        return table
+
+    def process_item(self, item, spider):
+        table = self.table_for(item)
+        if table is not None:
+            table.add(item)
+        return item
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+# Optional process pool for the detail spiders' HTML parsing.
+#
+# With PARSE_OFFLOAD_ENABLED the player/club/team detail callbacks ship the response body to a worker process and
+# return a Deferred that fires with the loaded item, so the reactor thread keeps downloading while pages are parsed.
+#
+#     PARSE_OFFLOAD_ENABLED      False
+#     PARSE_OFFLOAD_WORKERS      number of worker processes, defaults to the number of cores
+#     PARSE_OFFLOAD_MAX_PENDING  pages submitted to the pool at once, defaults to CONCURRENT_REQUESTS. Responses
+#                                waiting for a slot stay in the scraper, which makes Scrapy hold back new downloads
+#                                once SCRAPER_SLOT_MAX_ACTIVE_SIZE is reached.
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy import signals
+from scrapy.http import HtmlResponse
+from scrapy.loader import ItemLoader
+from twisted.internet import defer, reactor
+from twisted.python.failure import Failure
+
+from fifa_market_analysis.extractors import extract_player
+from fifa_market_analysis.field_specs import CLUB_DETAIL_SPECS, TEAM_DETAIL_SPECS
+from fifa_market_analysis.items import SofifaItem, DetailedTeamStatItem, NationalTeamDetailedStats
+from fifa_market_analysis.records import PlayerRecord
+
+
+def load_player(response, item_class=SofifaItem):
+
+    """
+    Loads a player page with the single-pass extraction engine.
+
+    :param item_class: SofifaItem or records.PlayerRecord
+    """
+
+    loader = ItemLoader(item=item_class(), response=response)
+
+    for field, values in extract_player(response).items():
+        loader.add_value(field, values)
+
+    return loader
+
+
+def parse_player(response):
+    return load_player(response).load_item()
+
+
+PARSERS = {
+    'player': parse_player,
+    'club': CLUB_DETAIL_SPECS.load_item,
+    'team': TEAM_DETAIL_SPECS.load_item,
+}
+
+ITEM_CLASSES = {
+    'player': SofifaItem,
+    'club': DetailedTeamStatItem,
+    'team': NationalTeamDetailedStats,
+}
+
+
+def parse_body(kind, url, body, encoding):
+
+    """
+    Runs in the worker process.
+
+    :param kind: 'player', 'club' or 'team'
+    :return: the loaded item's values as a plain dict, which is cheaper to pickle back than the Item
+    """
+
+    response = HtmlResponse(url=url, body=body, encoding=encoding)
+    return dict(PARSERS[kind](response))
+
+
+class ParseOffload(object):
+
+    def __init__(self, workers, max_pending, item_classes=None):
+
+        # Workers are spawned rather than forked from the process running the reactor.
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.semaphore = defer.DeferredSemaphore(max_pending)
+        self.item_classes = dict(ITEM_CLASSES, **(item_classes or {}))
+
+    @classmethod
+    def from_crawler(cls, crawler):
+
+        settings = crawler.settings
+        workers = settings.getint('PARSE_OFFLOAD_WORKERS', 0) or os.cpu_count()
+        max_pending = settings.getint('PARSE_OFFLOAD_MAX_PENDING', 0) or settings.getint('CONCURRENT_REQUESTS', 16)
+
+        item_classes = {'player': PlayerRecord} if settings.getbool('PLAYER_RECORDS', False) else None
+
+        offload = cls(workers=workers, max_pending=max_pending, item_classes=item_classes)
+        crawler.signals.connect(offload.close, signal=signals.spider_closed)
+
+        return offload
+
+    def parse(self, kind, response):
+
+        """
+        :param kind: 'player', 'club' or 'team'
+        :param response: detail page response
+        :return: Deferred firing with a one item list, which Scrapy accepts as callback output
+        """
+
+        return self.semaphore.run(self._submit, kind, response)
+
+    def _submit(self, kind, response):
+
+        deferred = defer.Deferred()
+        future = self.executor.submit(parse_body, kind, response.url, response.body, response.encoding)
+        future.add_done_callback(lambda done: reactor.callFromThread(self._fire, deferred, kind, done))
+
+        return deferred
+
+    def _fire(self, deferred, kind, future):
+
+        exception = future.exception()
+        if exception is not None:
+            deferred.errback(Failure(exception))
+        else:
+            deferred.callback([self.item_classes[kind](future.result())])
+
+    def close(self, spider):
+        self.executor.shutdown(wait=False)
@@ -4,95 +4,673 @@
 #
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://doc.scrapy.org/en/latest/topics/item-pipeline.html
-from pymongo import MongoClient
+import datetime
+import os
+import time
+import bson
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 from scrapy.pipelines.images import ImagesPipeline
 from scrapy.pipelines.media import *
 from scrapy import Request
 from scrapy.exceptions import DropItem
+from twisted.internet import defer, reactor, task, threads
+from twisted.python import failure
+from twisted.python.threadpool import ThreadPool
+from fifa_market_analysis.document_codec import encode_document
+from fifa_market_analysis.id_bitmap import IdBitmap
+from fifa_market_analysis.recrawl import content_hash
+from fifa_market_analysis.records import as_document
+from fifa_market_analysis.storage import open_client, storage_options
+from fifa_market_analysis.write_ahead import SegmentLog, write_ahead_options
+
+
+def then(result, function, *args):
+
+    """
+    Applies function to result, or adds it as a callback when result is a Deferred from a writer thread.
+    """
+
+    if isinstance(result, defer.Deferred):
+        return result.addCallback(function, *args)
+    return function(result, *args)
 
 
 class MongoPipeline(object):
 
-    def __init__(self, mongo_uri, mongo_db, mongo_collection):
+    """
+    Inserts every item into COLLECTION_NAME.
+
+    With MONGO_BULK_ENABLED the documents are buffered and written with one unordered bulk_write() when
+    MONGO_BULK_SIZE documents are waiting, every MONGO_BULK_INTERVAL seconds and when the spider closes, instead of
+    one insert_one() round trip per item on the reactor thread. Every flush updates the mongo/bulk/* stats.
+
+    With MONGO_WRITE_THREADS the pymongo calls run on a pool of that many writer threads and process_item returns a
+    Deferred, so the reactor keeps downloading while writes are in flight. At most MONGO_MAX_PENDING_WRITES writes
+    (default CONCURRENT_ITEMS) are queued or running; further items wait for a slot in the scraper, which holds back
+    new downloads once SCRAPER_SLOT_MAX_ACTIVE_SIZE is reached. Stats are only updated on the reactor thread.
+
+    STORAGE_BACKEND = 'sqlite' or 'jsonl' writes to local files under STORAGE_PATH instead of Mongo, see storage.py.
+
+    With MONGO_WAL_ENABLED process_item only appends the document to a segment log on local disk (write_ahead.py) and
+    returns, so a slow or restarting Mongo does not hold back the crawl. Every MONGO_WAL_DRAIN_INTERVAL seconds the
+    current segment is sealed and a writer thread bulk writes the sealed segments into the collection, oldest first,
+    deleting each once it is stored; a segment Mongo does not take is retried on the next drain. Segments still on disk
+    when the spider closes, or left by a crash, are replayed when a spider with the same MONGO_WAL_DIR (by default in
+    its JOBDIR) opens. Documents get their _id when they are logged, so replaying a segment that was partly written does
+    not insert them twice. Drains update the mongo/wal/* stats.
+
+    With MONGO_PACK_DOCUMENTS the rating blocks of player documents are stored packed (document_codec.py); readers
+    expand them with document_codec.decode_document(). The mongo/packed/* stats and a log line when the spider closes
+    compare the BSON size of the documents before and after packing, measured on one in MONGO_PACK_SAMPLE_EVERY
+    documents (default 100, 1 for all) so that packing does not add two BSON encodings per item on the reactor thread.
+    """
+
+    def __init__(self, mongo_uri, mongo_db, mongo_collection, stats=None, bulk_size=0, bulk_interval=0,
+                 write_threads=0, max_pending_writes=100, storage=None, write_ahead=None, pack_documents=False,
+                 pack_sample_every=100):
         self.mongo_uri = mongo_uri
         self.mongo_db = mongo_db
         self.mongo_collection = mongo_collection
+        self.stats = stats
+        self.bulk_size = bulk_size
+        self.bulk_interval = bulk_interval
+        self.buffer = list()
+        self.flush_loop = None
+        self.write_threads = write_threads
+        self.pool = None
+        self.semaphore = defer.DeferredSemaphore(max_pending_writes)
+        self.pending = set()
+        self.storage = storage or dict()
+        self.write_ahead = write_ahead
+        self.wal = None
+        self.drain_loop = None
+        self.draining = None
+        self.pack_documents = pack_documents
+        self.pack_sample_every = max(pack_sample_every, 1)
+        self.packed_count = 0
 
     @classmethod
     def from_crawler(cls, crawler):
+        settings = crawler.settings
+        bulk_enabled = settings.getbool('MONGO_BULK_ENABLED', False)
         return cls(
-            mongo_uri=crawler.settings.get('MONGO_URI'),
-            mongo_db=crawler.settings.get('MONGO_DB'),
-            mongo_collection=crawler.settings.get('COLLECTION_NAME')
+            mongo_uri=settings.get('MONGO_URI'),
+            mongo_db=settings.get('MONGO_DB'),
+            mongo_collection=settings.get('COLLECTION_NAME'),
+            stats=crawler.stats,
+            bulk_size=settings.getint('MONGO_BULK_SIZE', 500) if bulk_enabled else 0,
+            bulk_interval=settings.getfloat('MONGO_BULK_INTERVAL', 5.0),
+            write_threads=settings.getint('MONGO_WRITE_THREADS', 0),
+            max_pending_writes=(settings.getint('MONGO_MAX_PENDING_WRITES', 0) or
+                                settings.getint('CONCURRENT_ITEMS', 100)),
+            storage=storage_options(settings),
+            write_ahead=write_ahead_options(settings),
+            pack_documents=settings.getbool('MONGO_PACK_DOCUMENTS', False),
+            pack_sample_every=settings.getint('MONGO_PACK_SAMPLE_EVERY', 100)
         )
 
     def open_spider(self, spider):
-        self.client = MongoClient(self.mongo_uri)
+        self.spider = spider
+        self.client = open_client(self.mongo_uri, **self.storage)
         self.db = self.client[self.mongo_db]
         self.collection = self.db[self.mongo_collection]
+        if self.write_threads or self.write_ahead:
+            self.pool = ThreadPool(minthreads=1, maxthreads=max(self.write_threads, 1),
+                                   name=f'mongo-{self.mongo_collection}')
+            self.pool.start()
+        if self.bulk_size and self.bulk_interval > 0:
+            self.flush_loop = task.LoopingCall(self.flush)
+            self.flush_loop.start(self.bulk_interval, now=False)
+        if self.write_ahead:
+            self.open_log(spider)
+
+    def open_log(self, spider):
+
+        options = dict(self.write_ahead)
+        interval = options.pop('drain_interval')
+        options['directory'] = os.path.join(options['directory'], f'{self.mongo_db}.{self.mongo_collection}')
+        self.wal = SegmentLog(**options)
+
+        left = self.wal.sealed()
+        if left:
+            spider.logger.info(f'Replaying {len(left)} write ahead log segments ({self.wal.sealed_bytes()} bytes) '
+                               f'into {self.mongo_collection} from {self.wal.directory}')
+
+        self.drain_loop = task.LoopingCall(self.drain)
+        self.drain_loop.start(interval, now=True)
 
     def close_spider(self, spider):
+        for loop in (self.flush_loop, self.drain_loop):
+            if loop is not None and loop.running:
+                loop.stop()
+        self.flush()
+        if self.pack_documents:
+            self.report_packing(spider)
+        if self.pool is None:
+            self.client.close()
+            return None
+        # Wait for the writes still in flight before closing the client.
+        pending = list(self.pending)
+        if self.wal is not None:
+            pending.append(self.drain_remaining())
+        return defer.DeferredList(pending).addBoth(self.close_pool)
+
+    def close_pool(self, _):
+        self.pool.stop()
         self.client.close()
 
+    def run(self, function, *args):
+
+        """
+        Calls function right away, or on a writer thread when MONGO_WRITE_THREADS is set.
+
+        :return: the function's result, or a Deferred firing with it
+        """
+
+        if self.pool is None:
+            return function(*args)
+
+        deferred = self.semaphore.run(threads.deferToThreadPool, reactor, self.pool, function, *args)
+        self.pending.add(deferred)
+
+        def done(result):
+            self.pending.discard(deferred)
+            return result
+
+        return deferred.addBoth(done)
+
     def process_item(self, item, spider):
-        self.collection.insert_one(dict(item))
+        if self.wal is not None:
+            return self.log(item)
+
+        if self.bulk_size:
+            # A copy: the item keeps going through the later pipelines and exporters until the buffer is flushed.
+            self.buffer.append(self.request(self.document(item)))
+            if len(self.buffer) >= self.bulk_size:
+                return then(self.flush(), lambda _: item)
+            return item
+
+        if self.pack_documents:
+            return then(self.run(self.collection.insert_one, self.document(item)), lambda _: item)
+        return self.run(self.insert, item)
+
+    def document(self, item):
+
+        """
+        :return: a copy of the item to store, packed with MONGO_PACK_DOCUMENTS
+        """
+
+        document = dict(item)
+        if not self.pack_documents:
+            return document
+
+        packed = encode_document(document)
+        self.inc_stat('mongo/packed/documents', int(packed is not document))
+
+        self.packed_count += 1
+        if (self.packed_count - 1) % self.pack_sample_every == 0:
+            self.inc_stat('mongo/packed/sampled')
+            self.inc_stat('mongo/packed/raw_bytes', len(bson.encode(document)))
+            self.inc_stat('mongo/packed/bytes', len(bson.encode(packed)))
+        return packed
+
+    def report_packing(self, spider):
+
+        raw = self.stats.get_value('mongo/packed/raw_bytes') if self.stats is not None else None
+        if raw:
+            stored = self.stats.get_value('mongo/packed/bytes')
+            sampled = self.stats.get_value('mongo/packed/sampled')
+            spider.logger.info(f'Packed documents for {self.mongo_collection}: {stored} bytes instead of {raw} '
+                               f'({1 - stored / raw:.1%} smaller) over {sampled} sampled documents')
+
+    def request(self, document):
+
+        """
+        :return: the bulk_write() operation storing a buffered or logged document
+        """
+
+        return InsertOne(document)
+
+    def insert(self, item):
+        document = as_document(item)
+        self.collection.insert_one(document)
+        if document is item:
+            # insert_one() sets _id on the document it is given; keep it off the item for the next pipelines.
+            del item['_id']
+        return item
+
+    def flush(self):
+
+        """
+        Writes the buffered documents with one unordered bulk_write(). A failing document does not stop the others;
+        write errors and failed flushes are logged and counted, and the documents are not retried.
+
+        :return: the bulk write result counts (nInserted, nUpserted, nMatched, ...), None if nothing was buffered, or
+                 a Deferred firing with them on writer threads
+        """
+
+        if not self.buffer:
+            return None
+
+        requests, self.buffer = self.buffer, list()
+        return then(self.run(self.write_batch, requests), self.report_flush, requests)
+
+    def write_batch(self, requests):
+
+        """
+        :return: (bulk write result counts, seconds, whether the whole flush failed)
+        """
+
+        start = time.perf_counter()
+        failed = False
+
+        try:
+            details = self.collection.bulk_write(requests, ordered=False).bulk_api_result
+        except BulkWriteError as exception:
+            details = exception.details
+            self.spider.logger.warning(f'Mongo bulk write to {self.mongo_collection}: '
+                                       f'{len(details["writeErrors"])} of {len(requests)} documents failed, '
+                                       f'first error: {details["writeErrors"][:1]}')
+        except PyMongoError as exception:
+            details = {'writeErrors': requests}
+            failed = True
+            self.spider.logger.error(f'Mongo bulk write of {len(requests)} documents to {self.mongo_collection} '
+                                     f'failed: {exception!r}')
+
+        return details, time.perf_counter() - start, failed
+
+    def report_flush(self, result, requests):
+
+        details, seconds, failed = result
+
+        self.inc_stat('mongo/bulk/flushes')
+        self.inc_stat('mongo/bulk/failed_flushes', int(failed))
+        self.inc_stat('mongo/bulk/documents', len(requests))
+        self.inc_stat('mongo/bulk/written',
+                      details.get('nInserted', 0) + details.get('nUpserted', 0) + details.get('nModified', 0))
+        self.inc_stat('mongo/bulk/write_errors', len(details.get('writeErrors', ())))
+        self.inc_stat('mongo/bulk/flush_seconds', seconds)
+        if self.stats is not None:
+            self.stats.max_value('mongo/bulk/max_flush_seconds', seconds)
+            self.stats.set_value('mongo/bulk/last_flush_size', len(requests))
+
+        self.spider.logger.debug(f'Flushed {len(requests)} documents to {self.mongo_collection} in '
+                                 f'{seconds * 1000:.1f} ms')
+
+        return details
+
+    def log(self, item):
+
+        document = self.document(item)
+        document.setdefault('_id', ObjectId())
+        self.wal.append(document)
+        self.inc_stat('mongo/wal/logged')
         return item
 
+    def drain(self):
+
+        """
+        fsyncs the log and, unless a drain is still running, seals the current segment and starts writing the sealed
+        ones on the writer thread.
+        """
+
+        self.wal.sync()
+        if self.draining is not None:
+            return
+
+        self.wal.roll()
+        segments = self.wal.sealed()
+        if segments:
+            self.draining = threads.deferToThreadPool(reactor, self.pool, self.write_segments, segments)
+            self.draining.addBoth(self.report_drain)
+
+    def write_segments(self, segments):
+
+        """
+        Writes the segments oldest first in bulk_write() batches of MONGO_BULK_SIZE and deletes each one once it is
+        stored. Duplicate key errors are documents stored by an earlier, interrupted drain. Stops at the first segment
+        Mongo does not take.
+
+        :return: (list of (path, documents, bulk write result counts, damaged record message), the PyMongoError that
+                 stopped the drain or None)
+        """
+
+        drained = list()
+        batch_size = self.bulk_size or 500
+
+        for path in segments:
+            documents, damage = SegmentLog.read(path)
+            details = {'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'duplicates': 0, 'writeErrors': list()}
+
+            for start in range(0, len(documents), batch_size):
+                requests = [self.request(document) for document in documents[start:start + batch_size]]
+                try:
+                    result = self.collection.bulk_write(requests, ordered=False).bulk_api_result
+                except BulkWriteError as exception:
+                    result = exception.details
+                except PyMongoError as exception:
+                    return drained, exception
+
+                for key in ('nInserted', 'nUpserted', 'nMatched'):
+                    details[key] += result.get(key, 0)
+                for error in result.get('writeErrors', ()):
+                    if error.get('code') == 11000:
+                        details['duplicates'] += 1
+                    else:
+                        details['writeErrors'].append(error)
+
+            os.remove(path)
+            drained.append((path, len(documents), details, damage))
+
+        return drained, None
+
+    def report_drain(self, result):
+
+        self.draining = None
+
+        if isinstance(result, failure.Failure):
+            self.spider.logger.error(f'Draining the write ahead log of {self.mongo_collection} failed: '
+                                     f'{result.getErrorMessage()}')
+            return None
+
+        drained, exception = result
+        for path, count, details, damage in drained:
+            self.inc_stat('mongo/wal/drained_segments')
+            self.inc_stat('mongo/wal/drained', count)
+            self.inc_stat('mongo/wal/written', details['nInserted'] + details['nUpserted'])
+            self.inc_stat('mongo/wal/duplicates', details['nMatched'] + details['duplicates'])
+            self.inc_stat('mongo/wal/write_errors', len(details['writeErrors']))
+            if details['writeErrors']:
+                self.spider.logger.warning(f'{len(details["writeErrors"])} of {count} documents from {path} could not '
+                                           f'be written, first error: {details["writeErrors"][:1]}')
+            if damage:
+                self.spider.logger.warning(f'Write ahead log segment ends in a damaged record, the rest of it is '
+                                           f'lost: {damage}')
+
+        if exception is not None:
+            self.inc_stat('mongo/wal/failed_drains')
+            left = self.wal.sealed()
+            self.spider.logger.warning(f'Mongo did not take the write ahead log of {self.mongo_collection}, '
+                                       f'{len(left)} segments wait in {self.wal.directory}: {exception!r}')
+
+        if self.stats is not None:
+            self.stats.set_value('mongo/wal/backlog_bytes', self.wal.sealed_bytes())
+        return None
+
+    def drain_remaining(self):
+
+        """
+        Waits for the drain in flight and drains what was logged since. Segments Mongo does not take stay on disk.
+        """
+
+        self.wal.close()
+        waiting = self.draining or defer.succeed(None)
+
+        def report(_):
+            left = self.wal.sealed()
+            if left:
+                self.spider.logger.warning(f'{len(left)} write ahead log segments of {self.mongo_collection} are left '
+                                           f'in {self.wal.directory}, they are written when the spider opens again')
+
+        return waiting.addBoth(lambda _: self.drain() or self.draining).addBoth(report)
+
+    def inc_stat(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(key=key, count=count, start=0)
+
 
 class MongoDBPipeline(MongoPipeline):
 
+    """
+    Inserts an item only if no document with the same key exists yet, and drops it otherwise. The key is user_agent
+    for the user_agents collection and id for everything else, and gets a unique index when the spider opens.
+
+    Every item is a single upsert that only sets fields on insert, so an existing document is left unchanged and shows
+    up as matched in the write result. In MONGO_BULK_ENABLED mode the upserts are batched, duplicates within a batch
+    are dropped right away and duplicates of stored documents are counted from the bulk result, as the items have
+    already been passed on by then. Both are counted under mongo/duplicates. With MONGO_WAL_ENABLED nothing is dropped
+    and duplicates are counted under mongo/wal/duplicates when the log is drained.
+    """
+
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        self.key = 'user_agent' if self.mongo_collection == 'user_agents' else 'id'
+        self.buffered_keys = set()
+
+        try:
+            self.collection.create_index(self.key, unique=True)
+        except OperationFailure as exception:
+            # Duplicates stored before the index existed; the upserts still avoid a collection scan.
+            spider.logger.warning(f'Could not create a unique index on {self.mongo_collection}.{self.key}, '
+                                  f'using a non unique one: {exception}')
+            self.collection.create_index(self.key)
+
+    def upsert(self, item):
+
+        """
+        :return: filter and update of the insert-if-absent upsert for the item
+        """
+
+        return {self.key: item.get(self.key)}, {'$setOnInsert': dict(item)}
+
+    def request(self, document):
+        return UpdateOne(*self.upsert(document), upsert=True)
+
     def process_item(self, item, spider):
 
-        if self.collection == 'user_agents':
+        if self.wal is not None:
+            return self.log(item)
 
-            if self.collection.count_documents(
-                    {'id': item.get('user_agent')}) == 1:
+        if self.bulk_size:
+            value = item.get(self.key)
+            if value in self.buffered_keys:
+                self.inc_stat('mongo/duplicates')
                 raise DropItem('Item dropped')
-            else:
-                self.collection.update(
-                    {
-                        'user_agent': item.get('user_agent'),
-                    },
-                    dict(item),
-                    upsert=True)
-                return item
+            self.buffered_keys.add(value)
+            self.buffer.append(self.request(self.document(item)))
+            if len(self.buffer) >= self.bulk_size:
+                return then(self.flush(), lambda _: item)
+            return item
 
-        else:
+        document = self.document(item) if self.pack_documents else item
+        return then(self.run(self.insert_if_absent, document), self.drop_if_duplicate, item)
 
-            if self.collection.count_documents(
-                    {'id': item.get('id')}) == 1:
-                raise DropItem('Item dropped')
-            else:
-                self.collection.update(
-                    {
-                        'id': item.get('id'),
-                    },
-                    dict(item),
-                    upsert=True)
-                return item
+    def insert_if_absent(self, item):
+
+        """
+        :return: True if the item was inserted, False if a document with its key already existed
+        """
+
+        try:
+            result = self.collection.update_one(*self.upsert(item), upsert=True)
+        except DuplicateKeyError:
+            # Inserted by a concurrent writer between the match and the insert.
+            return False
+        return result.upserted_id is not None
+
+    def drop_if_duplicate(self, inserted, item):
+        if not inserted:
+            self.inc_stat('mongo/duplicates')
+            raise DropItem('Item dropped')
+        return item
+
+    def flush(self):
+
+        self.buffered_keys.clear()
+        return then(super().flush(), self.count_duplicates)
+
+    def count_duplicates(self, details):
+        if details:
+            self.inc_stat('mongo/duplicates', details.get('nMatched', 0))
+        return details
 
 
 class SpiderStats(MongoPipeline):
 
-    def __init__(self, mongo_uri, mongo_db, mongo_collection, stats):
-        super().__init__(mongo_uri, mongo_db, mongo_collection)
-        self.stats = stats
+    """
+    Keeps item_scraped_count of the spider in stats.spider_stats, written at most once per STATS_SNAPSHOT_INTERVAL
+    seconds and when the spider closes, to STATS_MONGO_URI (default MONGO_URI). extensions.StatsSnapshots keeps the
+    full stats as a time series.
+    """
+
+    def __init__(self, mongo_uri, mongo_db, mongo_collection, stats, interval=60.0, write_threads=0, storage=None):
+        super().__init__(mongo_uri, mongo_db, mongo_collection, stats=stats, write_threads=write_threads,
+                         storage=storage)
+        self.interval = interval
+        self.last_write = None
 
     @classmethod
     def from_crawler(cls, crawler):
+        settings = crawler.settings
         return cls(
-            mongo_uri='mongodb://localhost:27017',
+            mongo_uri=settings.get('STATS_MONGO_URI') or settings.get('MONGO_URI') or 'mongodb://localhost:27017',
             mongo_db='stats',
             mongo_collection='spider_stats',
-            stats=crawler.stats
+            stats=crawler.stats,
+            interval=settings.getfloat('STATS_SNAPSHOT_INTERVAL', 60.0),
+            write_threads=min(settings.getint('MONGO_WRITE_THREADS', 0), 1),
+            storage=storage_options(settings)
         )
 
+    def close_spider(self, spider):
+        self.run(self.write_count, spider.name, self.stats.get_value('item_scraped_count'))
+        return super().close_spider(spider)
+
     def process_item(self, item, spider):
+        if self.last_write is not None and time.monotonic() - self.last_write < self.interval:
+            return item
+        self.last_write = time.monotonic()
+        return then(self.run(self.write_count, spider.name, self.stats.get_value('item_scraped_count')),
+                    lambda _: item)
+
+    def write_count(self, spider_name, item_scraped_count):
         self.collection.update_one(
-            filter={'spider_name': spider.name},
-            update={'$set': {'item_scraped_count': self.stats.get_value('item_scraped_count')}},
+            filter={'spider_name': spider_name},
+            update={'$set': {'item_scraped_count': item_scraped_count}},
             upsert=True
         )
+
+
+class ChangeHistoryPipeline(MongoPipeline):
+
+    """
+    Keeps the latest document per id in COLLECTION_NAME and a history of what changed between crawls in
+    HISTORY_COLLECTION_NAME (default <COLLECTION_NAME>_history).
+
+    Every item is normalized and hashed. The hashes of the stored documents are loaded when the spider opens, so an
+    unchanged item costs no round trip and no write. A new or changed item replaces the stored document and adds one
+    history document keyed by id and the crawl's start time, holding only the fields whose value changed and the
+    fields that disappeared. Fields listed in HISTORY_IGNORED_FIELDS (community counters and image download results by
+    default) are neither hashed nor tracked. Counted under history/new, history/changed and history/unchanged.
+
+    COLLECTION_NAME gets a unique index on id. A collection filled by MongoPipeline before can already hold several
+    documents per id; it then gets a non unique index and the duplicates are not merged: the hash kept for an id is the
+    one of whichever duplicate is read last, and a change replaces only one of them. Deduplicate such a collection
+    before switching to this pipeline to get one current document per id.
+    """
+
+    hash_field = 'content_hash'
+    ignored_fields = ('followers', 'likes', 'dislikes', 'comments', 'images')
+
+    def __init__(self, mongo_uri, mongo_db, mongo_collection, history_collection, ignored_fields=None, **kwargs):
+        super().__init__(mongo_uri, mongo_db, mongo_collection, **kwargs)
+        self.history_collection = history_collection
+        if ignored_fields is not None:
+            self.ignored_fields = tuple(ignored_fields)
+        self.hashes = dict()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        collection = settings.get('COLLECTION_NAME')
+        return cls(
+            mongo_uri=settings.get('MONGO_URI'),
+            mongo_db=settings.get('MONGO_DB'),
+            mongo_collection=collection,
+            history_collection=settings.get('HISTORY_COLLECTION_NAME') or f'{collection}_history',
+            ignored_fields=settings.getlist('HISTORY_IGNORED_FIELDS') or None,
+            stats=crawler.stats,
+            write_threads=settings.getint('MONGO_WRITE_THREADS', 0),
+            max_pending_writes=(settings.getint('MONGO_MAX_PENDING_WRITES', 0) or
+                                settings.getint('CONCURRENT_ITEMS', 100)),
+            storage=storage_options(settings)
+        )
+
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        self.history = self.db[self.history_collection]
+        self.crawled_at = datetime.datetime.utcnow()
+
+        try:
+            self.collection.create_index('id', unique=True)
+        except OperationFailure as exception:
+            # Several documents per id stored by MongoPipeline; see the class docstring.
+            spider.logger.warning(f'Could not create a unique index on {self.mongo_collection}.id, '
+                                  f'using a non unique one: {exception}')
+            self.collection.create_index('id')
+        self.history.create_index([('id', ASCENDING), ('crawled_at', ASCENDING)])
+
+        for document in self.collection.find({}, projection={'id': True, self.hash_field: True, '_id': False}):
+            self.hashes[document.get('id')] = document.get(self.hash_field)
+
+    def normalize(self, item):
+
+        """
+        :return: the item as a plain dict without _id and the ignored fields
+        """
+
+        document = dict(item)
+        document.pop('_id', None)
+        for field in self.ignored_fields:
+            document.pop(field, None)
+        return document
+
+    def content_hash(self, document):
+        return content_hash(document)
+
+    def process_item(self, item, spider):
+
+        document = self.normalize(item)
+        key = document.get('id')
+        digest = self.content_hash(document)
+
+        if self.hashes.get(key) == digest:
+            self.inc_stat('history/unchanged')
+            return item
+
+        return then(self.run(self.record_change, key, document, digest, dict(item)), self.count_change, key, digest,
+                    item)
+
+    def record_change(self, key, document, digest, stored):
+
+        """
+        Runs on a writer thread when MONGO_WRITE_THREADS is set.
+
+        :return: 'new' or 'changed'
+        """
+
+        previous = self.collection.find_one({'id': key}, projection={'_id': False}) or {}
+        for field in self.ignored_fields + (self.hash_field,):
+            previous.pop(field, None)
+
+        changes = {field: value for field, value in document.items() if previous.get(field) != value}
+        removed = [field for field in previous if field not in document]
+
+        self.history.insert_one({'id': key, 'crawled_at': self.crawled_at, 'changes': changes, 'removed': removed,
+                                 self.hash_field: digest})
+
+        stored.pop('_id', None)
+        stored[self.hash_field] = digest
+        self.collection.replace_one({'id': key}, stored, upsert=True)
+
+        return 'changed' if previous else 'new'
+
+    def count_change(self, change, key, digest, item):
+        # Only once written, so a failed write is retried the next time the item is seen.
+        self.hashes[key] = digest
+        self.inc_stat(f'history/{change}')
         return item
 
 
@@ -161,8 +739,33 @@ class ImagesToDownloadPipeline(ImagesPipeline, MediaPipeline):
 
 class DuplicatesPipeline(object):
 
-    def __init__(self):
-        self.ids_seen = set()
+    """
+    Drops items whose id was already seen. The ids are kept in an IdBitmap, which is loaded when the spider opens and
+    saved when it closes if DUPLICATES_IDS_FILE is set, or as ids_seen.bin in JOBDIR, so resumed and repeated crawls
+    keep dropping the items stored before.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.ids_seen = IdBitmap()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get('DUPLICATES_IDS_FILE')
+        jobdir = crawler.settings.get('JOBDIR')
+        if not path and jobdir:
+            path = os.path.join(jobdir, 'ids_seen.bin')
+        return cls(path=path)
+
+    def open_spider(self, spider):
+        if self.path:
+            self.ids_seen = IdBitmap.load(self.path)
+            spider.logger.info(f'Loaded {len(self.ids_seen)} seen ids from {self.path}')
+
+    def close_spider(self, spider):
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.ids_seen.save(self.path)
 
     def process_item(self, item, spider):
         if item.get('id') in self.ids_seen:
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+
+# Value processors used by the item loaders in items.py.
+#
+# Every pattern is compiled once at import time, every parser does a single match, and numbers are parsed with
+# int()/float(). Scraped text is never passed to eval().
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urljoin
+
+
+CURRENCY_PATTERN = re.compile(r'^\s*(€)?\s*([0-9.]+)\s*([KM])?')
+ID_PATTERN = re.compile(r'([0-9]+)\D*$')
+NAME_PATTERN = re.compile(r'^[^\(]+')
+AGE_PATTERN = re.compile(r'Age\ ([0-9]+)')
+DATE_PATTERN = re.compile(r'([a-zA-Z]+)\ ([0-9]+),\ ([0-9]+)')
+HEIGHT_PATTERN = re.compile(r'([0-9]+)\W([0-9]+)\W')
+WEIGHT_PATTERN = re.compile(r'([0-9]+)lbs')
+NUMBER_PATTERN = re.compile(r'[0-9]+')
+PATH_ID_PATTERN = re.compile(r'/([0-9]+)/')
+BOOST_PATTERN = re.compile(r'\+([0-9]+)')
+COUNT_PATTERN = re.compile(r'<?[0-9.K]+')
+CATEGORY_PATTERN = re.compile(r'org/([a-zA-Z]+)')
+
+MULTIPLIERS = {None: 1, 'K': 1000, 'M': 1000000}
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+
+def to_int(value):
+
+    """
+    >>> to_int(' 94 ')
+    >>> 94
+    """
+
+    return int(value)
+
+
+def to_number(value):
+
+    """
+    Parses integers as int and decimals as float, matching the types the spiders used to store.
+
+    >>> to_number('24')
+    >>> 24
+
+    >>> to_number('24.6')
+    >>> 24.6
+    """
+
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def convert_currency_format(value):
+
+    """
+    Strips away currency symbol and applies multiplier based on abbreviation (K to 1,000, M to 1,000,000).
+
+    >>> convert_currency_format('€110.5M')
+    >>> 110500000.0
+
+    >>> convert_currency_format('€110K')
+    >>> 110000.0
+
+    >>> convert_currency_format('99.5M')
+    >>> 99500000.0
+
+    >>> convert_currency_format('21')
+    >>> 21.0
+
+    >>> convert_currency_format('€190')
+    >>> 190.0
+
+    >>> convert_currency_format(0)
+    >>> 0.0
+    """
+
+    if type(value) is not str:
+        return float(value)
+
+    match = CURRENCY_PATTERN.match(value)
+    if match is None:
+        return None
+
+    return float(match.group(2)) * MULTIPLIERS[match.group(3)]
+
+
+def get_id(value):
+
+    """
+    >>> get_id('Lionel Messi (ID: 158023)')
+    >>> 158023
+    """
+
+    return int(ID_PATTERN.search(value).group(1))
+
+
+def get_name(value):
+
+    """
+    >>> get_name('Lionel Messi (ID: 158023)')
+    >>> 'Lionel Messi '
+    """
+
+    return NAME_PATTERN.match(value).group(0)
+
+
+def get_club_name(value):
+
+    """
+    >>> get_club_name('FC Barcelona (ID: 241)')
+    >>> 'FC Barcelona'
+    """
+
+    return NAME_PATTERN.match(value).group(0).strip()
+
+
+def get_age(value):
+
+    """
+    >>> get_age('Age 31 (Jun 24, 1987) 5\\'7" 159lbs')
+    >>> 31
+    """
+
+    return int(AGE_PATTERN.search(value).group(1))
+
+
+def parse_date(value):
+
+    """
+    Parses 'Jun 24, 1987' without going through the locale aware strptime().
+    """
+
+    match = DATE_PATTERN.search(value)
+    if match is None or match.group(1) not in MONTHS:
+        return datetime.strptime(value, '%b %d, %Y')
+
+    return datetime(int(match.group(3)), MONTHS[match.group(1)], int(match.group(2)))
+
+
+def get_dob(value):
+
+    """
+    >>> get_dob('Age 31 (Jun 24, 1987) 5\\'7" 159lbs')
+    >>> datetime.datetime(1987, 6, 24, 0, 0)
+    """
+
+    return parse_date(value)
+
+
+def get_height(value):
+
+    """
+    >>> get_height('Age 31 (Jun 24, 1987) 5\\'7" 159lbs')
+    >>> 67
+    """
+
+    match = HEIGHT_PATTERN.search(value)
+    return int(match.group(1)) * 12 + int(match.group(2))
+
+
+def get_weight(value):
+
+    """
+    >>> get_weight('Age 31 (Jun 24, 1987) 5\\'7" 159lbs')
+    >>> 159
+    """
+
+    return int(WEIGHT_PATTERN.search(value).group(1))
+
+
+def get_date(value):
+
+    """
+    >>> get_date('Jun 30, 2021')
+    >>> datetime.datetime(2021, 6, 30, 0, 0)
+
+    >>> get_date('2021')
+    >>> datetime.datetime(2021, 1, 1, 0, 0)
+    """
+
+    if len(value) == 4 and value.isdigit():
+        return datetime(int(value), 1, 1)
+
+    return parse_date(value)
+
+
+def get_ints(value):
+
+    """
+    >>> get_ints('90+2')
+    >>> [90, 2]
+    """
+
+    return [int(number) for number in NUMBER_PATTERN.findall(value)]
+
+
+def get_first_int(value):
+
+    """
+    >>> get_first_int('/player/158023/lionel-messi/')
+    >>> 158023
+    """
+
+    return int(NUMBER_PATTERN.search(value).group(0))
+
+
+def get_path_id(value):
+
+    """
+    >>> get_path_id('/team/241/fc-barcelona/')
+    >>> 241
+    """
+
+    return int(PATH_ID_PATTERN.search(value).group(1))
+
+
+def player_id_list(value):
+
+    """
+    >>> player_id_list(['/player/158023/lionel-messi/', '/player/176580/luis-suarez/'])
+    >>> [158023, 176580]
+    """
+
+    return [get_first_int(player) for player in value]
+
+
+def get_position_ratings(values):
+
+    """
+    Packs the positional rating grid into a fixed order list of 26 small ints, 0 where a position is missing.
+
+    >>> get_position_ratings(['90+2', '90+2', ..., '59+2'])
+    >>> [90, 90, ..., 59]
+    """
+
+    ratings = list()
+    for value in values:
+        match = NUMBER_PATTERN.search(value)
+        ratings.append(int(match.group(0)) if match else 0)
+
+    return ratings if any(ratings) else None
+
+
+def get_position_boost(values):
+
+    """
+    The '+2' in '90+2' is the player's reputation boost, which is the same for every position, so it is stored once.
+
+    >>> get_position_boost(['90+2', '90+2', ..., '59+2'])
+    >>> 2
+    """
+
+    for value in values:
+        match = BOOST_PATTERN.search(value)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def absolute_url(value):
+    return urljoin('https://sofifa.com', value)
+
+
+def get_category(value):
+    return CATEGORY_PATTERN.search(value).group(1)
+
+
+@lru_cache(maxsize=None)
+def script_point(name):
+
+    """
+    Returns a processor reading `var point<name> = <value>` from the player rating script. The processors are
+    cached so each one (and its pattern) is only built once per process.
+    """
+
+    pattern = re.compile(r'point' + name + r' = ([0-9]+)')
+
+    def get_point(value):
+        return int(pattern.search(value).group(1))
+
+    get_point.__name__ = f'get_point_{name}'
+    return get_point
+
+
+@lru_cache(maxsize=None)
+def count_token(index):
+
+    """
+    Returns a processor picking the hits (0) or comments (1) token of the listing 'hits comments' cell.
+    """
+
+    def get_count(value):
+        return COUNT_PATTERN.findall(value)[index]
+
+    get_count.__name__ = f'get_count_{index}'
+    return get_count
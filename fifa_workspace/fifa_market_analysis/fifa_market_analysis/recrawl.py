@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+# Incremental recrawls: only request the detail pages that have probably changed since they were last crawled.
+#
+# RecrawlState records, for every detail page URL that yields an item, when it was crawled, the hash of its content
+# and how often that content changed between crawls, in RECRAWL_COLLECTION. Each page is modelled as changing at a
+# steady (Poisson) rate. A crawl only tells whether the page changed at least once since the previous one, so the rate
+# is estimated from the share of checks that found a change, with the bias correction of Cho and Garcia-Molina:
+#
+#     rate = -log((checks - changes + 0.5) / (checks + 0.5)) / (observed_seconds / checks)
+#
+# where checks is the number of crawls after the first, changes the number of them that found new content and
+# observed_seconds the time they cover. A page crawled only once is assumed to change once per RECRAWL_PRIOR_INTERVAL.
+# The probability that a page has changed since its last crawl is 1 - exp(-rate * age).
+#
+# With RECRAWL_ENABLED, url_source.start_requests_from() only requests pages never crawled, pages whose probability
+# reaches RECRAWL_MIN_PROBABILITY and pages older than RECRAWL_MAX_AGE days, most probably changed first and with the
+# probability in percent as the request priority. RECRAWL_MAX_REQUESTS caps a run to the most probably changed pages.
+# RecrawlState must be enabled in EXTENSIONS as well, or nothing is recorded and every page keeps being requested;
+# recrawl_requests() logs a warning when it is missing.
+#
+#     EXTENSIONS = {'fifa_market_analysis.recrawl.RecrawlState': 500}
+#
+#     RECRAWL_ENABLED            False
+#     RECRAWL_COLLECTION         'crawl_state', in MONGO_URI / MONGO_DB
+#     RECRAWL_MIN_PROBABILITY    0.5
+#     RECRAWL_MAX_AGE            days, 30
+#     RECRAWL_PRIOR_INTERVAL     days, 7
+#     RECRAWL_MAX_REQUESTS       0, no limit
+#     RECRAWL_IGNORED_FIELDS     fields left out of the content hash, the community counters by default
+#     RECRAWL_FLUSH_INTERVAL     seconds between writes of the recorded states, 5
+#
+# The states are recorded in memory and written with one unordered bulk_write() every RECRAWL_FLUSH_INTERVAL seconds
+# and when the spider closes, not with a round trip per item.
+#
+# Recrawl mode gives up the streaming of url_source: all the URLs and all the crawl states are loaded into memory to
+# pick the most probably changed pages, so its memory grows with the number of detail pages.
+#
+# STORAGE_BACKEND (see storage.py) applies here too.
+
+import hashlib
+import heapq
+import json
+import math
+import time
+
+import scrapy
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from fifa_market_analysis.storage import open_client, storage_options
+
+DAY = 24 * 60 * 60
+
+IGNORED_FIELDS = ('followers', 'likes', 'dislikes', 'comments', 'images', '_id')
+
+
+def content_hash(document):
+
+    """
+    :return: hex digest of the document's fields, independent of their order
+    """
+
+    encoded = json.dumps(document, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def change_rate(state, prior_interval):
+
+    """
+    :param prior_interval: seconds between changes assumed for a page crawled only once
+    :return: estimated changes per second
+    """
+
+    checks = state.get('checks', 0)
+    observed = state.get('observed_seconds', 0.0)
+    if not checks or observed <= 0:
+        return 1.0 / prior_interval
+
+    unchanged = checks - state.get('changes', 0)
+    return -math.log((unchanged + 0.5) / (checks + 0.5)) / (observed / checks)
+
+
+def change_probability(state, now, prior_interval):
+
+    """
+    :return: probability that the page changed since state['last_crawled'], 1.0 for a page never crawled
+    """
+
+    if state is None:
+        return 1.0
+    age = max(now - state['last_crawled'], 0.0)
+    return 1.0 - math.exp(-change_rate(state, prior_interval) * age)
+
+
+def collection_from(settings):
+
+    client = open_client(settings.get('MONGO_URI'), **storage_options(settings))
+    return client, client[settings.get('MONGO_DB')][settings.get('RECRAWL_COLLECTION', 'crawl_state')]
+
+
+def load_states(collection):
+    return {document['url']: document for document in collection.find({}, projection={'_id': False})}
+
+
+def schedule(urls, states, now, settings):
+
+    """
+    :param urls: iterable of detail page URLs
+    :param states: url -> crawl state, from load_states()
+    :return: list of (url, priority) of the URLs worth requesting, highest priority first
+    """
+
+    minimum = settings.getfloat('RECRAWL_MIN_PROBABILITY', 0.5)
+    max_age = settings.getfloat('RECRAWL_MAX_AGE', 30) * DAY
+    prior_interval = settings.getfloat('RECRAWL_PRIOR_INTERVAL', 7) * DAY
+    limit = settings.getint('RECRAWL_MAX_REQUESTS', 0)
+
+    def candidates():
+        for url in urls:
+            state = states.get(url)
+            probability = change_probability(state, now, prior_interval)
+            if state is None or probability >= minimum or now - state['last_crawled'] >= max_age:
+                yield url, int(round(probability * 100))
+
+    if not limit:
+        return sorted(candidates(), key=lambda candidate: -candidate[1])
+    return heapq.nlargest(limit, candidates(), key=lambda candidate: candidate[1])
+
+
+def recrawl_requests(spider, urls):
+
+    """
+    Yields a Request to spider.parse for every scheduled URL, and sets the pages_to_visit and recrawl/skipped stats.
+    """
+
+    client, collection = collection_from(spider.settings)
+    try:
+        states = load_states(collection)
+    finally:
+        client.close()
+
+    if not any(isinstance(extension, RecrawlState) for extension in spider.crawler.extensions.middlewares):
+        spider.logger.warning('RECRAWL_ENABLED without the fifa_market_analysis.recrawl.RecrawlState extension in '
+                              'EXTENSIONS: no crawl state is recorded, so every run requests every page')
+
+    stats = spider.crawler.stats
+    urls = list(urls)
+    scheduled = schedule(urls, states, time.time(), spider.settings)
+
+    stats.set_value('pages_to_visit', len(scheduled))
+    stats.set_value('recrawl/skipped', len(urls) - len(scheduled))
+    spider.logger.info(f'Recrawling {len(scheduled)} of {len(urls)} pages')
+
+    for url, priority in scheduled:
+        yield scrapy.Request(url=url, callback=spider.parse, priority=priority, meta={'recrawl': True})
+
+
+class RecrawlState(object):
+
+    """
+    Records the crawl state of every page an item was scraped from, once the item has passed the pipelines.
+    Counted under recrawl/new, recrawl/changed and recrawl/unchanged; the writes under recrawl/flushes,
+    recrawl/written and recrawl/write_errors.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.ignored_fields = tuple(crawler.settings.getlist('RECRAWL_IGNORED_FIELDS') or IGNORED_FIELDS)
+        self.interval = crawler.settings.getfloat('RECRAWL_FLUSH_INTERVAL', 5.0)
+        self.states = dict()
+        self.pending = dict()
+        self.client = None
+        self.loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+
+        if not crawler.settings.getbool('RECRAWL_ENABLED', False):
+            raise NotConfigured
+
+        extension = cls(crawler)
+
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+
+        return extension
+
+    def spider_opened(self, spider):
+        self.spider = spider
+        self.client, self.collection = collection_from(self.crawler.settings)
+        self.collection.create_index('url', unique=True)
+        self.states = load_states(self.collection)
+
+        self.loop = task.LoopingCall(self.flush)
+        self.loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.loop is not None and self.loop.running:
+            self.loop.stop()
+        self.flush()
+        self.client.close()
+
+    def flush(self):
+
+        """
+        Writes the states recorded since the last flush with one unordered bulk_write(). States of a flush that fails
+        as a whole are kept for the next one.
+        """
+
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, dict()
+        requests = [UpdateOne({'url': url}, {'$set': state}, upsert=True) for url, state in pending.items()]
+
+        try:
+            details = self.collection.bulk_write(requests, ordered=False).bulk_api_result
+        except BulkWriteError as exception:
+            details = exception.details
+            self.spider.logger.warning(f'{len(details["writeErrors"])} of {len(requests)} crawl states could not be '
+                                       f'written, first error: {details["writeErrors"][:1]}')
+        except PyMongoError as exception:
+            self.pending = pending
+            self.spider.logger.warning(f'Could not write {len(requests)} crawl states: {exception!r}')
+            return
+
+        self.stats.inc_value(key='recrawl/flushes', count=1, start=0)
+        self.stats.inc_value(key='recrawl/written', count=details.get('nUpserted', 0) + details.get('nMatched', 0),
+                             start=0)
+        self.stats.inc_value(key='recrawl/write_errors', count=len(details.get('writeErrors', ())), start=0)
+
+    def item_scraped(self, item, response, spider):
+
+        # Only detail pages requested by url_source; a listing page yields many items.
+        if not response.meta.get('recrawl'):
+            return
+
+        document = {field: value for field, value in dict(item).items() if field not in self.ignored_fields}
+        # Keyed by the URL that was scheduled, before any redirect.
+        url = response.meta.get('redirect_urls', [response.url])[0]
+        self.record(url, content_hash(document), time.time())
+
+    def record(self, url, digest, now):
+
+        state = self.states.get(url)
+
+        if state is None:
+            state = {'url': url, 'first_crawled': now, 'last_changed': now, 'checks': 0, 'changes': 0,
+                     'observed_seconds': 0.0}
+            change = 'new'
+        else:
+            state['checks'] += 1
+            state['observed_seconds'] += max(now - state['last_crawled'], 0.0)
+            if state['content_hash'] != digest:
+                state['changes'] += 1
+                state['last_changed'] = now
+                change = 'changed'
+            else:
+                change = 'unchanged'
+
+        state['last_crawled'] = now
+        state['content_hash'] = digest
+        self.states[url] = state
+
+        self.pending[url] = state
+        self.stats.inc_value(key=f'recrawl/{change}', count=1, start=0)
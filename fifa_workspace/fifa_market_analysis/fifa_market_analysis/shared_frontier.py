@@ -0,0 +1,694 @@
+# -*- coding: utf-8 -*-
+
+# Sharded crawls: several worker processes, on one host or many, taking their requests from one shared frontier.
+#
+# SharedScheduler replaces the Scrapy scheduler of every worker. Requests a worker schedules go into the frontier,
+# which deduplicates them by fingerprint for all workers at once; a worker leases FRONTIER_LEASE_BATCH requests at a
+# time, highest priority first, and acks each one when its response is received. A request whose download fails for
+# good, once RetryMiddleware has given up on it, is marked failed right away by FrontierFailures. A lease neither acked
+# nor failed within FRONTIER_LEASE_SECONDS, because its worker died, goes back into the queue for any worker to take,
+# up to FRONTIER_MAX_ATTEMPTS leases, after which the request is counted as failed. Workers stop once nothing is
+# queued or leased anywhere.
+#
+# Every worker publishes its numeric stats to the frontier every FRONTIER_STATS_INTERVAL seconds and when it closes;
+# merged_stats() adds them up over the workers.
+#
+#     python -m fifa_market_analysis.shared_frontier crawl player_details --workers 4
+#     python -m fifa_market_analysis.shared_frontier stats player_details
+#
+# crawl starts the workers on this host and sets the settings below for them; on other hosts, run crawl with the same
+# FRONTIER_URL. Every worker runs the spider's start_requests(), the frontier drops the copies. Requests with
+# dont_filter, like those made from start_urls, are not deduplicated, so sharding suits the detail spiders.
+#
+#     SCHEDULER = 'fifa_market_analysis.shared_frontier.SharedScheduler'
+#     DOWNLOADER_MIDDLEWARES = {'fifa_market_analysis.shared_frontier.FrontierFailures': 540}
+#
+# FrontierFailures has to come before RetryMiddleware (550), so it only sees the exceptions no retry was made for.
+# crawl adds it to DOWNLOADER_MIDDLEWARES_BASE, leaving the spiders' own DOWNLOADER_MIDDLEWARES alone.
+#
+#     FRONTIER_URL              'sqlite://frontier.sqlite3', a SQLite file for the workers of one host;
+#                               'redis://host:6379/0' for several hosts, through the redis package, with any
+#                               Redis compatible server; 'local://' for LocalRedis, an in process stand in, which
+#                               crawl refuses as its workers are separate processes
+#     FRONTIER_NAME             namespace of the crawl in the frontier, the spider name
+#     FRONTIER_WORKER           worker name in the stats, <host>:<pid>:<random>
+#     FRONTIER_LEASE_BATCH      requests leased at a time, 16
+#     FRONTIER_LEASE_SECONDS    300
+#     FRONTIER_MAX_ATTEMPTS     3
+#     FRONTIER_STATS_INTERVAL   seconds, 10
+#     FRONTIER_POLL_INTERVAL    seconds between leases while a worker has nothing to do, 1.0
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+from twisted.internet import task
+
+from fifa_market_analysis.handoff import schedule_request
+from fifa_market_analysis.sqlite_queue import request_from_dict, request_to_dict
+
+logger = logging.getLogger(__name__)
+
+QUEUED, LEASED, DONE, FAILED = range(4)
+
+# Sent by FrontierFailures with the request whose download failed for good.
+download_failed = object()
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS requests (id INTEGER PRIMARY KEY, name TEXT NOT NULL, key TEXT NOT NULL, '
+    'priority INTEGER NOT NULL, request BLOB, state INTEGER NOT NULL, worker TEXT, expires REAL, '
+    'attempts INTEGER NOT NULL DEFAULT 0, UNIQUE (name, key))',
+    'CREATE INDEX IF NOT EXISTS requests_queue ON requests (name, state, priority DESC, id)',
+    'CREATE TABLE IF NOT EXISTS stats (name TEXT NOT NULL, worker TEXT NOT NULL, stats TEXT NOT NULL, '
+    'PRIMARY KEY (name, worker))',
+)
+
+local_stores = dict()
+
+
+def open_frontier(url, name):
+
+    """
+    :param url: FRONTIER_URL
+    :param name: FRONTIER_NAME
+    """
+
+    if url.startswith('sqlite://'):
+        return SQLiteFrontier(url[len('sqlite://'):], name)
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        import redis
+        return RedisFrontier(redis.Redis.from_url(url), name)
+    if url.startswith('local://'):
+        store = local_stores.get(url)
+        if store is None:
+            store = local_stores[url] = LocalRedis()
+        return RedisFrontier(store, name)
+    raise ValueError(f'Unknown FRONTIER_URL {url!r}, expected sqlite://, redis:// or local://')
+
+
+def numeric_stats(stats):
+    return {key: value for key, value in stats.items() if type(value) in (int, float)}
+
+
+def add_stats(workers):
+
+    """
+    :param workers: iterable of the stats dicts of the workers
+    :return: their sum, key by key
+    """
+
+    merged = dict()
+    for stats in workers:
+        for key, value in stats.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+class SQLiteFrontier(object):
+
+    """
+    Frontier in a SQLite file, shared by the worker processes of one host. Every process opens its own connection.
+    """
+
+    def __init__(self, path, name):
+        self.name = name
+        self.db = sqlite3.connect(path, isolation_level=None, timeout=60)
+        # Switching to WAL needs the database to itself; it only has to happen once.
+        if self.db.execute('PRAGMA journal_mode').fetchone()[0] != 'wal':
+            self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self.db.execute(statement)
+
+    def push(self, key, priority, payload):
+
+        """
+        :return: True if key was new to the frontier and queued
+        """
+
+        cursor = self.db.execute('INSERT OR IGNORE INTO requests (name, key, priority, request, state) '
+                                 'VALUES (?, ?, ?, ?, ?)', (self.name, key, priority, payload, QUEUED))
+        return cursor.rowcount == 1
+
+    def lease(self, worker, count, seconds, max_attempts):
+
+        """
+        :return: list of (key, payload) of up to count requests, leased to worker for seconds
+        """
+
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            self.db.execute('UPDATE requests SET state = ?, request = NULL WHERE name = ? AND state = ? AND '
+                            'expires < ? AND attempts >= ?', (FAILED, self.name, LEASED, now, max_attempts))
+            self.db.execute('UPDATE requests SET state = ? WHERE name = ? AND state = ? AND expires < ?',
+                            (QUEUED, self.name, LEASED, now))
+            rows = self.db.execute('SELECT id, key, request FROM requests WHERE name = ? AND state = ? '
+                                   'ORDER BY priority DESC, id LIMIT ?', (self.name, QUEUED, count)).fetchall()
+            self.db.executemany('UPDATE requests SET state = ?, worker = ?, expires = ?, attempts = attempts + 1 '
+                                'WHERE id = ?', ((LEASED, worker, now + seconds, row_id) for row_id, _, _ in rows))
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+
+        return [(key, payload) for _, key, payload in rows]
+
+    def ack(self, key):
+        self.db.execute('UPDATE requests SET state = ?, request = NULL, worker = NULL WHERE name = ? AND key = ?',
+                        (DONE, self.name, key))
+
+    def fail(self, key):
+        self.db.execute('UPDATE requests SET state = ?, request = NULL, worker = NULL WHERE name = ? AND key = ? AND '
+                        'state = ?', (FAILED, self.name, key, LEASED))
+
+    def release(self, keys):
+
+        """
+        Queues leased requests again without counting the lease as an attempt.
+        """
+
+        self.db.executemany('UPDATE requests SET state = ?, attempts = attempts - 1 WHERE name = ? AND key = ? AND '
+                            'state = ?', ((QUEUED, self.name, key, LEASED) for key in keys))
+
+    def pending(self):
+
+        """
+        :return: number of requests queued or leased
+        """
+
+        return self.db.execute('SELECT COUNT(*) FROM requests WHERE name = ? AND state IN (?, ?)',
+                               (self.name, QUEUED, LEASED)).fetchone()[0]
+
+    def counts(self):
+        rows = self.db.execute('SELECT state, COUNT(*) FROM requests WHERE name = ? GROUP BY state', (self.name,))
+        counts = dict(rows.fetchall())
+        return {'queued': counts.get(QUEUED, 0), 'leased': counts.get(LEASED, 0), 'done': counts.get(DONE, 0),
+                'failed': counts.get(FAILED, 0)}
+
+    def publish_stats(self, worker, stats):
+        self.db.execute('INSERT OR REPLACE INTO stats (name, worker, stats) VALUES (?, ?, ?)',
+                        (self.name, worker, json.dumps(numeric_stats(stats))))
+
+    def worker_stats(self):
+        rows = self.db.execute('SELECT stats FROM stats WHERE name = ?', (self.name,))
+        return [json.loads(stats) for stats, in rows]
+
+    def close(self):
+        self.db.close()
+
+
+# RedisFrontier.lease() in one server side step, so a worker dying half way cannot leave a request in neither the
+# queue nor the leases. KEYS: queue, leases, requests, priorities, attempts, failed; ARGV: now, count, expires,
+# max_attempts. Returns key, payload, key, payload, ...
+LEASE_SCRIPT = '''
+for _, key in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])) do
+    redis.call('ZREM', KEYS[2], key)
+    if tonumber(redis.call('HGET', KEYS[5], key) or '0') >= tonumber(ARGV[4]) then
+        redis.call('HDEL', KEYS[3], key)
+        redis.call('HDEL', KEYS[4], key)
+        redis.call('HDEL', KEYS[5], key)
+        redis.call('INCR', KEYS[6])
+    else
+        redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[4], key) or '0', key)
+    end
+end
+local leased = {}
+local popped = redis.call('ZPOPMAX', KEYS[1], ARGV[2])
+for index = 1, #popped, 2 do
+    local key = popped[index]
+    local payload = redis.call('HGET', KEYS[3], key)
+    if payload then
+        redis.call('ZADD', KEYS[2], ARGV[3], key)
+        redis.call('HINCRBY', KEYS[5], key, 1)
+        table.insert(leased, key)
+        table.insert(leased, payload)
+    end
+end
+return leased
+'''
+
+
+def text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class RedisFrontier(object):
+
+    """
+    Frontier in a Redis compatible store, shared by workers on any number of hosts. Keys, all under <name>:
+
+        seen        set of every key ever pushed
+        queue       sorted set of the queued keys, by priority
+        leases      sorted set of the leased keys, by lease expiry
+        requests    hash of key -> pickled request, until acked
+        priorities  hash of key -> priority, for requests going back into the queue
+        attempts    hash of key -> leases so far
+        workers     set of the workers that published stats, each in the hash stats:<worker>
+        done, failed
+
+    Leases are taken with LEASE_SCRIPT on a Redis server and under the store's lock on LocalRedis.
+    """
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.lease_script = client.register_script(LEASE_SCRIPT) if hasattr(client, 'register_script') else None
+
+    def key(self, suffix):
+        return f'{self.name}:{suffix}'
+
+    def push(self, key, priority, payload):
+
+        if not self.client.sadd(self.key('seen'), key):
+            return False
+        self.client.hset(self.key('requests'), key, payload)
+        self.client.hset(self.key('priorities'), key, priority)
+        self.client.zadd(self.key('queue'), {key: priority})
+        return True
+
+    def requeue_expired(self, now, max_attempts):
+
+        for member in self.client.zrangebyscore(self.key('leases'), '-inf', now):
+            # Only the worker whose ZREM removes the lease puts the request back.
+            if not self.client.zrem(self.key('leases'), member):
+                continue
+            key = text(member)
+            if int(self.client.hget(self.key('attempts'), key) or 0) >= max_attempts:
+                self.forget(key)
+                self.client.incr(self.key('failed'))
+            else:
+                priority = int(self.client.hget(self.key('priorities'), key) or 0)
+                self.client.zadd(self.key('queue'), {key: priority})
+
+    def lease(self, worker, count, seconds, max_attempts):
+
+        now = time.time()
+        if self.lease_script is None:
+            with self.client.lock:
+                return self.lease_steps(now, count, seconds, max_attempts)
+
+        reply = self.lease_script(keys=[self.key(suffix) for suffix in ('queue', 'leases', 'requests', 'priorities',
+                                                                         'attempts', 'failed')],
+                                  args=[now, count, now + seconds, max_attempts])
+        return [(text(key), payload) for key, payload in zip(reply[::2], reply[1::2])]
+
+    def lease_steps(self, now, count, seconds, max_attempts):
+
+        """
+        LEASE_SCRIPT one command at a time, for LocalRedis.
+        """
+
+        self.requeue_expired(now, max_attempts)
+
+        leased = list()
+        for member, _ in self.client.zpopmax(self.key('queue'), count):
+            key = text(member)
+            payload = self.client.hget(self.key('requests'), key)
+            if payload is None:
+                continue
+            self.client.zadd(self.key('leases'), {key: now + seconds})
+            self.client.hincrby(self.key('attempts'), key, 1)
+            leased.append((key, payload))
+        return leased
+
+    def forget(self, key):
+        for suffix in ('requests', 'priorities', 'attempts'):
+            self.client.hdel(self.key(suffix), key)
+
+    def ack(self, key):
+        if self.client.zrem(self.key('leases'), key):
+            self.forget(key)
+            self.client.incr(self.key('done'))
+
+    def fail(self, key):
+        if self.client.zrem(self.key('leases'), key):
+            self.forget(key)
+            self.client.incr(self.key('failed'))
+
+    def release(self, keys):
+        for key in keys:
+            if self.client.zrem(self.key('leases'), key):
+                self.client.hincrby(self.key('attempts'), key, -1)
+                priority = int(self.client.hget(self.key('priorities'), key) or 0)
+                self.client.zadd(self.key('queue'), {key: priority})
+
+    def pending(self):
+        return self.client.zcard(self.key('queue')) + self.client.zcard(self.key('leases'))
+
+    def counts(self):
+        return {'queued': self.client.zcard(self.key('queue')), 'leased': self.client.zcard(self.key('leases')),
+                'done': int(self.client.get(self.key('done')) or 0),
+                'failed': int(self.client.get(self.key('failed')) or 0)}
+
+    def publish_stats(self, worker, stats):
+        self.client.sadd(self.key('workers'), worker)
+        self.client.hset(self.key(f'stats:{worker}'), 'stats', json.dumps(numeric_stats(stats)))
+
+    def worker_stats(self):
+        workers = [text(worker) for worker in self.client.smembers(self.key('workers'))]
+        return [json.loads(self.client.hget(self.key(f'stats:{worker}'), 'stats')) for worker in workers]
+
+    def close(self):
+        pass
+
+
+class LocalRedis(object):
+
+    """
+    In process stand in for the Redis commands RedisFrontier uses, with the redis package's signatures and bytes
+    replies, for workers running in one process and for trying RedisFrontier without a server.
+    """
+
+    def __init__(self):
+        self.data = dict()
+        # Reentrant, so RedisFrontier can hold it across several commands.
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode('utf-8')
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            value = int(self.data.get(name, b'0')) + amount
+            self.data[name] = self.encode(value)
+            return value
+
+    def sadd(self, name, *values):
+        with self.lock:
+            members = self.data.setdefault(name, set())
+            added = {self.encode(value) for value in values} - members
+            members.update(added)
+            return len(added)
+
+    def smembers(self, name):
+        return set(self.data.get(name, ()))
+
+    def hset(self, name, key, value):
+        with self.lock:
+            fields = self.data.setdefault(name, dict())
+            new = self.encode(key) not in fields
+            fields[self.encode(key)] = self.encode(value)
+            return int(new)
+
+    def hget(self, name, key):
+        return self.data.get(name, {}).get(self.encode(key))
+
+    def hdel(self, name, *keys):
+        with self.lock:
+            fields = self.data.get(name, {})
+            return sum(fields.pop(self.encode(key), None) is not None for key in keys)
+
+    def hincrby(self, name, key, amount=1):
+        with self.lock:
+            fields = self.data.setdefault(name, dict())
+            value = int(fields.get(self.encode(key), b'0')) + amount
+            fields[self.encode(key)] = self.encode(value)
+            return value
+
+    def zadd(self, name, mapping):
+        with self.lock:
+            scores = self.data.setdefault(name, dict())
+            added = sum(self.encode(member) not in scores for member in mapping)
+            scores.update((self.encode(member), float(score)) for member, score in mapping.items())
+            return added
+
+    def zrem(self, name, *members):
+        with self.lock:
+            scores = self.data.get(name, {})
+            return sum(scores.pop(self.encode(member), None) is not None for member in members)
+
+    def zcard(self, name):
+        return len(self.data.get(name, ()))
+
+    def zrangebyscore(self, name, min, max):
+        low, high = float(min), float(max)
+        with self.lock:
+            members = sorted(self.data.get(name, {}).items(), key=lambda member: (member[1], member[0]))
+        return [member for member, score in members if low <= score <= high]
+
+    def zpopmax(self, name, count=None):
+        with self.lock:
+            scores = self.data.get(name, {})
+            popped = sorted(scores.items(), key=lambda member: (member[1], member[0]), reverse=True)[:count or 1]
+            for member, _ in popped:
+                del scores[member]
+            return popped
+
+
+def merged_stats(frontier):
+
+    """
+    :return: the stats of all workers added up, with the frontier's own counts as frontier/<state>
+    """
+
+    merged = add_stats(frontier.worker_stats())
+    merged.update((f'frontier/{state}', count) for state, count in frontier.counts().items())
+    return merged
+
+
+class SharedScheduler(object):
+
+    def __init__(self, crawler, frontier, worker, lease_batch=16, lease_seconds=300, max_attempts=3,
+                 stats_interval=10, poll_interval=1.0):
+        self.crawler = crawler
+        self.frontier = frontier
+        self.worker = worker
+        self.lease_batch = lease_batch
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.stats_interval = stats_interval
+        self.poll_interval = poll_interval
+        self.leased = deque()
+        # Keys leased to this worker and not acked yet.
+        self.held = set()
+        # Retries and redirects of held requests, and requests that cannot be pickled, stay with this worker.
+        self.local = deque()
+        self.published = 0
+        self.spider = None
+        self.poll = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+
+        settings = crawler.settings
+        frontier = open_frontier(settings.get('FRONTIER_URL', 'sqlite://frontier.sqlite3'),
+                                 settings.get('FRONTIER_NAME') or crawler.spidercls.name)
+        scheduler = cls(
+            crawler,
+            frontier,
+            # Unique per crawl, so a restarted worker adds to the stats of the one it replaces.
+            worker=settings.get('FRONTIER_WORKER') or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}',
+            lease_batch=settings.getint('FRONTIER_LEASE_BATCH', 16),
+            lease_seconds=settings.getfloat('FRONTIER_LEASE_SECONDS', 300),
+            max_attempts=settings.getint('FRONTIER_MAX_ATTEMPTS', 3),
+            stats_interval=settings.getfloat('FRONTIER_STATS_INTERVAL', 10),
+            poll_interval=settings.getfloat('FRONTIER_POLL_INTERVAL', 1.0),
+        )
+
+        crawler.signals.connect(scheduler.response_received, signal=signals.response_received)
+        crawler.signals.connect(scheduler.download_failed, signal=download_failed)
+
+        return scheduler
+
+    def open(self, spider):
+
+        self.spider = spider
+        self.stats = self.crawler.stats
+        # Scrapy < 2.7 has no request fingerprinter.
+        self.fingerprinter = getattr(self.crawler, 'request_fingerprinter', None)
+
+        self.poll = task.LoopingCall(self.poll_frontier)
+        self.poll.start(self.poll_interval, now=False)
+
+    def close(self, reason):
+
+        if self.poll is not None and self.poll.running:
+            self.poll.stop()
+        if self.leased:
+            self.frontier.release([key for key, _ in self.leased])
+            self.leased.clear()
+        self.frontier.publish_stats(self.worker, self.stats.get_stats())
+        self.frontier.close()
+
+    def fingerprint(self, request):
+        if self.fingerprinter is None:
+            from scrapy.utils.request import request_fingerprint
+            return request_fingerprint(request)
+        return self.fingerprinter.fingerprint(request).hex()
+
+    def __len__(self):
+        return len(self.leased) + len(self.local) + self.frontier.pending()
+
+    def has_pending_requests(self):
+        return bool(self.leased or self.local) or self.frontier.pending() > 0
+
+    def enqueue_request(self, request):
+
+        if request.meta.get('frontier_key') in self.held:
+            self.local.append(request)
+            return True
+
+        key = self.fingerprint(request)
+        if request.dont_filter:
+            key = f'{key}:{uuid.uuid4().hex}'
+
+        try:
+            payload = pickle.dumps(request_to_dict(request, self.spider), protocol=4)
+        except (ValueError, pickle.PicklingError, AttributeError, TypeError):
+            self.local.append(request)
+            self.stats.inc_value(key='frontier/unserializable', count=1, start=0)
+            return True
+
+        if not self.frontier.push(key, request.priority, payload):
+            self.stats.inc_value(key='dupefilter/filtered', count=1, start=0)
+            return False
+
+        self.stats.inc_value(key='scheduler/enqueued', count=1, start=0)
+        return True
+
+    def lease(self):
+
+        leased = self.frontier.lease(self.worker, self.lease_batch, self.lease_seconds, self.max_attempts)
+        self.leased.extend(leased)
+        self.held.update(key for key, _ in leased)
+
+        if time.time() - self.published >= self.stats_interval:
+            self.frontier.publish_stats(self.worker, self.stats.get_stats())
+            self.published = time.time()
+
+    def leased_request(self):
+
+        key, payload = self.leased.popleft()
+        request = request_from_dict(pickle.loads(payload), spider=self.spider)
+        request.meta['frontier_key'] = key
+        self.stats.inc_value(key='scheduler/dequeued', count=1, start=0)
+        return request
+
+    def next_request(self):
+
+        if self.local:
+            return self.local.popleft()
+
+        if not self.leased:
+            self.lease()
+            if not self.leased:
+                return None
+
+        return self.leased_request()
+
+    def poll_frontier(self):
+
+        """
+        The engine asks for requests when a download finishes and on its 5 second heartbeat, so a worker that ran out
+        of requests would only see the ones other workers queue seconds later. Leases them here and wakes the engine.
+        """
+
+        if self.leased or self.local:
+            return
+        self.lease()
+        if self.leased:
+            schedule_request(self.crawler, self.leased_request(), self.spider)
+
+    def response_received(self, response, request, spider):
+        key = request.meta.get('frontier_key')
+        if key is not None:
+            self.frontier.ack(key)
+            self.held.discard(key)
+            self.stats.inc_value(key='frontier/acked', count=1, start=0)
+
+    def download_failed(self, request, spider):
+        key = request.meta.get('frontier_key')
+        if key is not None:
+            self.frontier.fail(key)
+            self.held.discard(key)
+            self.stats.inc_value(key='frontier/failed_downloads', count=1, start=0)
+
+
+class FrontierFailures(object):
+
+    """
+    Downloader middleware marking a leased request failed in the frontier once its download failed for good, so the
+    other workers do not wait for its lease to expire and it is not downloaded again.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_exception(self, request, exception, spider):
+        self.crawler.signals.send_catch_log(download_failed, request=request, spider=spider)
+
+
+def run_worker(spider, settings):
+
+    project_settings = get_project_settings()
+    project_settings.setdict(settings, priority='cmdline')
+    process = CrawlerProcess(project_settings)
+    process.crawl(spider)
+    process.start()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Sharded crawls over a shared frontier.')
+    parser.add_argument('command', choices=('crawl', 'stats'))
+    parser.add_argument('spider')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--frontier', help='FRONTIER_URL, by default the project setting')
+    arguments = parser.parse_args()
+
+    project_settings = get_project_settings()
+    url = arguments.frontier or project_settings.get('FRONTIER_URL', 'sqlite://frontier.sqlite3')
+    name = project_settings.get('FRONTIER_NAME') or arguments.spider
+
+    if arguments.command == 'crawl' and url.startswith('local://'):
+        parser.error('a local:// frontier only lives in one process, crawl workers need sqlite:// or redis://')
+
+    # Also creates the frontier before the workers race to.
+    frontier = open_frontier(url, name)
+
+    if arguments.command == 'crawl':
+        middlewares = project_settings.getdict('DOWNLOADER_MIDDLEWARES_BASE')
+        middlewares['fifa_market_analysis.shared_frontier.FrontierFailures'] = 540
+        settings = {'SCHEDULER': 'fifa_market_analysis.shared_frontier.SharedScheduler', 'FRONTIER_URL': url,
+                    'FRONTIER_NAME': name, 'DOWNLOADER_MIDDLEWARES_BASE': middlewares}
+        # A fresh interpreter per worker: a Twisted reactor does not survive a fork.
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=run_worker, args=(arguments.spider, settings))
+                   for _ in range(arguments.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    try:
+        for key, value in sorted(merged_stats(frontier).items()):
+            print(f'{key}: {value}')
+    finally:
+        frontier.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,7 @@
 import scrapy
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
-from scrapy.loader import ItemLoader
-from fifa_market_analysis.items import TeamStatItem
+from fifa_market_analysis.field_specs import CLUB_LISTING, check_listing
 from fifa_market_analysis.proxy_generator import proxies
 from fifa_market_analysis.user_agent_generator import user_agent
 from fifa_market_analysis.sofifa_settings import sofifa_settings
@@ -28,15 +27,9 @@ class SofifaClubUrlsSpider(CrawlSpider):
 
     def parse_start_url(self, response):
 
-        for row in response.xpath("//table[@class='table table-hover persist-area']/tbody/tr"):
-            loader = ItemLoader(item=TeamStatItem(), selector=row, response=response)
+        items = CLUB_LISTING.load_items(response)
 
-            loader.add_xpath('id', ".//a[contains(@href, 'team/')]/@href")
-            loader.add_xpath('nationality', ".//a[contains(@href, 'teams?na')]/text()")
-            loader.add_xpath('region', ".//a[contains(@href, 'teams?ct')]/text()")
-            loader.add_xpath('num_players', ".//td[@class='col text-center'][last()]/div/text()")
-            loader.add_xpath('hits', ".//div[@class='col-comments text-right text-ellipsis rtl']/text()")
-            loader.add_xpath('comments', ".//div[@class='col-comments text-right text-ellipsis rtl']/text()")
-            loader.add_xpath('club_page', ".//a[contains(@href, 'team/')]/@href")
+        if self.settings.getbool('EXTRACTION_EQUIVALENCE_CHECK', False):
+            check_listing(self, CLUB_LISTING, response, items)
 
-            yield loader.load_item()
+        return items
@@ -3,6 +3,7 @@ import scrapy
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
 from scrapy.loader import ItemLoader
+from fifa_market_analysis.extractors import position_grid
 from fifa_market_analysis.items import SofifaItem, MainPageItem
 from fifa_market_analysis.proxy_generator import proxies
 from fifa_market_analysis.user_agent_generator import user_agent
@@ -210,32 +211,9 @@ class SofifaDetailedSpider(CrawlSpider):
 
         # PLAYER REAL OVERALL RATING (POSITIONAL STATS)
 
-        loader.add_xpath('LS', "(.//div[../div='LS']/following::text())[1]")
-        loader.add_xpath('ST', "(.//div[../div='ST']/following::text())[1]")
-        loader.add_xpath('RS', "(.//div[../div='RS']/following::text())[1]")
-        loader.add_xpath('LW', "(.//div[../div='LW']/following::text())[1]")
-        loader.add_xpath('LF', "(.//div[../div='LF']/following::text())[1]")
-        loader.add_xpath('CF', "(.//div[../div='CF']/following::text())[1]")
-        loader.add_xpath('RF', "(.//div[../div='RF']/following::text())[1]")
-        loader.add_xpath('RW', "(.//div[../div='RW']/following::text())[1]")
-        loader.add_xpath('LAM', "(.//div[../div='LAM']/following::text())[1]")
-        loader.add_xpath('CAM', "(.//div[../div='CAM']/following::text())[1]")
-        loader.add_xpath('RAM', "(.//div[../div='RAM']/following::text())[1]")
-        loader.add_xpath('LM', "(.//div[../div='LM']/following::text())[1]")
-        loader.add_xpath('LCM', "(.//div[../div='LCM']/following::text())[1]")
-        loader.add_xpath('CM', "(.//div[../div='CM']/following::text())[1]")
-        loader.add_xpath('RCM', "(.//div[../div='RCM']/following::text())[1]")
-        loader.add_xpath('RM', "(.//div[../div='RM']/following::text())[1]")
-        loader.add_xpath('LWB', "(.//div[../div='LWB']/following::text())[1]")
-        loader.add_xpath('LDM', "(.//div[../div='LDM']/following::text())[1]")
-        loader.add_xpath('CDM', "(.//div[../div='CDM']/following::text())[1]")
-        loader.add_xpath('RDM', "(.//div[../div='RDM']/following::text())[1]")
-        loader.add_xpath('RWB', "(.//div[../div='RWB']/following::text())[1]")
-        loader.add_xpath('LB', "(.//div[../div='LB']/following::text())[1]")
-        loader.add_xpath('LCB', "(.//div[../div='LCB']/following::text())[1]")
-        loader.add_xpath('CB', "(.//div[../div='CB']/following::text())[1]")
-        loader.add_xpath('RCB', "(.//div[../div='RCB']/following::text())[1]")
-        loader.add_xpath('RB', "(.//div[../div='RB']/following::text())[1]")
+        grid = position_grid(response.selector.root)
+        loader.add_value('position_ratings', grid)
+        loader.add_value('position_boost', grid)
 
         # COMMUNITY INFORMATION
 
@@ -1,7 +1,10 @@
 import scrapy
 from scrapy.loader import ItemLoader
 from fifa_market_analysis.items import SofifaItem
-from pymongo import MongoClient
+from fifa_market_analysis.records import PlayerRecord
+from fifa_market_analysis.extractors import compare_items, position_grid_xpath
+from fifa_market_analysis.parse_offload import ParseOffload, load_player
+from fifa_market_analysis.url_source import start_requests_from
 from fifa_market_analysis.proxy_generator import proxies
 from fifa_market_analysis.user_agent_generator import user_agent
 from fifa_market_analysis.sofifa_settings import sofifa_settings
@@ -15,22 +18,95 @@ class SofifaPlayerPagesSpider(scrapy.Spider):
 
     custom_settings = sofifa_settings(name=name, proxies=proxies, user_agent=user_agent, collection='player_details',
                                       validator='PlayerItem')
-    client = MongoClient('localhost', 27017)
-    db = client.sofifa
-    collection = db.player_urls
 
-    urls = [x["player_page"] for x in collection.find({'player_page': {'$exists': 'true'}})]
+    parse_offload = None
 
     def start_requests(self):
+        return start_requests_from(self, 'player_urls', 'player_page')
 
-        for url in self.urls:
-            yield scrapy.Request(url=url, callback=self.parse)
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+
+        spider = super(SofifaPlayerPagesSpider, cls).from_crawler(crawler, *args, **kwargs)
+        if crawler.settings.getbool('PARSE_OFFLOAD_ENABLED', False):
+            spider.parse_offload = ParseOffload.from_crawler(crawler)
+
+        return spider
 
     def parse(self, response):
 
-        self.crawler.stats.set_value('pages_to_visit', len(self.urls))
+        if self.parse_offload is not None:
+            return self.parse_offload.parse('player', response).addCallback(self.handle_items, response)
+
+        if self.settings.getbool('SINGLE_PASS_EXTRACTION', True):
+            item = self.load_single_pass(response).load_item()
+        else:
+            item = self.load_xpath(response).load_item()
+
+        return self.handle_items([item], response)
+
+    def handle_items(self, items, response):
+
+        for item in items:
+
+            if self.settings.getbool('EXTRACTION_EQUIVALENCE_CHECK', False):
+                self.check_equivalence(response, item)
+
+            self.logger.info(f'Parse function called on {response.url}')
+
+            self.logger.info(f"Currently on page {self.crawler.stats.get_value('page_counter')} out of "
+                             f"{self.crawler.stats.get_value('pages_to_visit')}")
+
+            # TODO: enable continued logging of page_counter after a pause/resume.
+            self.crawler.stats.inc_value(key='page_counter', count=1, start=0)
+
+            print(response.request.headers['User-Agent'])
+            print(f"{self.crawler.stats.get_value('page_counter')} out of "
+                  f"{self.crawler.stats.get_value('pages_to_visit')}")
+
+            yield item
+
+    def player_item_class(self):
+
+        """
+        PLAYER_RECORDS makes the loaders emit the compact records.PlayerRecord instead of SofifaItem.
+        """
 
-        loader = ItemLoader(item=SofifaItem(), response=response)
+        return PlayerRecord if self.settings.getbool('PLAYER_RECORDS', False) else SofifaItem
+
+    def load_single_pass(self, response):
+
+        """
+        Walks the page once with the extraction engine and hands the raw values to the loader.
+        """
+
+        return load_player(response, self.player_item_class())
+
+    def check_equivalence(self, response, item):
+
+        """
+        Runs the legacy XPath path on the same response and reports every field that differs.
+        """
+
+        expected = self.load_xpath(response).load_item()
+        differences = compare_items(expected, item)
+
+        for field, xpath_value, single_pass_value in differences:
+            self.logger.warning(f'Extraction mismatch on {response.url} for {field}: '
+                                f'xpath={xpath_value!r} single_pass={single_pass_value!r}')
+            self.crawler.stats.inc_value(key=f'extraction/mismatch/{field}', count=1, start=0)
+
+        self.crawler.stats.inc_value(key='extraction/checked', count=1, start=0)
+        if differences:
+            self.crawler.stats.inc_value(key='extraction/mismatched_pages', count=1, start=0)
+
+    def load_xpath(self, response):
+
+        """
+        Legacy extraction path: one XPath query per field.
+        """
+
+        loader = ItemLoader(item=self.player_item_class()(), response=response)
         col_4_loader = loader.nested_xpath(".//div[@class='column col-4 text-center']")
 
         # GENERAL PLAYER INFORMATION
@@ -156,32 +232,9 @@ class SofifaPlayerPagesSpider(scrapy.Spider):
 
         # PLAYER REAL OVERALL RATING (POSITIONAL STATS)
 
-        loader.add_xpath('LS', "(.//div[../div='LS']/following::text())[1]")
-        loader.add_xpath('ST', "(.//div[../div='ST']/following::text())[1]")
-        loader.add_xpath('RS', "(.//div[../div='RS']/following::text())[1]")
-        loader.add_xpath('LW', "(.//div[../div='LW']/following::text())[1]")
-        loader.add_xpath('LF', "(.//div[../div='LF']/following::text())[1]")
-        loader.add_xpath('CF', "(.//div[../div='CF']/following::text())[1]")
-        loader.add_xpath('RF', "(.//div[../div='RF']/following::text())[1]")
-        loader.add_xpath('RW', "(.//div[../div='RW']/following::text())[1]")
-        loader.add_xpath('LAM', "(.//div[../div='LAM']/following::text())[1]")
-        loader.add_xpath('CAM', "(.//div[../div='CAM']/following::text())[1]")
-        loader.add_xpath('RAM', "(.//div[../div='RAM']/following::text())[1]")
-        loader.add_xpath('LM', "(.//div[../div='LM']/following::text())[1]")
-        loader.add_xpath('LCM', "(.//div[../div='LCM']/following::text())[1]")
-        loader.add_xpath('CM', "(.//div[../div='CM']/following::text())[1]")
-        loader.add_xpath('RCM', "(.//div[../div='RCM']/following::text())[1]")
-        loader.add_xpath('RM', "(.//div[../div='RM']/following::text())[1]")
-        loader.add_xpath('LWB', "(.//div[../div='LWB']/following::text())[1]")
-        loader.add_xpath('LDM', "(.//div[../div='LDM']/following::text())[1]")
-        loader.add_xpath('CDM', "(.//div[../div='CDM']/following::text())[1]")
-        loader.add_xpath('RDM', "(.//div[../div='RDM']/following::text())[1]")
-        loader.add_xpath('RWB', "(.//div[../div='RWB']/following::text())[1]")
-        loader.add_xpath('LB', "(.//div[../div='LB']/following::text())[1]")
-        loader.add_xpath('LCB', "(.//div[../div='LCB']/following::text())[1]")
-        loader.add_xpath('CB', "(.//div[../div='CB']/following::text())[1]")
-        loader.add_xpath('RCB', "(.//div[../div='RCB']/following::text())[1]")
-        loader.add_xpath('RB', "(.//div[../div='RB']/following::text())[1]")
+        grid = position_grid_xpath(response)
+        loader.add_value('position_ratings', grid)
+        loader.add_value('position_boost', grid)
 
         # COMMUNITY INFORMATION
 
@@ -199,15 +252,4 @@ class SofifaPlayerPagesSpider(scrapy.Spider):
         loader.add_xpath('club_logo_img', "(.//div/ul/li/figure/img/@data-src)[1]")
         loader.add_xpath('team_logo_img', "(.//div/ul/li/figure/img/@data-src)[2]")
 
-        self.logger.info(f'Parse function called on {response.url}')
-
-        self.logger.info(f"Currently on page {self.crawler.stats.get_value('page_counter')} out of "
-                         f"{self.crawler.stats.get_value('pages_to_visit')}")
-
-        # TODO: enable continued logging of page_counter after a pause/resume.
-        self.crawler.stats.inc_value(key='page_counter', count=1, start=0)
-
-        print(response.request.headers['User-Agent'])
-        print(f"{self.crawler.stats.get_value('page_counter')} out of {self.crawler.stats.get_value('pages_to_visit')}")
-
-        yield loader.load_item()
+        return loader
@@ -1,8 +1,7 @@
 import scrapy
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
-from scrapy.loader import ItemLoader
-from fifa_market_analysis.items import MainPageItem
+from fifa_market_analysis.field_specs import PLAYER_LISTING, check_listing
 from fifa_market_analysis.proxy_generator import proxies
 from fifa_market_analysis.user_agent_generator import user_agent
 from fifa_market_analysis.sofifa_settings import sofifa_settings
@@ -38,17 +37,13 @@ class SofifaPlayerURLsSpider(CrawlSpider):
 
         self.crawler.stats.set_value('page_counter', page_counter(response.url))
 
-        for row in response.xpath("//table[@class='table table-hover persist-area']/tbody/tr"):
-            loader = ItemLoader(item=MainPageItem(), selector=row, response=response)
+        print(response.request.headers['User-Agent'])
 
-            loader.add_xpath('id', ".//a[contains(@href, 'player/')]/@href")
-            loader.add_xpath('total_stats', ".//div[@class='col-digit col-tt']/text()")
-            loader.add_xpath('hits', ".//div[@class='col-comments text-right text-ellipsis rtl']/text()")
-            loader.add_xpath('comments', ".//div[@class='col-comments text-right text-ellipsis rtl']/text()")
-            loader.add_xpath('player_page', ".//a[contains(@href, 'player/')]/@href")
+        self.logger.info(f'Currently on page {current_page(response.url)}')
 
-            print(response.request.headers['User-Agent'])
+        items = PLAYER_LISTING.load_items(response)
 
-            self.logger.info(f'Currently on page {current_page(response.url)}')
+        if self.settings.getbool('EXTRACTION_EQUIVALENCE_CHECK', False):
+            check_listing(self, PLAYER_LISTING, response, items)
 
-            yield loader.load_item()
+        return items
@@ -95,7 +95,8 @@ class UserAgentScraperSpider(CrawlSpider):
         'LOG_FILE': 'user_agent_log.txt',
         'CONCURRENT_REQUESTS_PER_IP': 10,
         'DEPTH_STATS_VERBOSE': True,
-        'DUPEFILTER_CLASS': 'scrapy.dupefilters.RFPDupeFilter',
+        'DUPEFILTER_CLASS': 'fifa_market_analysis.dupefilter.CompactDupeFilter',
+        'SCHEDULER_PRIORITY_QUEUE': 'fifa_market_analysis.sqlite_queue.SQLitePriorityQueue',
         # 'SPIDER_CONTRACTS': {},
     }
 
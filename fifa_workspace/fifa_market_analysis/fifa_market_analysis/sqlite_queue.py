@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+# Scheduler disk queue kept in one SQLite file under the JOBDIR.
+#
+# Scrapy's disk queues keep the requests of a JOBDIR in one pickle file per priority, requests.queue/p0, p1, ...,
+# read back one request at a time and only readable by the process that wrote them. SQLitePriorityQueue keeps them in
+# <JOBDIR>/requests.queue/queue.sqlite3 instead, one row per request:
+#
+#     requests (id, priority, slot, url, request)
+#
+# with request the pickled request dict, slot its downloader slot (the download_slot meta key or the host) and
+# indexes on (priority, id), (slot, priority, id) and url. Requests are popped highest priority first and, within a
+# priority, last in first out like PickleLifoDiskQueue, or first in first out with a Fifo SCHEDULER_DISK_QUEUE;
+# python -m benchmarks.queue_order compares both orders with ScrapyPriorityQueue.
+#
+# pop() reads the next SQLITE_QUEUE_BATCH_SIZE requests in one query and deletes the popped ones in one statement
+# when it reads the next batch, so a resume does not pay a query per request. Requests popped but not yet deleted when
+# a crawl is killed are scheduled again on resume.
+#
+# The file is in WAL mode, so other processes can read it or change priorities while the crawl runs; a change is
+# seen by the crawl from its next batch. reprioritise() sets priorities by URL, and reprioritise_by_staleness() from
+# the change probabilities recrawl.RecrawlState keeps, so a frontier can be reordered without a restart.
+#
+# Queue files left in requests.queue by the stock LIFO disk queues are imported the first time a crawl resumes with it.
+#
+#     SCHEDULER_PRIORITY_QUEUE = 'fifa_market_analysis.sqlite_queue.SQLitePriorityQueue'
+#
+#     SQLITE_QUEUE_BATCH_SIZE    requests read per query, 100
+
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import struct
+import time
+from bisect import insort
+from urllib.parse import urlparse
+
+from scrapy.pqueues import ScrapyPriorityQueue
+from scrapy.utils.httpobj import urlparse_cached
+
+try:
+    from scrapy.utils.request import request_from_dict
+
+    def request_to_dict(request, spider):
+        return request.to_dict(spider=spider)
+except ImportError:  # Scrapy < 2.6
+    from scrapy.utils.reqser import request_from_dict, request_to_dict
+
+from fifa_market_analysis.recrawl import change_probability, collection_from, load_states, DAY
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = 'queue.sqlite3'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS requests (id INTEGER PRIMARY KEY, priority INTEGER NOT NULL, slot TEXT NOT NULL, '
+    'url TEXT NOT NULL, request BLOB NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS requests_order ON requests (priority, id)',
+    'CREATE INDEX IF NOT EXISTS requests_slot ON requests (slot, priority, id)',
+    'CREATE INDEX IF NOT EXISTS requests_url ON requests (url)',
+)
+
+# p0, p1 from Scrapy < 1.7, 0, -1 from later versions.
+LEGACY_QUEUE = re.compile(r'^p?-?\d+$')
+LIFO_SIZE = struct.Struct('>L')
+
+
+def connect(path):
+
+    db = sqlite3.connect(path, isolation_level=None, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    for statement in SCHEMA:
+        db.execute(statement)
+    return db
+
+
+def is_fifo(queue_class):
+
+    """
+    Scrapy wraps every SCHEDULER_DISK_QUEUE in a class named ScrapyRequestQueue, so the name is looked for in the bases.
+
+    :return: True if queue_class pops first in first out, like PickleFifoDiskQueue
+    """
+
+    return any('fifo' in base.__name__.lower() for base in queue_class.__mro__)
+
+
+def request_slot(request):
+    return request.meta.get('download_slot') or urlparse_cached(request).hostname or ''
+
+
+class SQLitePriorityQueue(object):
+
+    @classmethod
+    def from_crawler(cls, crawler, downstream_queue_cls, key, startprios=()):
+
+        # The scheduler builds its memory queue with the same class and no key.
+        if not key:
+            return ScrapyPriorityQueue.from_crawler(crawler, downstream_queue_cls, key, startprios)
+
+        return cls(crawler, key,
+                   lifo=not is_fifo(downstream_queue_cls),
+                   batch_size=crawler.settings.getint('SQLITE_QUEUE_BATCH_SIZE', 100))
+
+    def __init__(self, crawler, directory, lifo=True, batch_size=100):
+        self.crawler = crawler
+        self.directory = directory
+        self.lifo = lifo
+        self.batch_size = batch_size
+        # The next requests, ordered by sort_key() so the next one is last.
+        self.batch = list()
+        self.popped = list()
+
+        os.makedirs(directory, exist_ok=True)
+        self.db = connect(os.path.join(directory, QUEUE_FILE))
+
+        imported = self.import_legacy()
+        if imported:
+            logger.info(f'Imported {imported} requests from the disk queues in {directory}')
+
+        self.size = self.count()
+
+    def sort_key(self, priority, row_id):
+        return priority, row_id if self.lifo else -row_id
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+
+    def __len__(self):
+        return self.size
+
+    def push(self, request):
+
+        try:
+            payload = pickle.dumps(request_to_dict(request, self.crawler.spider), protocol=4)
+        except (pickle.PicklingError, AttributeError, TypeError) as exception:
+            # The scheduler keeps requests it cannot serialise in memory.
+            raise ValueError(str(exception)) from exception
+
+        cursor = self.db.execute('INSERT INTO requests (priority, slot, url, request) VALUES (?, ?, ?, ?)',
+                                 (request.priority, request_slot(request), request.url, payload))
+        self.size += 1
+
+        # A request that sorts before the last of the batch belongs in it.
+        key = self.sort_key(request.priority, cursor.lastrowid)
+        if self.batch and key > self.batch[0][0]:
+            insort(self.batch, (key, cursor.lastrowid, payload))
+
+    def fill(self):
+
+        """
+        Deletes the requests popped so far and reads the next batch.
+        """
+
+        self.db.execute('BEGIN')
+        try:
+            self.delete_popped()
+            order = 'DESC' if self.lifo else 'ASC'
+            rows = self.db.execute(f'SELECT priority, id, request FROM requests ORDER BY priority DESC, id {order} '
+                                   f'LIMIT ?', (self.batch_size,)).fetchall()
+            # Other processes may have pushed or removed requests.
+            self.size = self.count()
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+
+        self.batch = [(self.sort_key(priority, row_id), row_id, payload) for priority, row_id, payload in rows]
+        self.batch.reverse()
+
+    def delete_popped(self):
+        self.db.executemany('DELETE FROM requests WHERE id = ?', ((row_id,) for row_id in self.popped))
+        self.popped = list()
+
+    def pop(self):
+
+        if not self.batch:
+            self.fill()
+            if not self.batch:
+                return None
+
+        key, row_id, payload = self.batch.pop()
+        self.popped.append(row_id)
+        self.size -= 1
+        return request_from_dict(pickle.loads(payload), spider=self.crawler.spider)
+
+    def peek(self):
+
+        if not self.batch:
+            self.fill()
+            if not self.batch:
+                return None
+        return request_from_dict(pickle.loads(self.batch[-1][2]), spider=self.crawler.spider)
+
+    def close(self):
+
+        """
+        :return: the state the scheduler keeps in active.json, nothing as the file has it all
+        """
+
+        self.delete_popped()
+        self.db.close()
+        return []
+
+    def import_legacy(self):
+
+        """
+        Moves the requests of the stock LIFO disk queue files in the directory into the table and removes the files.
+
+        :return: number of requests imported
+        """
+
+        rows = list()
+        paths = [os.path.join(self.directory, name) for name in sorted(os.listdir(self.directory))
+                 if LEGACY_QUEUE.match(name)]
+        paths = [path for path in paths if os.path.isfile(path)]
+
+        for path in paths:
+            for payload in read_lifo_queue(path):
+                document = pickle.loads(payload)
+                slot = document.get('meta', {}).get('download_slot') or urlparse(document['url']).hostname or ''
+                rows.append((document.get('priority', 0), slot, document['url'], payload))
+
+        if not paths:
+            return 0
+
+        self.db.execute('BEGIN')
+        self.db.executemany('INSERT INTO requests (priority, slot, url, request) VALUES (?, ?, ?, ?)', rows)
+        self.db.execute('COMMIT')
+        for path in paths:
+            os.remove(path)
+
+        return len(rows)
+
+
+def read_lifo_queue(path):
+
+    """
+    Reads a queuelib LifoDiskQueue file without popping from it: a uint32 count, then every record followed by its
+    uint32 length, all big endian.
+
+    :return: the records, in the order they were pushed
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    count, = LIFO_SIZE.unpack_from(data, 0)
+    records = list()
+    end = len(data)
+    for _ in range(count):
+        length, = LIFO_SIZE.unpack_from(data, end - LIFO_SIZE.size)
+        start = end - LIFO_SIZE.size - length
+        records.append(data[start:end - LIFO_SIZE.size])
+        end = start
+
+    records.reverse()
+    return records
+
+
+def queue_path(jobdir):
+    return os.path.join(jobdir, 'requests.queue', QUEUE_FILE)
+
+
+def reprioritise(jobdir, priorities):
+
+    """
+    Sets the priority of queued requests, from a crawl running on jobdir or not.
+
+    :param priorities: url -> priority
+    :return: number of requests changed
+    """
+
+    db = connect(queue_path(jobdir))
+    try:
+        db.execute('BEGIN')
+        cursor = db.executemany('UPDATE requests SET priority = ? WHERE url = ?',
+                                ((priority, url) for url, priority in priorities.items()))
+        db.execute('COMMIT')
+        return cursor.rowcount
+    finally:
+        db.close()
+
+
+def reprioritise_by_staleness(jobdir, settings):
+
+    """
+    Sets the priority of every queued detail page recrawl.RecrawlState has a state for to the probability, in percent,
+    that it changed since it was last crawled, as recrawl_requests() does.
+
+    :param settings: the crawl's settings, for MONGO_URI, MONGO_DB, RECRAWL_COLLECTION and RECRAWL_PRIOR_INTERVAL
+    :return: number of requests changed
+    """
+
+    db = connect(queue_path(jobdir))
+    try:
+        urls = [url for url, in db.execute('SELECT DISTINCT url FROM requests')]
+    finally:
+        db.close()
+
+    client, collection = collection_from(settings)
+    try:
+        states = load_states(collection)
+    finally:
+        client.close()
+
+    now = time.time()
+    prior_interval = settings.getfloat('RECRAWL_PRIOR_INTERVAL', 7) * DAY
+    priorities = {url: int(round(change_probability(states[url], now, prior_interval) * 100))
+                  for url in urls if url in states}
+    return reprioritise(jobdir, priorities)
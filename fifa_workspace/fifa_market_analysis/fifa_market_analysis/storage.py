@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+
+# Storage backends for the pipelines, the stats extension and the start URL source.
+#
+# Everything that persists goes through open_client(), which returns a MongoClient for the default 'mongo' backend
+# and a local stand-in for the others. The local clients are indexed the same way (client[db][collection]) and their
+# collections implement the part of the pymongo Collection API this project uses: insert_one, update_one with $set
+# and $setOnInsert, replace_one, bulk_write of InsertOne/UpdateOne, find and find_one with equality / $exists
+# filters and projections, count_documents and create_index. They raise the pymongo exceptions for duplicate keys.
+#
+#     STORAGE_BACKEND        'mongo', 'sqlite' or 'jsonl'
+#     STORAGE_PATH           directory of the local backends, 'storage'
+#     STORAGE_COMMIT_EVERY   writes per SQLite transaction, 1000
+#
+# sqlite: one <db>.sqlite3 file per database in WAL mode, one table of JSON documents per collection, create_index()
+#         becomes an index on json_extract(). Writes are committed in batches of STORAGE_COMMIT_EVERY and on close.
+# jsonl:  one append only <db>/<collection>.jsonl file per collection; an update appends the new version of the
+#         document. The file is only read back into memory when a collection is queried or gets a unique index, so
+#         plain inserts never read it.
+#
+# Documents are encoded with bson.json_util, so dates and ObjectIds survive the round trip. Dates are read back as
+# naive UTC datetimes, like MongoClient returns them.
+
+import os
+import sqlite3
+import threading
+
+from bson import ObjectId, json_util
+from bson.json_util import JSONOptions
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+
+# json_util.loads() returns timezone aware datetimes on pymongo 3.
+JSON_OPTIONS = JSONOptions(tz_aware=False)
+
+
+def storage_options(settings):
+
+    """
+    :return: keyword arguments of open_client() from the crawler settings
+    """
+
+    return {
+        'backend': settings.get('STORAGE_BACKEND', 'mongo'),
+        'path': settings.get('STORAGE_PATH', 'storage'),
+        'commit_every': settings.getint('STORAGE_COMMIT_EVERY', 1000),
+    }
+
+
+local_clients = dict()
+
+
+def open_client(uri, backend='mongo', path='storage', commit_every=1000):
+
+    """
+    Local clients are shared per backend, path and process, so the pipelines and extensions writing to the same files
+    use one SQLite connection and one JSONL file handle instead of locking each other out. Their close() commits and
+    flushes but keeps them usable.
+    """
+
+    if backend == 'mongo':
+        return MongoClient(uri)
+
+    collection_classes = {'sqlite': SQLiteCollection, 'jsonl': JSONLCollection}
+    if backend not in collection_classes:
+        raise ValueError(f'Unknown STORAGE_BACKEND {backend!r}, expected mongo, sqlite or jsonl')
+
+    key = (backend, os.path.abspath(path), os.getpid())
+    client = local_clients.get(key)
+    if client is None:
+        client = local_clients[key] = LocalClient(collection_classes[backend], path, commit_every=commit_every)
+    return client
+
+
+def index_fields(keys):
+
+    """
+    :param keys: create_index() keys, a field name or a list of (field, direction)
+    """
+
+    if isinstance(keys, str):
+        return [keys]
+    return [field for field, _ in keys]
+
+
+def matches(document, query):
+
+    for field, condition in query.items():
+        if isinstance(condition, dict) and '$exists' in condition:
+            if (document.get(field) is not None) != bool(condition['$exists']):
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+def project(document, projection):
+
+    if not projection:
+        return document
+
+    included = [field for field, keep in projection.items() if keep and field != '_id']
+    if included:
+        projected = {field: document[field] for field in included if field in document}
+        if projection.get('_id', True) and '_id' in document:
+            projected['_id'] = document['_id']
+        return projected
+
+    return {field: value for field, value in document.items() if projection.get(field, True)}
+
+
+def upserted_document(query, update):
+
+    """
+    The document update_one(query, update, upsert=True) inserts when nothing matches.
+    """
+
+    document = {field: value for field, value in query.items() if not isinstance(value, dict)}
+    document.update(update.get('$setOnInsert', {}))
+    document.update(update.get('$set', {}))
+    return document
+
+
+class InsertOneResult(object):
+
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class UpdateResult(object):
+
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class BulkResult(object):
+
+    def __init__(self, bulk_api_result):
+        self.bulk_api_result = bulk_api_result
+        self.inserted_count = bulk_api_result['nInserted']
+        self.upserted_count = bulk_api_result['nUpserted']
+        self.matched_count = bulk_api_result['nMatched']
+        self.modified_count = bulk_api_result['nModified']
+
+
+class LocalClient(object):
+
+    def __init__(self, collection_class, path, **options):
+        self.collection_class = collection_class
+        self.path = path
+        self.options = options
+        self.databases = dict()
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            database = self.databases.get(name)
+            if database is None:
+                database = self.databases[name] = LocalDatabase(self, name)
+            return database
+
+    def close(self):
+        for database in self.databases.values():
+            database.close()
+
+
+class LocalDatabase(object):
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.collections = dict()
+        self.lock = threading.RLock()
+        self.connection = None
+
+        os.makedirs(client.path, exist_ok=True)
+        if client.collection_class is SQLiteCollection:
+            self.connection = sqlite3.connect(os.path.join(client.path, f'{name}.sqlite3'), isolation_level=None,
+                                              check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.pending_writes = 0
+
+    def __getitem__(self, name):
+        with self.lock:
+            collection = self.collections.get(name)
+            if collection is None:
+                collection = self.collections[name] = self.client.collection_class(self, name)
+            return collection
+
+    def write(self, statement, parameters=()):
+
+        """
+        Runs a SQLite write inside the current batch transaction.
+        """
+
+        with self.lock:
+            if not self.connection.in_transaction:
+                self.connection.execute('BEGIN')
+            cursor = self.connection.execute(statement, parameters)
+            self.pending_writes += 1
+            if self.pending_writes >= self.client.options.get('commit_every', 1000):
+                self.commit()
+            return cursor
+
+    def commit(self):
+        with self.lock:
+            if self.connection.in_transaction:
+                self.connection.execute('COMMIT')
+            self.pending_writes = 0
+
+    def close(self):
+        with self.lock:
+            for collection in self.collections.values():
+                collection.close()
+            if self.connection is not None:
+                self.commit()
+
+
+class LocalCollection(object):
+
+    """
+    The backend independent half of the Collection API, built on insert(), update(), select() and count().
+    """
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+
+    def insert_one(self, document):
+
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+        self.insert(dict(document))
+        return InsertOneResult(document['_id'])
+
+    def update_one(self, filter, update, upsert=False):
+
+        for document in self.select(filter, limit=1):
+            changes = update.get('$set')
+            if not changes:
+                return UpdateResult(1, 0)
+            document.update(changes)
+            self.update(document)
+            return UpdateResult(1, 1)
+
+        if not upsert:
+            return UpdateResult(0, 0)
+
+        document = upserted_document(filter, update)
+        document['_id'] = ObjectId()
+        self.insert(document)
+        return UpdateResult(0, 0, upserted_id=document['_id'])
+
+    def replace_one(self, filter, replacement, upsert=False):
+
+        for document in self.select(filter, limit=1):
+            replacement = dict(replacement, _id=document['_id'])
+            self.update(replacement)
+            return UpdateResult(1, 1)
+
+        if not upsert:
+            return UpdateResult(0, 0)
+
+        document = dict(replacement)
+        document.setdefault('_id', ObjectId())
+        self.insert(document)
+        return UpdateResult(0, 0, upserted_id=document['_id'])
+
+    def bulk_write(self, requests, ordered=True):
+
+        # pymongo keeps the operation arguments in these attributes; there is no public accessor.
+        result = {'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': [],
+                  'writeErrors': [], 'writeConcernErrors': []}
+
+        for index, request in enumerate(requests):
+            try:
+                if hasattr(request, '_filter'):
+                    update = self.update_one(request._filter, request._doc, upsert=request._upsert)
+                    result['nMatched'] += update.matched_count
+                    result['nModified'] += update.modified_count
+                    if update.upserted_id is not None:
+                        result['nUpserted'] += 1
+                        result['upserted'].append({'index': index, '_id': update.upserted_id})
+                else:
+                    self.insert_one(request._doc)
+                    result['nInserted'] += 1
+            except DuplicateKeyError as exception:
+                result['writeErrors'].append({'index': index, 'code': 11000, 'errmsg': str(exception)})
+                if ordered:
+                    break
+
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkResult(result)
+
+    def find(self, filter=None, projection=None, batch_size=500):
+        for document in self.select(filter or {}, batch_size=batch_size):
+            yield project(document, projection)
+
+    def find_one(self, filter=None, projection=None):
+        for document in self.select(filter or {}, limit=1):
+            return project(document, projection)
+        return None
+
+    def count_documents(self, filter):
+        return self.count(filter)
+
+    def close(self):
+        pass
+
+
+class SQLiteCollection(LocalCollection):
+
+    def __init__(self, database, name):
+        super().__init__(database, name)
+        self.table = '"' + name.replace('"', '""') + '"'
+        database.write(f'CREATE TABLE IF NOT EXISTS {self.table} (_id TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+
+    @staticmethod
+    def path(field):
+        return "'$." + field.replace("'", "''") + "'"
+
+    def where(self, query):
+
+        clauses, parameters = list(), list()
+        for field, condition in query.items():
+            if isinstance(condition, dict) and '$exists' in condition:
+                check = 'IS NOT NULL' if condition['$exists'] else 'IS NULL'
+                clauses.append(f'json_extract(doc, {self.path(field)}) {check}')
+            elif field == '_id':
+                clauses.append('_id = ?')
+                parameters.append(str(condition))
+            else:
+                clauses.append(f'json_extract(doc, {self.path(field)}) = ?')
+                parameters.append(condition)
+        return ' AND '.join(clauses) or '1', parameters
+
+    def insert(self, document):
+        try:
+            self.database.write(f'INSERT INTO {self.table} (_id, doc) VALUES (?, ?)',
+                                (str(document['_id']), json_util.dumps(document)))
+        except sqlite3.IntegrityError as exception:
+            raise DuplicateKeyError(f'{self.name}: {exception}', code=11000)
+
+    def update(self, document):
+        try:
+            self.database.write(f'UPDATE {self.table} SET doc = ? WHERE _id = ?',
+                                (json_util.dumps(document), str(document['_id'])))
+        except sqlite3.IntegrityError as exception:
+            raise DuplicateKeyError(f'{self.name}: {exception}', code=11000)
+
+    def select(self, query, limit=None, batch_size=500):
+
+        """
+        Pages through the matching rows by rowid, so a long running find() holds the lock for one batch at a time.
+        """
+
+        clause, parameters = self.where(query)
+        last = 0
+        size = limit or batch_size
+
+        while True:
+            with self.database.lock:
+                rows = self.database.connection.execute(
+                    f'SELECT rowid, doc FROM {self.table} WHERE rowid > ? AND {clause} ORDER BY rowid LIMIT ?',
+                    [last] + parameters + [size]).fetchall()
+            for _, doc in rows:
+                yield json_util.loads(doc, json_options=JSON_OPTIONS)
+            if limit or len(rows) < size:
+                return
+            last = rows[-1][0]
+
+    def count(self, query):
+        clause, parameters = self.where(query)
+        with self.database.lock:
+            return self.database.connection.execute(f'SELECT COUNT(*) FROM {self.table} WHERE {clause}',
+                                                    parameters).fetchone()[0]
+
+    def create_index(self, keys, unique=False):
+
+        fields = index_fields(keys)
+        name = '"' + '_'.join([self.name] + fields).replace('"', '""') + '"'
+        columns = ', '.join(f'json_extract(doc, {self.path(field)})' for field in fields)
+        try:
+            self.database.write(f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} '
+                                f'ON {self.table} ({columns})')
+        except sqlite3.IntegrityError as exception:
+            raise OperationFailure(f'{self.name}: {exception}', code=11000)
+        return '_'.join(fields)
+
+
+class JSONLCollection(LocalCollection):
+
+    def __init__(self, database, name):
+        super().__init__(database, name)
+        directory = os.path.join(database.client.path, database.name)
+        os.makedirs(directory, exist_ok=True)
+        self.filename = os.path.join(directory, f'{name}.jsonl')
+        self.file = None
+        self.documents = None
+        # field -> repr(value) -> _id of the document holding it, for the unique indexes
+        self.unique_values = dict()
+        self.lock = threading.RLock()
+
+    def load(self):
+
+        """
+        Reads the file once; the last line of every _id is its current version.
+        """
+
+        with self.lock:
+            if self.documents is None:
+                self.documents = dict()
+                if os.path.exists(self.filename):
+                    with open(self.filename, encoding='utf-8') as f:
+                        for line in f:
+                            document = json_util.loads(line, json_options=JSON_OPTIONS)
+                            self.documents[str(document['_id'])] = document
+            return self.documents
+
+    def append(self, document):
+        if self.file is None:
+            self.file = open(self.filename, 'a', encoding='utf-8')
+        self.file.write(json_util.dumps(document) + '\n')
+
+    def check_unique(self, document):
+
+        for field, owners in self.unique_values.items():
+            owner = owners.get(repr(document.get(field)))
+            if owner is not None and owner != str(document['_id']):
+                raise DuplicateKeyError(f'{self.name}: duplicate {field} {document.get(field)!r}', code=11000)
+
+    def store(self, document):
+
+        key = str(document['_id'])
+        previous = self.documents.get(key)
+        for field, owners in self.unique_values.items():
+            if previous is not None:
+                owners.pop(repr(previous.get(field)), None)
+            owners[repr(document.get(field))] = key
+        self.documents[key] = document
+        self.append(document)
+
+    def insert(self, document):
+        with self.lock:
+            if self.documents is not None:
+                if str(document['_id']) in self.documents:
+                    raise DuplicateKeyError(f'{self.name}: duplicate _id {document["_id"]}', code=11000)
+                self.check_unique(document)
+                self.store(document)
+            else:
+                self.append(document)
+
+    def update(self, document):
+        with self.lock:
+            self.check_unique(document)
+            self.store(document)
+
+    def select(self, query, limit=None, batch_size=500):
+        with self.lock:
+            found = [document for document in self.load().values() if matches(document, query)]
+        # Copies, like documents decoded from the server.
+        return [dict(document) for document in found[:limit]]
+
+    def count(self, query):
+        with self.lock:
+            return sum(1 for document in self.load().values() if matches(document, query))
+
+    def create_index(self, keys, unique=False):
+
+        fields = index_fields(keys)
+        if unique and len(fields) == 1 and fields[0] not in self.unique_values:
+            with self.lock:
+                owners = dict()
+                for key, document in self.load().items():
+                    value = repr(document.get(fields[0]))
+                    if value in owners:
+                        raise OperationFailure(f'{self.name}: duplicate {fields[0]} {document.get(fields[0])!r}',
+                                               code=11000)
+                    owners[value] = key
+                self.unique_values[fields[0]] = owners
+        return '_'.join(fields)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# Detail page URLs stored by the URL spiders, streamed into the detail spiders' start_requests.
+#
+# Scrapy pulls start requests lazily, so reading the URLs from a server side cursor keeps only one cursor batch in
+# memory, and nothing touches Mongo until a crawl actually starts.
+#
+#     START_URLS_MONGO_URI    'mongodb://localhost:27017'
+#     START_URLS_MONGO_DB     'sofifa'
+#     START_URLS_BATCH_SIZE   documents per cursor batch, 500
+#
+# With RECRAWL_ENABLED only the pages that have probably changed since the last crawl are requested, see recrawl.py.
+#
+# With a local STORAGE_BACKEND (see storage.py) the URLs are read from its files instead.
+#
+# With URL_HANDOFF, set by handoff.main(), nothing is read: the URLs come straight from the URL spider running in the
+# same process.
+
+import os
+
+import scrapy
+
+from fifa_market_analysis.recrawl import recrawl_requests
+from fifa_market_analysis.storage import open_client, storage_options
+
+clients = dict()
+
+
+def mongo_client(uri, **storage):
+
+    """
+    One pooled client per URI and process; MongoClient is thread safe and must not be shared across a fork.
+
+    :param storage: open_client() keyword arguments, see storage.storage_options()
+    """
+
+    key = (uri, storage.get('backend', 'mongo'), os.getpid())
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = open_client(uri, **storage)
+    return client
+
+
+def stream_urls(collection, field, batch_size=500):
+
+    """
+    :param collection: pymongo collection written by a URL spider
+    :param field: the URL field, e.g. 'player_page'
+    :return: generator of the URLs, fetched batch_size documents at a time and projected to the URL field only
+    """
+
+    cursor = collection.find({field: {'$exists': True}}, projection={field: True, '_id': False},
+                             batch_size=batch_size)
+    try:
+        for document in cursor:
+            yield document[field]
+    finally:
+        cursor.close()
+
+
+def start_requests_from(spider, collection_name, field):
+
+    """
+    Yields a Request to spider.parse for every URL in the collection, and sets the pages_to_visit stat.
+    """
+
+    settings = spider.settings
+    if settings.getbool('URL_HANDOFF', False):
+        # handoff.Consumer schedules the URLs as the URL spider scrapes them.
+        return
+
+    client = mongo_client(settings.get('START_URLS_MONGO_URI', 'mongodb://localhost:27017'),
+                          **storage_options(settings))
+    collection = client[settings.get('START_URLS_MONGO_DB', 'sofifa')][collection_name]
+    urls = stream_urls(collection, field, settings.getint('START_URLS_BATCH_SIZE', 500))
+
+    if settings.getbool('RECRAWL_ENABLED', False):
+        yield from recrawl_requests(spider, urls)
+        return
+
+    spider.crawler.stats.set_value('pages_to_visit', collection.count_documents({field: {'$exists': True}}))
+
+    for url in urls:
+        yield scrapy.Request(url=url, callback=spider.parse)
@@ -99,32 +99,8 @@ class PlayerItem(Model):
     long_shots = IntType()
     traits = ListType(StringType)
 
-    LS = ListType(IntType)
-    ST = ListType(IntType)
-    RS = ListType(IntType)
-    LW = ListType(IntType)
-    LF = ListType(IntType)
-    CF = ListType(IntType)
-    RF = ListType(IntType)
-    RW = ListType(IntType)
-    LAM = ListType(IntType)
-    CAM = ListType(IntType)
-    RAM = ListType(IntType)
-    LM = ListType(IntType)
-    LCM = ListType(IntType)
-    CM = ListType(IntType)
-    RCM = ListType(IntType)
-    RM = ListType(IntType)
-    LWB = ListType(IntType)
-    LDM = ListType(IntType)
-    CDM = ListType(IntType)
-    RDM = ListType(IntType)
-    RWB = ListType(IntType)
-    LB = ListType(IntType)
-    LCB = ListType(IntType)
-    CB = ListType(IntType)
-    RCB = ListType(IntType)
-    RB = ListType(IntType)
+    position_ratings = ListType(IntType(min_value=0, max_value=99), min_size=26, max_size=26)
+    position_boost = IntType()
 
     followers = IntType()
     likes = IntType()
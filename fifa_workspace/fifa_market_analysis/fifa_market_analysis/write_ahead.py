@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+# Append only segment log the Mongo pipelines write their documents to before Mongo sees them.
+#
+# A log is a directory of numbered segment files, 00000001.seg, 00000002.seg, ... Only the highest numbered one is
+# appended to; roll() closes it and starts the next, and every segment below the current one is sealed and can be
+# read back and deleted once its documents are stored. A segment is a sequence of records:
+#
+#     uint32 payload length, uint32 crc32 of the payload (little endian), the BSON encoded document
+#
+# Appends go through the file buffer and are fsynced every fsync_every records, on sync() and when a segment is
+# rolled, so a crash loses at most the records appended since the last fsync. A record cut short by a crash fails its
+# length or checksum test and ends the segment when it is read back.
+#
+# pipelines.MongoPipeline uses one log per collection when MONGO_WAL_ENABLED is set:
+#
+#     MONGO_WAL_DIR             defaults to <JOBDIR>/mongo_wal, or mongo_wal without a JOBDIR
+#     MONGO_WAL_SEGMENT_SIZE    bytes per segment, 8 MiB
+#     MONGO_WAL_FSYNC_EVERY     records between fsyncs, 1000
+#     MONGO_WAL_DRAIN_INTERVAL  seconds between fsyncs and drains into Mongo, 1.0
+
+import os
+import struct
+import threading
+import zlib
+
+import bson
+
+RECORD = struct.Struct('<II')
+SUFFIX = '.seg'
+
+
+def write_ahead_options(settings):
+
+    """
+    :return: the SegmentLog options and drain interval from the crawler settings, or None when the log is disabled
+    """
+
+    if not settings.getbool('MONGO_WAL_ENABLED', False):
+        return None
+
+    return {
+        'directory': settings.get('MONGO_WAL_DIR') or os.path.join(settings.get('JOBDIR') or '', 'mongo_wal'),
+        'segment_size': settings.getint('MONGO_WAL_SEGMENT_SIZE', 8 * 1024 * 1024),
+        'fsync_every': settings.getint('MONGO_WAL_FSYNC_EVERY', 1000),
+        'drain_interval': settings.getfloat('MONGO_WAL_DRAIN_INTERVAL', 1.0),
+    }
+
+
+def segment_number(filename):
+    return int(filename[:-len(SUFFIX)])
+
+
+class SegmentLog(object):
+
+    def __init__(self, directory, segment_size=8 * 1024 * 1024, fsync_every=1000):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_every = fsync_every
+        self.file = None
+        self.size = 0
+        self.unsynced = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        numbers = [segment_number(name) for name in os.listdir(directory) if name.endswith(SUFFIX)]
+        # Segments left by a previous run are all sealed; this run appends to a new one.
+        self.number = max(numbers, default=0) + 1
+
+    def path(self, number):
+        return os.path.join(self.directory, f'{number:08d}{SUFFIX}')
+
+    def append(self, document):
+
+        payload = bson.encode(document)
+        if self.file is None:
+            self.file = open(self.path(self.number), 'ab')
+            self.size = 0
+
+        self.file.write(RECORD.pack(len(payload), zlib.crc32(payload)))
+        self.file.write(payload)
+        self.size += RECORD.size + len(payload)
+        self.unsynced += 1
+
+        if self.size >= self.segment_size:
+            self.roll()
+        elif self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self.file is not None and self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def roll(self):
+
+        """
+        Seals the current segment, if anything was appended to it.
+        """
+
+        if self.file is None:
+            return
+        self.sync()
+        self.file.close()
+        with self.lock:
+            self.file = None
+            self.number += 1
+
+    def pending(self):
+
+        """
+        :return: True if the current segment has records that roll() would seal
+        """
+
+        return self.file is not None
+
+    def sealed(self):
+
+        """
+        :return: paths of the sealed segments, oldest first
+        """
+
+        with self.lock:
+            current = self.number
+        numbers = [segment_number(name) for name in os.listdir(self.directory) if name.endswith(SUFFIX)]
+        return [self.path(number) for number in sorted(numbers) if number < current]
+
+    def sealed_bytes(self):
+        return sum(os.path.getsize(path) for path in self.sealed())
+
+    def close(self):
+        self.roll()
+
+    @staticmethod
+    def read(path):
+
+        """
+        :return: (the documents of a segment up to the first torn or damaged record, None or a message describing
+                 that record)
+        """
+
+        documents = list()
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        offset = 0
+        while offset < len(data):
+            if offset + RECORD.size > len(data):
+                return documents, f'{path}: torn record header at byte {offset}'
+            length, checksum = RECORD.unpack_from(data, offset)
+            payload = data[offset + RECORD.size:offset + RECORD.size + length]
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                return documents, f'{path}: damaged record at byte {offset}'
+            documents.append(bson.decode(payload))
+            offset += RECORD.size + length
+
+        return documents, None